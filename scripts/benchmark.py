@@ -0,0 +1,178 @@
+"""
+数据库PRAGMA预设性能测试
+
+为每个PRAGMA预设创建一个临时题库，分别测量：
+- 单条写入：每条答案一个事务（与保存AI答案相同）
+- 批量写入：每批一个事务（与批量导入相同）
+- 精确查询：多线程按标准化问题哈希查询
+- 并发读写：多线程同时查询和单条写入，统计 "database is locked" 错误
+
+    uv run python scripts/benchmark.py
+    uv run python scripts/benchmark.py --profiles balanced fast --rows 50000
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from geyago.config.settings import settings
+from geyago.core.database import PRAGMA_PROFILES, DatabaseManager, resolve_pragmas
+from geyago.utils.helpers import build_question_key, hash_question_key
+
+INSERT_SQL = """
+    INSERT INTO question_answer (question, answer, options, type, normalized_question, question_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+LOOKUP_SQL = "SELECT * FROM question_answer WHERE question_hash = ? AND normalized_question = ?"
+
+
+def make_row(index: int) -> tuple:
+    """生成一条测试问题"""
+    question = f"第{index}题：下列关于光合作用的说法中，哪一项是正确的？（编号{index}）"
+    key = build_question_key(question)
+    return (question, "C", "A.只在夜间进行 B.不需要光 C.产生氧气 D.消耗氧气", "single", key, hash_question_key(key))
+
+
+def bench_single_inserts(manager: DatabaseManager, start: int, count: int) -> float:
+    """单条写入，返回每秒行数"""
+    begin = time.perf_counter()
+    for index in range(start, start + count):
+        manager.execute_query(INSERT_SQL, make_row(index))
+    return count / (time.perf_counter() - begin)
+
+
+def bench_batch_inserts(manager: DatabaseManager, start: int, count: int, batch_size: int) -> float:
+    """批量写入，返回每秒行数"""
+    begin = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        rows = [make_row(start + offset + i) for i in range(min(batch_size, count - offset))]
+        manager.execute_many(INSERT_SQL, rows)
+    return count / (time.perf_counter() - begin)
+
+
+def bench_lookups(manager: DatabaseManager, total_rows: int, lookups: int, threads: int) -> float:
+    """多线程精确查询，返回每秒查询数"""
+    keys = [make_row(random.randrange(total_rows))[4:] for _ in range(lookups)]
+
+    def lookup(chunk: List[tuple]) -> None:
+        for key, question_hash in chunk:
+            manager.execute_query(LOOKUP_SQL, (question_hash, key), fetch_one=True)
+
+    chunks = [keys[i::threads] for i in range(threads)]
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lookup, chunks))
+    return lookups / (time.perf_counter() - begin)
+
+
+def bench_mixed(manager: DatabaseManager, total_rows: int, seconds: float, threads: int) -> Dict[str, float]:
+    """多线程同时查询和写入（每个线程一个独立连接，模拟多进程部署），返回吞吐量和锁错误数"""
+    stop = time.perf_counter() + seconds
+    counters = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    next_index = [total_rows]
+
+    def worker(writer: bool) -> None:
+        conn = manager.get_connection()
+        reads = writes = locked = 0
+        try:
+            while time.perf_counter() < stop:
+                try:
+                    if writer:
+                        with lock:
+                            index = next_index[0]
+                            next_index[0] += 1
+                        conn.execute(INSERT_SQL, make_row(index))
+                        conn.commit()
+                        writes += 1
+                    else:
+                        key, question_hash = make_row(random.randrange(total_rows))[4:]
+                        conn.execute(LOOKUP_SQL, (question_hash, key)).fetchone()
+                        reads += 1
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    conn.rollback()
+                    locked += 1
+        finally:
+            conn.close()
+        with lock:
+            counters["reads"] += reads
+            counters["writes"] += writes
+            counters["locked"] += locked
+
+    workers = [threading.Thread(target=worker, args=(i % 2 == 0,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return {
+        "reads_per_second": counters["reads"] / seconds,
+        "writes_per_second": counters["writes"] / seconds,
+        "locked": counters["locked"]
+    }
+
+
+def run_profile(profile: str, args: argparse.Namespace) -> Dict[str, float]:
+    """在临时数据库上测试一个PRAGMA预设"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory) / "benchmark.db"
+        manager = DatabaseManager(f"sqlite:///{db_path}", pragmas=resolve_pragmas(settings.database, profile))
+        manager.init_database()
+        try:
+            single = bench_single_inserts(manager, 0, args.single_rows)
+            batch = bench_batch_inserts(manager, args.single_rows, args.rows, args.batch_size)
+            total_rows = args.single_rows + args.rows
+            lookups = bench_lookups(manager, total_rows, args.lookups, args.threads)
+            mixed = bench_mixed(manager, total_rows, args.mixed_seconds, args.threads)
+            wal_path = db_path.with_name(db_path.name + "-wal")
+            wal_size = wal_path.stat().st_size if wal_path.exists() else 0
+        finally:
+            manager.close_all_connections()
+
+    return {
+        "single_insert": single,
+        "batch_insert": batch,
+        "lookup": lookups,
+        "mixed_read": mixed["reads_per_second"],
+        "mixed_write": mixed["writes_per_second"],
+        "locked": mixed["locked"],
+        "wal_mb": wal_size / 1024 / 1024
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据库PRAGMA预设性能测试")
+    parser.add_argument("--profiles", nargs="+", choices=list(PRAGMA_PROFILES), default=list(PRAGMA_PROFILES))
+    parser.add_argument("--single-rows", type=int, default=2000, help="单条写入的行数")
+    parser.add_argument("--rows", type=int, default=100000, help="批量写入的行数")
+    parser.add_argument("--batch-size", type=int, default=settings.database.import_batch_size, help="批量写入每批行数")
+    parser.add_argument("--lookups", type=int, default=50000, help="精确查询次数")
+    parser.add_argument("--threads", type=int, default=4, help="并发线程数")
+    parser.add_argument("--mixed-seconds", type=float, default=3.0, help="并发读写测试时长（秒）")
+    args = parser.parse_args()
+
+    print(f"SQLite {sqlite3.sqlite_version}，单条写入 {args.single_rows} 行，批量写入 {args.rows} 行，"
+          f"查询 {args.lookups} 次，{args.threads} 线程\n")
+    header = f"{'预设':<10}{'单条写入/秒':>12}{'批量写入/秒':>12}{'查询/秒':>12}{'并发读/秒':>12}{'并发写/秒':>12}{'锁错误':>8}{'WAL(MB)':>10}"
+    print(header)
+    print("-" * 96)
+    for profile in args.profiles:
+        result = run_profile(profile, args)
+        print(
+            f"{profile:<12}{result['single_insert']:>14,.0f}{result['batch_insert']:>14,.0f}"
+            f"{result['lookup']:>14,.0f}{result['mixed_read']:>14,.0f}{result['mixed_write']:>14,.0f}"
+            f"{result['locked']:>10}{result['wal_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -5,15 +5,23 @@
 """
 
 from __future__ import annotations
+import io
+import json
 import logging
-from typing import Dict, Any
-from flask import Blueprint, request, jsonify
+import threading
+from typing import Dict, Any, Mapping, Optional, Tuple
+from flask import Blueprint, Response, request, jsonify
+from pydantic import ValidationError as PydanticValidationError
 
 from ...config.settings import settings
 from ...services.qa_service import qa_service
 from ...services.ai_service_manager import ai_service_manager
+from ...services.database_backup import backup_manager
+from ...services.health_monitor import STATUS_HEALTHY, STATUS_UNKNOWN
+from ...services.question_exporter import EXPORT_CONTENT_TYPES, iter_question_export, normalize_export_format
+from ...services.question_importer import detect_import_format
 from ...core.exceptions import GeyagoException, ValidationError, DatabaseError
-from ..schemas.query import QueryRequest, QueryResponse, ErrorResponse
+from ..schemas.query import BatchQueryRequest, QueryRequest, QueryResponse, ErrorResponse
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -76,49 +84,156 @@ def search_answer() -> Dict[str, Any]:
         JSON: 包含查询结果或错误信息的响应
     """
     try:
-        # 解析请求参数
-        query_request = QueryRequest(
-            title=request.args.get('title', '').strip(),
-            options=request.args.get('options', '').strip(),
-            type=request.args.get('type', '').strip()
-        )
-
+        query_request, provider_id, model = _parse_query_args(request.args)
         logger.info(f"收到查询请求: {query_request.title[:50]}...")
 
-        # 获取AI提供商和模型参数
-        provider_id = request.args.get('provider', '').strip()
-        model = request.args.get('model', '').strip()
-
         # 调用业务逻辑
         result = qa_service.query_answer(
             question_text=query_request.title,
             options=query_request.options,
             question_type=query_request.type,
-            provider_id=provider_id if provider_id else None,
-            model=model if model else None
+            provider_id=provider_id,
+            model=model
+        )
+        return _query_success_response(result)
+
+    except Exception as e:
+        body, status = _query_error_response(e)
+        return jsonify(body), status
+
+
+async def search_answer_async(args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+    """
+    查询问题答案的异步实现（ASGI模式下 GET /api/query 使用）
+
+    参数、响应格式和错误处理与 search_answer 相同，等待AI响应时不占用线程。
+
+    Args:
+        args: 查询参数
+
+    Returns:
+        (响应JSON, HTTP状态码)
+    """
+    try:
+        query_request, provider_id, model = _parse_query_args(args)
+        logger.info(f"收到异步查询请求: {query_request.title[:50]}...")
+
+        result = await qa_service.query_answer_async(
+            question_text=query_request.title,
+            options=query_request.options,
+            question_type=query_request.type,
+            provider_id=provider_id,
+            model=model
         )
+        return _query_success_response(result), 200
+
+    except Exception as e:
+        return _query_error_response(e)
+
+
+def _parse_query_args(args: Mapping[str, str]) -> Tuple[QueryRequest, Optional[str], Optional[str]]:
+    """解析查询参数，返回 (查询请求, AI提供商, 模型)"""
+    query_request = QueryRequest(
+        title=args.get('title', '').strip(),
+        options=args.get('options', '').strip(),
+        type=args.get('type', '').strip()
+    )
+
+    # 获取AI提供商和模型参数
+    provider_id = args.get('provider', '').strip()
+    model = args.get('model', '').strip()
+    return query_request, provider_id or None, model or None
+
+
+def _query_success_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """构建查询成功的响应"""
+    return QueryResponse.success_response(
+        code=result['code'],
+        data=result['data'],
+        message=result['msg']
+    ).dict()
+
+
+def _query_error_response(error: Exception) -> Tuple[Dict[str, Any], int]:
+    """将查询异常转换为 (错误响应, HTTP状态码)"""
+    if isinstance(error, ValidationError):
+        logger.warning(f"数据验证错误: {str(error)}")
+        return ErrorResponse.validation_error({"error": str(error)}).dict(), 400
+
+    if isinstance(error, DatabaseError):
+        logger.error(f"数据库错误: {str(error)}")
+        return ErrorResponse.database_error().dict(), 500
 
-        # 返回成功响应
-        return QueryResponse.success_response(
-            code=result['code'],
-            data=result['data'],
-            message=result['msg']
-        ).dict()
+    if isinstance(error, GeyagoException):
+        logger.error(f"应用错误: {str(error)}")
+        return ErrorResponse.error_response(str(error)).dict(), 500
+
+    logger.error(f"未知错误: {str(error)}", exc_info=error)
+    return ErrorResponse(error="服务器内部错误").dict(), 500
+
+
+@query_bp.route('/query/batch', methods=['POST'])
+def search_answers_batch():
+    """
+    批量查询问题答案的API端点
+
+    Request Body (JSON):
+        questions (list, required): 问题列表，每项包含 title、options、type
+        provider (str, optional): 指定AI服务提供商
+        model (str, optional): 指定模型
+        stream (bool, optional): 为true（或请求头 Accept: application/x-ndjson）时
+            以NDJSON流式返回，每完成一个问题输出一行 {"index": 序号, ...}
+
+    Returns:
+        JSON: 与输入顺序一致的结果列表
+    """
+    try:
+        batch_request = BatchQueryRequest(**(request.get_json(silent=True) or {}))
+    except PydanticValidationError as e:
+        errors = [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]
+        return jsonify(ErrorResponse.validation_error({"error": errors}).dict()), 400
+
+    items = [item.dict() for item in batch_request.questions]
+    if len(items) > settings.batch_query.max_items:
+        return jsonify(ErrorResponse.validation_error(
+            {"error": f"单次最多查询 {settings.batch_query.max_items} 个问题"}
+        ).dict()), 400
+
+    provider_id = batch_request.provider or None
+    model = batch_request.model or None
+    logger.info(f"收到批量查询请求: {len(items)} 个问题")
+
+    stream = batch_request.stream or request.accept_mimetypes.best == "application/x-ndjson"
+    if stream:
+        def generate():
+            try:
+                for index, result in qa_service.iter_batch_answers(items, provider_id, model):
+                    yield json.dumps({"index": index, **result}, ensure_ascii=False) + "\n"
+            except Exception as e:
+                logger.error(f"批量查询失败: {str(e)}")
+                yield json.dumps({"index": None, "error": "批量查询失败"}, ensure_ascii=False) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    try:
+        results = qa_service.query_answers_batch(items, provider_id, model)
+        return jsonify({
+            "success": True,
+            "data": {
+                "results": results,
+                "count": len(results)
+            }
+        })
 
     except ValidationError as e:
-        logger.warning(f"数据验证错误: {str(e)}")
         return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
 
     except DatabaseError as e:
         logger.error(f"数据库错误: {str(e)}")
         return jsonify(ErrorResponse.database_error().dict()), 500
 
-    except GeyagoException as e:
-        logger.error(f"应用错误: {str(e)}")
-        return jsonify(ErrorResponse.error_response(str(e)).dict()), 500
-
     except Exception as e:
-        logger.error(f"未知错误: {str(e)}", exc_info=True)
+        logger.error(f"批量查询失败: {str(e)}", exc_info=True)
         return jsonify(ErrorResponse(error="服务器内部错误").dict()), 500
 
 
@@ -154,7 +269,7 @@ def health_check() -> Dict[str, Any]:
         return jsonify({
             "success": True,
             "data": {
-                "status": "healthy",
+                "status": STATUS_HEALTHY,
                 "service": settings.app_name,
                 "version": settings.app_version,
                 "database": stats["service_status"]["database"],
@@ -189,6 +304,44 @@ def get_statistics() -> Dict[str, Any]:
         return jsonify(ErrorResponse.database_error().dict()), 500
 
 
+@query_bp.route('/backup', methods=['GET'])
+def get_backup_status() -> Dict[str, Any]:
+    """
+    获取数据库备份状态
+
+    Returns:
+        JSON: 进行中备份的进度，最近一次备份的耗时和结果
+    """
+    return jsonify({
+        "success": True,
+        "data": backup_manager.get_stats()
+    })
+
+
+@query_bp.route('/backup', methods=['POST'])
+def start_backup() -> Dict[str, Any]:
+    """
+    在后台立即开始一次数据库备份（进度通过 GET /api/backup 查看）
+
+    Returns:
+        JSON: 已开始时返回202，已有备份进行中时返回409
+    """
+    if backup_manager.get_stats()["in_progress"] is not None:
+        return jsonify(ErrorResponse(error="已有备份正在进行").dict()), 409
+
+    def run_backup() -> None:
+        try:
+            backup_manager.backup_now()
+        except Exception as e:
+            logger.error(f"后台备份失败: {str(e)}")
+
+    threading.Thread(target=run_backup, name="database-backup-manual", daemon=True).start()
+    return jsonify({
+        "success": True,
+        "data": {"message": "备份已开始"}
+    }), 202
+
+
 @query_bp.route('/search', methods=['GET'])
 def search_questions() -> Dict[str, Any]:
     """
@@ -205,6 +358,9 @@ def search_questions() -> Dict[str, Any]:
         keyword = request.args.get('q', '').strip()
         limit = int(request.args.get('limit', 10))
 
+        if limit < 1 or limit > 100:
+            limit = 10
+
         if not keyword:
             raise ValidationError("搜索关键词不能为空")
 
@@ -222,7 +378,7 @@ def search_questions() -> Dict[str, Any]:
             }
         })
 
-    except ValueError as e:
+    except ValueError:
         return jsonify(ErrorResponse.validation_error({"error": "limit参数必须是整数"}).dict()), 400
     except ValidationError as e:
         return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
@@ -234,16 +390,18 @@ def search_questions() -> Dict[str, Any]:
 @query_bp.route('/questions', methods=['GET'])
 def get_questions() -> Dict[str, Any]:
     """
-    获取问题列表（分页）
+    获取问题列表（分页，按添加时间倒序）
 
     Query Parameters:
-        page (int, optional): 页码，默认1
+        cursor (str, optional): 上一页返回的 next_cursor，传入时按游标继续（推荐，与翻页深度无关）
+        page (int, optional): 页码，默认1（未传cursor时使用）
         limit (int, optional): 每页数量，默认10
 
     Returns:
-        JSON: 问题列表（分页）
+        JSON: 问题列表（分页），next_cursor 为空表示没有下一页；total 为缓存的题库总数
     """
     try:
+        cursor = request.args.get('cursor', '').strip() or None
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 10))
 
@@ -252,27 +410,25 @@ def get_questions() -> Dict[str, Any]:
         if limit < 1 or limit > 100:
             limit = 10
 
-        questions = qa_service.get_recent_questions(limit * page)
-
-        # 转换为字典格式并分页
-        all_results = [question.to_dict() for question in questions]
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        results = all_results[start_idx:end_idx]
+        questions, next_cursor = qa_service.get_questions_page(limit, cursor=cursor, page=page)
+        results = [question.to_dict() for question in questions]
 
         return jsonify({
             "success": True,
             "data": {
                 "results": results,
                 "count": len(results),
-                "page": page,
+                "page": None if cursor else page,
                 "limit": limit,
-                "total": len(all_results)
+                "total": qa_service.count_questions(),
+                "next_cursor": next_cursor
             }
         })
 
-    except ValueError as e:
+    except ValueError:
         return jsonify(ErrorResponse.validation_error({"error": "page和limit参数必须是整数"}).dict()), 400
+    except ValidationError as e:
+        return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
     except Exception as e:
         logger.error(f"获取问题列表失败: {str(e)}")
         return jsonify(ErrorResponse(error="获取问题列表失败").dict()), 500
@@ -285,14 +441,19 @@ def get_recent_questions() -> Dict[str, Any]:
 
     Query Parameters:
         limit (int, optional): 返回结果数量限制，默认10
+        cursor (str, optional): 上一次返回的 next_cursor，用于继续获取更早的问题
 
     Returns:
         JSON: 最近问题列表
     """
     try:
+        cursor = request.args.get('cursor', '').strip() or None
         limit = int(request.args.get('limit', 10))
 
-        questions = qa_service.get_recent_questions(limit)
+        if limit < 1 or limit > 100:
+            limit = 10
+
+        questions, next_cursor = qa_service.get_questions_page(limit, cursor=cursor)
 
         # 转换为字典格式
         results = [question.to_dict() for question in questions]
@@ -301,12 +462,15 @@ def get_recent_questions() -> Dict[str, Any]:
             "success": True,
             "data": {
                 "results": results,
-                "count": len(results)
+                "count": len(results),
+                "next_cursor": next_cursor
             }
         })
 
-    except ValueError as e:
+    except ValueError:
         return jsonify(ErrorResponse.validation_error({"error": "limit参数必须是整数"}).dict()), 400
+    except ValidationError as e:
+        return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
     except Exception as e:
         logger.error(f"获取最近问题失败: {str(e)}")
         return jsonify(ErrorResponse(error="获取最近问题失败").dict()), 500
@@ -368,20 +532,18 @@ def get_ai_providers() -> Dict[str, Any]:
 
                 # 运行时状态（如果提供商已初始化）
                 "is_initialized": provider_id in ai_service_manager.providers,
-                "health_status": None
+                "health_status": None,
+                "circuit_breaker": ai_service_manager.get_circuit_breaker_status(provider_id),
+                "routing_stats": ai_service_manager.get_routing_stats(provider_id)
             }
 
-            # 如果提供商已初始化，获取健康状态
-            if provider_id in ai_service_manager.providers:
-                try:
-                    provider_obj = ai_service_manager.providers[provider_id]
-                    if hasattr(provider_obj, 'health_check'):
-                        providers_info[provider_id]["health_status"] = provider_obj.health_check()
-                    else:
-                        providers_info[provider_id]["health_status"] = True
-                except Exception as e:
-                    logger.warning(f"获取提供商 {provider_id} 健康状态失败: {str(e)}")
-                    providers_info[provider_id]["health_status"] = False
+            # 如果提供商已初始化，读取缓存的健康状态（不发起模型调用）
+            health = ai_service_manager.get_provider_health(provider_id)
+            if health is not None:
+                providers_info[provider_id]["health_status"] = (
+                    None if health["status"] == STATUS_UNKNOWN else health["status"] == STATUS_HEALTHY
+                )
+                providers_info[provider_id]["health"] = health
 
         return jsonify({
             "success": True,
@@ -687,6 +849,97 @@ def add_question() -> Dict[str, Any]:
         return jsonify(ErrorResponse(error="添加题目失败").dict()), 500
 
 
+@query_bp.route('/questions/export', methods=['GET'])
+def export_questions() -> Response:
+    """
+    流式导出题库（分块传输，内存占用与题库大小无关）
+
+    Query Parameters:
+        format (str, optional): jsonl（ndjson）或 csv，默认jsonl
+        type (str, optional): 只导出该类型的问题
+        since (str, optional): 只导出该时间及之后添加的问题（ISO格式，用于增量导出）
+        until (str, optional): 只导出该时间之前添加的问题（ISO格式）
+        gzip (bool, optional): 是否gzip压缩，默认false
+
+    Returns:
+        文件下载流，可直接用于 POST /api/questions/import 或 geyago import
+    """
+    try:
+        fmt = normalize_export_format(request.args.get('format'))
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        chunks = iter_question_export(
+            fmt=fmt,
+            question_type=request.args.get('type', '').strip() or None,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            compress=compress
+        )
+
+        content_type, extension = EXPORT_CONTENT_TYPES[fmt]
+        filename = f"questions.{extension}"
+        if compress:
+            content_type, filename = "application/gzip", f"{filename}.gz"
+        return Response(
+            chunks,
+            mimetype=content_type,
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    except ValidationError as e:
+        logger.warning(f"数据验证错误: {str(e)}")
+        return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
+    except Exception as e:
+        logger.error(f"导出题库失败: {str(e)}")
+        return jsonify(ErrorResponse(error="导出题库失败").dict()), 500
+
+
+@query_bp.route('/questions/import', methods=['POST'])
+def import_questions() -> Dict[str, Any]:
+    """
+    批量导入题库（流式解析，不整体读入内存）
+
+    Request Body:
+        multipart/form-data 的 file 字段，或直接以请求体上传文件内容
+        （Content-Type 为 application/x-ndjson 或 text/csv）
+
+    Query Parameters:
+        format (str, optional): jsonl 或 csv，默认根据文件名或Content-Type判断
+
+    Returns:
+        JSON: 导入统计（新增、重复、已存在、无效行数和每秒行数）
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            raw_stream = upload.stream
+            fmt = request.args.get('format') or detect_import_format(upload.filename, upload.mimetype)
+        else:
+            raw_stream = request.stream
+            fmt = request.args.get('format') or detect_import_format(None, request.content_type)
+        fmt = fmt.strip().lower()
+
+        # utf-8-sig 兼容Excel导出的带BOM的CSV
+        stream = io.TextIOWrapper(raw_stream, encoding='utf-8-sig', newline='')
+        try:
+            result = qa_service.import_questions(stream, fmt)
+        finally:
+            stream.detach()
+
+        return jsonify({
+            "success": True,
+            "data": result.to_dict()
+        })
+
+    except ValidationError as e:
+        logger.warning(f"数据验证错误: {str(e)}")
+        return jsonify(ErrorResponse.validation_error({"error": str(e)}).dict()), 400
+    except UnicodeDecodeError:
+        return jsonify(ErrorResponse.validation_error({"error": "文件必须是UTF-8编码"}).dict()), 400
+    except Exception as e:
+        logger.error(f"导入题库失败: {str(e)}")
+        return jsonify(ErrorResponse(error="导入题库失败").dict()), 500
+
+
 @query_bp.route('/questions/<int:question_id>', methods=['PUT'])
 def update_question(question_id: int) -> Dict[str, Any]:
     """
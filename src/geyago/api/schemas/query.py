@@ -4,7 +4,7 @@
 使用Pydantic提供数据验证和序列化
 """
 
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 from pydantic import BaseModel, Field, validator
 
 
@@ -27,6 +27,26 @@ class QueryRequest(BaseModel):
         extra = "forbid"
 
 
+class BatchQueryItem(BaseModel):
+    """批量查询中的单个问题（标题为空时该项返回错误结果，不影响其他问题）"""
+    title: str = Field("", description="问题标题")
+    options: Optional[str] = Field("", description="问题选项")
+    type: Optional[str] = Field("", description="问题类型")
+
+    class Config:
+        """Pydantic配置"""
+        str_strip_whitespace = True
+        extra = "ignore"
+
+
+class BatchQueryRequest(BaseModel):
+    """批量查询请求模式"""
+    questions: List[BatchQueryItem] = Field(..., min_length=1, description="问题列表")
+    provider: Optional[str] = Field(None, description="指定AI服务提供商")
+    model: Optional[str] = Field(None, description="指定模型")
+    stream: bool = Field(False, description="是否以NDJSON流式返回（每完成一个问题输出一行）")
+
+
 class QueryResponse(BaseModel):
     """查询响应模式"""
     success: bool = Field(..., description="请求是否成功")
@@ -0,0 +1,112 @@
+"""
+ASGI服务模块
+
+生产环境下以ASGI方式提供服务：GET /api/query 在事件循环中异步等待数据库和AI响应，
+考试高峰期大量请求同时等待大模型时不再为每个请求占用一个线程；
+其余接口仍由原有的Flask应用处理（通过WSGI适配在线程池中运行）。
+
+    geyago --asgi
+    uvicorn geyago.main:create_asgi_app --factory
+"""
+
+from __future__ import annotations
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qsl
+
+from .api.routes.query import search_answer_async
+from .core.exceptions import ConfigurationError
+from .services.ai_service_manager import ai_service_manager
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# 由事件循环原生异步处理的查询接口
+QUERY_PATH = "/api/query"
+
+
+class GeyagoASGIApp:
+    """ASGI应用：查询接口原生异步处理，其余路由转交Flask应用"""
+
+    def __init__(self, wsgi_app: Callable[..., Any]):
+        self.wsgi_app = wsgi_app
+        self._wsgi_fallback: Optional[ASGIApp] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == QUERY_PATH:
+            await self._handle_query(scope, send)
+            return
+
+        await self.get_wsgi_fallback()(scope, receive, send)
+
+    def get_wsgi_fallback(self) -> ASGIApp:
+        """获取包装Flask应用的ASGI适配器（按需创建）"""
+        if self._wsgi_fallback is None:
+            try:
+                from asgiref.wsgi import WsgiToAsgi
+            except ImportError:
+                raise ConfigurationError("ASGI模式需要安装asgiref: pip install geyago[asgi]")
+            self._wsgi_fallback = WsgiToAsgi(self.wsgi_app)
+        return self._wsgi_fallback
+
+    async def _handle_query(self, scope: Scope, send: Send) -> None:
+        """异步处理 GET /api/query"""
+        client = scope.get("client")
+        logger.info(f"收到请求: GET {QUERY_PATH} from {client[0] if client else 'unknown'}")
+
+        body, status = await search_answer_async(self._parse_query_string(scope))
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode("ascii")),
+                (b"access-control-allow-origin", b"*")
+            ]
+        })
+        await send({"type": "http.response.body", "body": payload})
+        logger.info(f"请求完成: {status}")
+
+    @staticmethod
+    def _parse_query_string(scope: Scope) -> Dict[str, str]:
+        """解析查询字符串，同名参数取第一个值（与Flask的 request.args.get 一致）"""
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        args: Dict[str, str] = {}
+        for key, value in parse_qsl(query_string, keep_blank_values=True):
+            args.setdefault(key, value)
+        return args
+
+    @staticmethod
+    async def _lifespan(receive: Receive, send: Send) -> None:
+        """处理服务器启动和关闭事件，关闭时释放事件循环上的异步HTTP客户端"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await ai_service_manager.aclose_providers()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def serve(app: GeyagoASGIApp, host: str, port: int, debug: bool = False) -> None:
+    """使用uvicorn运行ASGI应用"""
+    try:
+        import uvicorn
+    except ImportError:
+        raise ConfigurationError("ASGI模式需要安装uvicorn: pip install geyago[asgi]")
+
+    # 启动前确认依赖齐全，避免运行中才发现其余接口不可用
+    app.get_wsgi_fallback()
+    uvicorn.run(app, host=host, port=port, log_level="debug" if debug else "info")
\ No newline at end of file
@@ -0,0 +1,310 @@
+"""
+命令行工具模块
+
+提供数据库维护等管理命令，不带子命令时启动Web服务：
+
+    geyago                         启动服务
+    geyago --asgi                  以ASGI模式启动服务（uvicorn）
+    geyago serve                   以多进程生产服务器启动服务（gunicorn）
+    geyago migrate [--dry-run]     执行数据库表结构迁移（--dry-run 只列出待执行迁移和估算耗时）
+    geyago rebuild-search-index    重建全文搜索索引
+    geyago import FILE             批量导入JSONL/CSV题库
+    geyago export [-o FILE]        流式导出JSONL/CSV题库
+    geyago backup [-o FILE]        在线备份数据库（分步复制，不阻塞读写）
+"""
+
+from __future__ import annotations
+import argparse
+import gzip
+import logging
+import sqlite3
+import sys
+import time
+from typing import List, Optional
+
+from .config.settings import settings
+from .core.database import db_manager
+from .core.exceptions import ConfigurationError, ValidationError
+from .core.migrations import Migration, MigrationRunner
+from .services.database_backup import BackupInProgressError, backup_manager
+from .services.question_exporter import iter_question_export
+from .services.question_importer import ImportResult, QuestionImporter, detect_import_format
+
+logger = logging.getLogger(__name__)
+
+
+def cmd_migrate(args: argparse.Namespace) -> int:
+    """执行数据库表结构迁移"""
+    runner = MigrationRunner(
+        db_manager,
+        batch_size=args.batch_size or settings.database.migration_batch_size,
+        batch_sleep=settings.database.migration_batch_sleep_ms / 1000
+    )
+    current = runner.current_version()
+    target = runner.head if args.to is None else args.to
+    if target < current:
+        print(f"❌ 不支持回退迁移：当前版本 {current}，目标版本 {target}")
+        return 1
+
+    try:
+        if args.dry_run:
+            plan = runner.plan(target)
+            print(f"当前版本 {current}，目标版本 {target}，待执行 {len(plan)} 个迁移")
+            for item in plan:
+                print(
+                    f"  {item['version']:>3} {item['name']}: {item['description']}"
+                    f"（{item['rows']} 行，预计 {item['estimated_seconds']:.2f} 秒）"
+                )
+            if plan:
+                print(f"预计总耗时 {sum(item['estimated_seconds'] for item in plan):.2f} 秒")
+            return 0
+
+        def report_progress(migration: Migration, done: int) -> None:
+            print(f"\r迁移 {migration.version} {migration.name}: 已回填 {done} 行", end="", flush=True)
+
+        applied = runner.migrate(target, progress=report_progress)
+    except sqlite3.Error as e:
+        print(f"\n❌ 迁移失败: {str(e)}")
+        return 1
+
+    if not applied:
+        print(f"✅ 数据库已是版本 {current}，无需迁移")
+        return 0
+    print()
+    for item in applied:
+        print(f"  {item['version']:>3} {item['name']}: 回填 {item['backfilled']} 行，耗时 {item['duration_seconds']:.2f} 秒")
+    print(f"✅ 迁移完成: 版本 {current} -> {applied[-1]['version']}")
+    return 0
+
+
+def cmd_rebuild_search_index(args: argparse.Namespace) -> int:
+    """重建全文搜索索引"""
+    db_manager.init_database()
+    if not db_manager.search_index_available:
+        print("❌ 当前SQLite不支持FTS5 trigram全文索引（需要3.34及以上版本）")
+        return 1
+
+    start = time.monotonic()
+    count = db_manager.rebuild_search_index()
+    print(f"✅ 全文索引重建完成: {count} 条问题，耗时 {time.monotonic() - start:.2f} 秒")
+    return 0
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    """批量导入题库文件"""
+    def report_progress(result: ImportResult) -> None:
+        print(
+            f"\r已处理 {result.total} 行，新增 {result.inserted} 条，{result.rows_per_second:.0f} 行/秒",
+            end="",
+            flush=True
+        )
+
+    try:
+        compressed = args.file.endswith(".gz")
+        fmt = args.format or detect_import_format(args.file[:-3] if compressed else args.file)
+        db_manager.init_database()
+        importer = QuestionImporter(
+            batch_size=args.batch_size or settings.database.import_batch_size,
+            defer_indexes=not args.no_defer_indexes,
+            progress=report_progress
+        )
+        # utf-8-sig 兼容Excel导出的带BOM的CSV；.gz 文件（如 export --gzip 的输出）边解压边导入
+        opener = gzip.open if compressed else open
+        with opener(args.file, "rt", encoding="utf-8-sig", newline="") as stream:
+            result = importer.run(stream, fmt)
+    except (OSError, ValidationError) as e:
+        print(f"❌ {str(e)}")
+        return 1
+
+    print()
+    print(
+        f"✅ 导入完成: 共 {result.total} 行，新增 {result.inserted} 条，文件内重复 {result.duplicates} 条，"
+        f"题库已存在 {result.existing} 条，无效 {result.invalid} 条，"
+        f"耗时 {result.elapsed:.2f} 秒（{result.rows_per_second:.0f} 行/秒）"
+    )
+    for error in result.errors:
+        print(f"  ⚠️ {error}")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """流式导出题库（未指定输出文件时写到标准输出）"""
+    compress = args.gzip or (args.output or "").endswith(".gz")
+    try:
+        db_manager.init_database()
+        chunks = iter_question_export(
+            fmt=args.format,
+            question_type=args.type,
+            since=args.since,
+            until=args.until,
+            compress=compress
+        )
+        start = time.monotonic()
+        size = 0
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        finally:
+            if args.output:
+                output.close()
+            else:
+                output.flush()
+    except (OSError, ValidationError) as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        return 1
+
+    print(
+        f"✅ 导出完成: {size / 1024 / 1024:.2f} MB，耗时 {time.monotonic() - start:.2f} 秒",
+        file=sys.stderr
+    )
+    return 0
+
+
+def cmd_backup(args: argparse.Namespace) -> int:
+    """在线备份数据库"""
+    def report_progress(done: int, total: int) -> None:
+        percent = done / total * 100 if total else 100.0
+        print(f"\r备份进度: {done}/{total} 页（{percent:.1f}%）", end="", flush=True)
+
+    try:
+        result = backup_manager.backup_now(args.output, progress=report_progress)
+    except (OSError, sqlite3.Error, BackupInProgressError) as e:
+        print(f"\n❌ 备份失败: {str(e)}")
+        return 1
+
+    print()
+    print(
+        f"✅ 备份完成: {result['path']}（{result['size_bytes'] / 1024 / 1024:.2f} MB），"
+        f"耗时 {result['duration_seconds']:.2f} 秒"
+    )
+    if result["restarts"]:
+        print(f"  ⚠️ 备份期间数据库被修改，重新开始 {result['restarts']} 次")
+    for path in result.get("removed", []):
+        print(f"  🗑️ 已清理旧备份: {path}")
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """以多进程生产服务器启动服务"""
+    from .server import run_production_server
+
+    try:
+        return run_production_server(asgi=args.asgi, workers=args.workers)
+    except ConfigurationError as e:
+        print(f"❌ {str(e)}")
+        return 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="geyago",
+        description=f"{settings.app_name} v{settings.app_version}"
+    )
+    parser.add_argument(
+        "--asgi",
+        action="store_true",
+        help="以ASGI模式（uvicorn）启动服务，查询接口异步等待AI响应，需要安装 geyago[asgi]"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="<命令>")
+
+    migrate_parser = subparsers.add_parser(
+        "migrate",
+        help="执行数据库表结构迁移（服务启动时也会自动执行），已执行的版本记录在 schema_version 表"
+    )
+    migrate_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="只列出待执行的迁移及估算的处理行数和耗时，不修改数据库"
+    )
+    migrate_parser.add_argument("--to", type=int, default=None, help="迁移到的版本，默认最新版本")
+    migrate_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="回填数据时每个事务处理的行数，覆盖配置中的 database.migration_batch_size"
+    )
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild-search-index",
+        help="根据问题表重建FTS5全文搜索索引"
+    )
+    rebuild_parser.set_defaults(func=cmd_rebuild_search_index)
+
+    import_parser = subparsers.add_parser(
+        "import",
+        help="批量导入JSONL/CSV题库（字段: question, answer, options, type），已存在的问题跳过"
+    )
+    import_parser.add_argument("file", help="题库文件路径")
+    import_parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        default=None,
+        help="文件格式，默认根据扩展名判断"
+    )
+    import_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="每个事务写入的行数，覆盖配置中的 database.import_batch_size"
+    )
+    import_parser.add_argument(
+        "--no-defer-indexes",
+        action="store_true",
+        help="导入期间逐行维护索引（默认暂停索引维护，导入结束后统一重建）"
+    )
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="流式导出题库，导出的文件可以用 import 命令导入到其他节点"
+    )
+    export_parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="输出文件路径（以 .gz 结尾时自动压缩），默认输出到标准输出"
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=["jsonl", "ndjson", "csv"],
+        default="jsonl",
+        help="导出格式，默认jsonl"
+    )
+    export_parser.add_argument("--type", default=None, help="只导出该类型的问题")
+    export_parser.add_argument("--since", default=None, help="只导出该时间及之后添加的问题（ISO格式，用于增量导出）")
+    export_parser.add_argument("--until", default=None, help="只导出该时间之前添加的问题（ISO格式）")
+    export_parser.add_argument("--gzip", action="store_true", help="gzip压缩输出")
+    export_parser.set_defaults(func=cmd_export)
+
+    backup_parser = subparsers.add_parser(
+        "backup",
+        help="在线备份数据库（参数读取配置文件的 backup 部分），默认写入备份目录并清理旧备份"
+    )
+    backup_parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="备份文件路径，指定时不清理备份目录中的旧备份"
+    )
+    backup_parser.set_defaults(func=cmd_backup)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="以gunicorn多进程服务器启动服务（参数读取配置文件的 server 部分）"
+    )
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker进程数，覆盖配置中的 server.workers"
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    return build_parser().parse_args(argv)
\ No newline at end of file
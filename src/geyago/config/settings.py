@@ -18,11 +18,83 @@ class ServerConfig(BaseModel):
     host: str = Field(default="0.0.0.0", description="服务器监听地址")
     port: int = Field(default=5000, description="服务器端口")
     debug: bool = Field(default=False, description="调试模式")
+    workers: int = Field(default=0, description="生产服务器worker进程数，0表示按CPU核数自动计算（2×核数+1）")
+    threads: int = Field(default=4, description="每个worker的线程数（gthread worker）")
+    worker_class: str = Field(default="gthread", description="worker类型：gthread（多线程）或 asgi（uvicorn worker，查询接口异步处理）")
+    backlog: int = Field(default=2048, description="等待接受的最大连接数")
+    keepalive: int = Field(default=5, description="keep-alive连接等待下一个请求的时间（秒）")
+    timeout: int = Field(default=120, description="worker无响应多久后被重启（秒），应大于AI请求的总超时")
+    graceful_timeout: int = Field(default=30, description="重载或停止时等待worker处理完当前请求的时间（秒）")
+    preload: bool = Field(default=True, description="是否在fork worker之前预加载配置和AI服务提供商")
 
 
 class DatabaseConfig(BaseModel):
     """数据库配置"""
     url: str = Field(default="sqlite:///question_bank.db", description="数据库连接URL")
+    pool_size: int = Field(default=10, description="连接池最大连接数")
+    pool_timeout: float = Field(default=30.0, description="获取连接的最长等待时间（秒）")
+    pool_health_check_interval: float = Field(default=60.0, description="空闲连接借出前做健康检查的间隔（秒）")
+    statement_cache_size: int = Field(default=128, description="每个连接的预编译语句缓存数量")
+    import_batch_size: int = Field(default=5000, description="批量导入时每个事务写入的行数")
+    pragma_profile: str = Field(
+        default="balanced",
+        description="SQLite PRAGMA预设：safe（SQLite默认值）、balanced（推荐）、fast（断电时可能丢失最近的事务）"
+    )
+    synchronous: Optional[str] = Field(default=None, description="覆盖预设的 synchronous：OFF、NORMAL、FULL、EXTRA")
+    cache_size_kb: Optional[int] = Field(default=None, description="覆盖预设的每个连接页缓存大小（KB）")
+    mmap_size: Optional[int] = Field(default=None, description="覆盖预设的内存映射读取大小（字节），0表示不使用")
+    temp_store: Optional[str] = Field(default=None, description="覆盖预设的临时表存储位置：DEFAULT、FILE、MEMORY")
+    busy_timeout_ms: Optional[int] = Field(default=None, description="覆盖预设的数据库被锁定时的最长等待时间（毫秒）")
+    wal_autocheckpoint: Optional[int] = Field(default=None, description="覆盖预设的WAL自动检查点页数，0表示关闭")
+    journal_size_limit: Optional[int] = Field(default=None, description="覆盖预设的检查点后WAL文件保留的最大字节数，-1表示不限制")
+    checkpoint_interval_seconds: float = Field(default=300.0, description="后台WAL检查点间隔（秒），0表示关闭")
+    checkpoint_mode: str = Field(default="PASSIVE", description="后台检查点模式：PASSIVE（不等待读写）、RESTART、TRUNCATE（等待读者并截断WAL）")
+    optimize_interval_seconds: float = Field(default=3600.0, description="后台执行 PRAGMA optimize 的间隔（秒），0表示关闭")
+    migration_batch_size: int = Field(default=1000, description="表结构迁移回填数据时每个事务处理的行数")
+    migration_batch_sleep_ms: float = Field(default=0.0, description="表结构迁移回填时每批之间的休眠时间（毫秒），在线迁移大表时减少对写入的影响")
+
+
+class CacheConfig(BaseModel):
+    """答案缓存配置"""
+    enabled: bool = Field(default=True, description="是否启用进程内答案缓存")
+    max_entries: int = Field(default=10000, description="最大缓存条目数")
+    max_bytes: int = Field(default=64 * 1024 * 1024, description="缓存最大占用字节数")
+    ttl_seconds: float = Field(default=3600, description="缓存过期时间（秒），0表示不过期")
+    count_cache_seconds: float = Field(default=5.0, description="题库总数的缓存时间（秒），0表示每次都重新统计")
+
+
+class FuzzyMatchConfig(BaseModel):
+    """模糊匹配配置"""
+    enabled: bool = Field(default=True, description="精确匹配失败后、调用AI之前是否尝试模糊匹配题库")
+    threshold: float = Field(default=0.85, description="模糊匹配的最低相似度（0-1）")
+    candidate_limit: int = Field(default=20, description="从全文索引召回的候选问题数量")
+    min_length: int = Field(default=6, description="标准化后短于该长度的问题不做模糊匹配")
+
+
+class BatchQueryConfig(BaseModel):
+    """批量查询配置"""
+    max_items: int = Field(default=200, description="单次批量查询的最大问题数")
+    max_workers: int = Field(default=8, description="批量查询中并发调用AI的最大线程数")
+    prompt_batching: bool = Field(default=True, description="批量查询未命中的问题是否合并到同一个AI请求中回答")
+
+
+class WriteBehindConfig(BaseModel):
+    """AI答案后台写入配置"""
+    enabled: bool = Field(default=True, description="是否在后台批量写入AI答案（关闭时在请求内同步写入）")
+    flush_interval_ms: int = Field(default=50, description="最长多久写入一次（毫秒）")
+    batch_size: int = Field(default=100, description="累计多少条答案立即写入")
+    max_queue_size: int = Field(default=10000, description="队列最大长度，队列满时退回同步写入")
+
+
+class BackupConfig(BaseModel):
+    """数据库在线备份配置"""
+    enabled: bool = Field(default=False, description="是否在后台定时备份数据库")
+    directory: str = Field(default="backups", description="备份文件目录")
+    interval_hours: float = Field(default=24.0, description="定时备份的间隔（小时）")
+    keep: int = Field(default=7, description="保留的备份文件数量，0表示不清理")
+    pages_per_step: int = Field(default=1024, description="每一步复制的页数，-1表示一次复制全部")
+    step_sleep_ms: int = Field(default=10, description="每一步之间的休眠时间（毫秒），让出数据库给查询和写入")
+    max_restarts: int = Field(default=3, description="备份期间数据库被修改导致重新开始的最大次数，超过后在一个读事务中复制剩余页")
 
 
 class LoggingConfig(BaseModel):
@@ -41,9 +113,53 @@ class AppConfig(BaseModel):
 
 class APIConfig(BaseModel):
     """API配置"""
-    timeout: int = Field(default=30, description="API请求超时时间（秒）")
+    timeout: int = Field(default=30, description="API请求总超时时间（秒，包含所有重试）")
     max_retries: int = Field(default=3, description="最大重试次数")
     retry_delay: int = Field(default=2, description="重试延迟时间（秒）")
+    max_retry_delay: float = Field(default=10.0, description="单次重试等待的上限（秒）")
+    retry_jitter: float = Field(default=0.5, description="重试等待的随机抖动比例（0-1）")
+    attempt_timeout: Optional[float] = Field(default=None, description="单次请求超时（秒），为空时使用剩余的总超时预算")
+    pool_connections: int = Field(default=10, description="每个AI服务会话缓存的主机连接池数量")
+    pool_maxsize: int = Field(default=20, description="每个主机保持的最大keep-alive连接数")
+    batch_size: int = Field(default=10, description="批量答题时每次请求包含的最大题目数")
+    batch_retries: int = Field(default=1, description="批量答题中解析失败的题目最多重试的轮数")
+    async_max_connections: int = Field(default=100, description="异步接口每个AI服务、每个事件循环的最大连接数")
+
+
+class CircuitBreakerConfig(BaseModel):
+    """AI服务熔断器配置"""
+    enabled: bool = Field(default=True, description="是否启用熔断器")
+    failure_threshold: int = Field(default=3, description="连续失败多少次后熔断")
+    recovery_timeout: float = Field(default=30.0, description="熔断后多久发起后台探测（秒）")
+
+
+class RoutingConfig(BaseModel):
+    """AI服务路由配置"""
+    mode: str = Field(default="default", description="路由模式：default（默认提供商+故障转移）或 adaptive（按延迟和成功率选择）")
+    latency_weight: float = Field(default=1.0, description="EWMA延迟（秒）在路由得分中的权重")
+    failure_penalty: float = Field(default=10.0, description="失败率在路由得分中的惩罚（秒）")
+    exploration_ratio: float = Field(default=0.05, description="随机探索其他提供商的请求比例")
+    ewma_alpha: float = Field(default=0.2, description="EWMA平滑系数（0-1，越大越看重最近的样本）")
+
+
+class HedgingConfig(BaseModel):
+    """对冲请求配置"""
+    enabled: bool = Field(default=False, description="是否启用对冲请求（首选提供商迟迟未返回时向备用提供商再发一次请求）")
+    percentile: float = Field(default=0.9, description="按首选提供商延迟的该分位数作为对冲延迟")
+    min_samples: int = Field(default=20, description="使用分位数延迟所需的最少延迟样本数")
+    delay_seconds: float = Field(default=2.0, description="样本不足时使用的对冲延迟（秒）")
+    min_delay_seconds: float = Field(default=0.2, description="对冲延迟下限（秒）")
+    max_hedge_ratio: float = Field(default=0.1, description="对冲请求占查询总数的最大比例，限制额外开销")
+    max_workers: int = Field(default=32, description="执行对冲请求的最大线程数")
+
+
+class HealthCheckConfig(BaseModel):
+    """AI服务健康检查配置"""
+    enabled: bool = Field(default=True, description="是否启用后台健康检查")
+    interval_seconds: float = Field(default=30.0, description="后台检查间隔（秒）")
+    ttl_seconds: float = Field(default=120.0, description="健康状态有效期（秒），超过后由后台重新探测")
+    probe_timeout: float = Field(default=5.0, description="轻量级探测请求超时时间（秒）")
+    failure_threshold: int = Field(default=3, description="真实请求连续失败多少次后标记为不健康")
 
 
 class AIProviderConfig(BaseModel):
@@ -71,9 +187,18 @@ class Settings(BaseSettings):
     # 子配置
     server: ServerConfig = Field(default_factory=ServerConfig)
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    fuzzy_match: FuzzyMatchConfig = Field(default_factory=FuzzyMatchConfig)
+    batch_query: BatchQueryConfig = Field(default_factory=BatchQueryConfig)
+    write_behind: WriteBehindConfig = Field(default_factory=WriteBehindConfig)
+    backup: BackupConfig = Field(default_factory=BackupConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     app: AppConfig = Field(default_factory=AppConfig)
     api_config: APIConfig = Field(default_factory=APIConfig)
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig)
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    health_check: HealthCheckConfig = Field(default_factory=HealthCheckConfig)
     ai_providers: Dict[str, AIProviderConfig] = Field(default_factory=dict)
 
     def __init__(self, **data):
@@ -94,12 +219,30 @@ class Settings(BaseSettings):
                     self.server = ServerConfig(**config_data['server'])
                 if 'database' in config_data:
                     self.database = DatabaseConfig(**config_data['database'])
+                if 'cache' in config_data:
+                    self.cache = CacheConfig(**config_data['cache'])
+                if 'fuzzy_match' in config_data:
+                    self.fuzzy_match = FuzzyMatchConfig(**config_data['fuzzy_match'])
+                if 'batch_query' in config_data:
+                    self.batch_query = BatchQueryConfig(**config_data['batch_query'])
+                if 'write_behind' in config_data:
+                    self.write_behind = WriteBehindConfig(**config_data['write_behind'])
+                if 'backup' in config_data:
+                    self.backup = BackupConfig(**config_data['backup'])
                 if 'logging' in config_data:
                     self.logging = LoggingConfig(**config_data['logging'])
                 if 'app' in config_data:
                     self.app = AppConfig(**config_data['app'])
                 if 'api_config' in config_data:
                     self.api_config = APIConfig(**config_data['api_config'])
+                if 'circuit_breaker' in config_data:
+                    self.circuit_breaker = CircuitBreakerConfig(**config_data['circuit_breaker'])
+                if 'routing' in config_data:
+                    self.routing = RoutingConfig(**config_data['routing'])
+                if 'hedging' in config_data:
+                    self.hedging = HedgingConfig(**config_data['hedging'])
+                if 'health_check' in config_data:
+                    self.health_check = HealthCheckConfig(**config_data['health_check'])
                 if 'ai_providers' in config_data:
                     self.ai_providers = {
                         provider_id: AIProviderConfig(**provider_config)
@@ -110,6 +253,10 @@ class Settings(BaseSettings):
                 print(f"加载JSON配置失败: {str(e)}")
                 print("使用默认配置")
 
+    def reload(self) -> None:
+        """重新读取JSON配置文件（如收到SIGHUP时）"""
+        self._load_from_json()
+
     def save_to_json(self):
         """保存配置到JSON文件"""
         config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "..", "config.json")
@@ -117,9 +264,18 @@ class Settings(BaseSettings):
         config_data = {
             "server": self.server.model_dump(),
             "database": self.database.model_dump(),
+            "cache": self.cache.model_dump(),
+            "fuzzy_match": self.fuzzy_match.model_dump(),
+            "batch_query": self.batch_query.model_dump(),
+            "write_behind": self.write_behind.model_dump(),
+            "backup": self.backup.model_dump(),
             "logging": self.logging.model_dump(),
             "app": self.app.model_dump(),
             "api_config": self.api_config.model_dump(),
+            "circuit_breaker": self.circuit_breaker.model_dump(),
+            "routing": self.routing.model_dump(),
+            "hedging": self.hedging.model_dump(),
+            "health_check": self.health_check.model_dump(),
             "ai_providers": {
                 provider_id: provider.model_dump()
                 for provider_id, provider in self.ai_providers.items()
@@ -0,0 +1,212 @@
+"""
+SQLite连接池模块
+
+维护一组可复用的数据库连接，避免每次查询都重新建立连接和执行PRAGMA
+"""
+
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Any, Iterator, Tuple
+
+
+class ConnectionPool:
+    """有界SQLite连接池
+
+    连接按需创建，归还后放回空闲队列（后进先出，优先复用最热的连接）。
+    空闲时间超过 health_check_interval 的连接在借出前会先做一次健康检查。
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], sqlite3.Connection],
+        max_size: int = 10,
+        timeout: float = 30.0,
+        health_check_interval: float = 60.0
+    ):
+        self._connection_factory = connection_factory
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle: Deque[Tuple[sqlite3.Connection, float]] = deque()
+        # 连接id -> 创建时的代次，close_all() 之后旧代次的连接归还时直接关闭
+        self._generations: Dict[int, int] = {}
+        self._size = 0
+        self._in_use = 0
+        self._generation = 0
+
+        # 统计信息
+        self._acquire_count = 0
+        self._wait_count = 0
+        self._timeout_count = 0
+        self._created_count = 0
+        self._discarded_count = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._max_in_use = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        """从连接池借出一个连接"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        idle_entry = None
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    idle_entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeout_count += 1
+                    raise ConnectionError(f"获取数据库连接超时（{self.timeout}秒）")
+                waited = True
+                self._condition.wait(remaining)
+
+            self._in_use += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+            self._acquire_count += 1
+            generation = self._generation
+
+        try:
+            if idle_entry is None:
+                conn = self._create_connection(generation)
+            else:
+                conn, last_used = idle_entry
+                idle_seconds = time.monotonic() - last_used
+                if idle_seconds > self.health_check_interval and not self._is_healthy(conn):
+                    with self._condition:
+                        self._generations.pop(id(conn), None)
+                        self._discarded_count += 1
+                    self._close_quietly(conn)
+                    conn = self._create_connection(generation)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        wait_time = time.monotonic() - start
+        with self._condition:
+            if waited:
+                self._wait_count += 1
+            self._total_wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        """归还连接到连接池"""
+        if not discard:
+            try:
+                # 未提交的事务不能带回池中
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        with self._condition:
+            self._in_use -= 1
+            stale = self._generations.get(id(conn)) != self._generation
+            if discard or stale:
+                self._generations.pop(id(conn), None)
+                self._size -= 1
+                if discard:
+                    self._discarded_count += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._condition.notify()
+
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """借出连接的上下文管理器，退出时自动归还"""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except sqlite3.ProgrammingError:
+            # 连接已关闭等不可恢复的错误，直接丢弃
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close_all(self) -> int:
+        """关闭所有空闲连接，正在使用的连接在归还时关闭
+
+        Returns:
+            立即关闭的连接数量
+        """
+        with self._condition:
+            self._generation += 1
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            for conn, _ in idle:
+                self._generations.pop(id(conn), None)
+            self._condition.notify_all()
+
+        for conn, _ in idle:
+            self._close_quietly(conn)
+        return len(idle)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_in_use": self._max_in_use,
+                "acquire_count": self._acquire_count,
+                "wait_count": self._wait_count,
+                "timeout_count": self._timeout_count,
+                "created_count": self._created_count,
+                "discarded_count": self._discarded_count,
+                "total_wait_ms": round(self._total_wait_time * 1000, 3),
+                "avg_wait_ms": round(
+                    self._total_wait_time * 1000 / self._acquire_count, 3
+                ) if self._acquire_count else 0.0,
+                "max_wait_ms": round(self._max_wait_time * 1000, 3)
+            }
+
+    def _create_connection(self, generation: int) -> sqlite3.Connection:
+        """创建新连接并标记所属代次"""
+        conn = self._connection_factory()
+        with self._condition:
+            self._generations[id(conn)] = generation
+            self._created_count += 1
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """检查连接是否可用"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: sqlite3.Connection) -> None:
+        """关闭连接并忽略错误"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
\ No newline at end of file
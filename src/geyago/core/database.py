@@ -5,21 +5,145 @@
 """
 
 from __future__ import annotations
+import logging
 import sqlite3
-from typing import Optional, Any, List, Dict
+import time
+from typing import Callable, Optional, Any, List, Dict
 from contextlib import contextmanager
 from pathlib import Path
 
 from ..config.settings import settings
+from .exceptions import ConfigurationError
+from .connection_pool import ConnectionPool
+from .migrations import MigrationRunner
+
+logger = logging.getLogger(__name__)
+
+# 全文索引表（trigram分词，支持中文子串匹配）
+SEARCH_INDEX_TABLE = "question_answer_fts"
+
+# 保持全文索引与问题表同步的触发器
+SEARCH_INDEX_TRIGGERS = (
+    "question_answer_fts_insert",
+    "question_answer_fts_delete",
+    "question_answer_fts_update"
+)
+
+# 批量写入期间暂停维护的二级索引
+DEFERRED_INDEXES = (
+    "idx_question_answer_type",
+    "idx_question_answer_created_at_id"
+)
+
+# INSERT/UPDATE ... RETURNING 需要SQLite 3.35及以上版本
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+# PRAGMA预设（每个连接建立时设置一次）
+# - safe: SQLite默认的同步和缓存设置
+# - balanced: WAL模式下 synchronous=NORMAL 不会损坏数据库，断电时可能丢失最后几个事务
+# - fast: 不等待落盘，仅适合可以从备份或导出文件重建的场景（如批量导入）
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "safe": {
+        "synchronous": "FULL",
+        "cache_size_kb": 2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout_ms": 5000,
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": -1
+    },
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size_kb": 32768,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout_ms": 5000,
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 64 * 1024 * 1024
+    },
+    "fast": {
+        "synchronous": "OFF",
+        "cache_size_kb": 131072,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout_ms": 5000,
+        "wal_autocheckpoint": 10000,
+        "journal_size_limit": 256 * 1024 * 1024
+    }
+}
+
+# 取值为关键字的PRAGMA及其可选值
+PRAGMA_KEYWORDS = {
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY")
+}
+
+# 后台检查点可选模式
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+def resolve_pragmas(database_config: Any, profile: Optional[str] = None) -> Dict[str, Any]:
+    """根据预设和单项覆盖计算连接的PRAGMA设置
+
+    Args:
+        database_config: 数据库配置（DatabaseConfig）
+        profile: 预设名称，默认使用配置中的 pragma_profile
+
+    Returns:
+        PRAGMA名称 -> 值
+
+    Raises:
+        ConfigurationError: 预设或取值无效
+    """
+    profile = profile or database_config.pragma_profile
+    if profile not in PRAGMA_PROFILES:
+        raise ConfigurationError(f"不支持的PRAGMA预设: {profile}，可选: {', '.join(PRAGMA_PROFILES)}")
+
+    options = dict(PRAGMA_PROFILES[profile])
+    for name in options:
+        value = getattr(database_config, name, None)
+        if value is not None:
+            options[name] = value
+
+    pragmas: Dict[str, Any] = {}
+    for name, value in options.items():
+        if name in PRAGMA_KEYWORDS:
+            value = str(value).upper()
+            if value not in PRAGMA_KEYWORDS[name]:
+                raise ConfigurationError(f"{name} 的取值无效: {value}，可选: {', '.join(PRAGMA_KEYWORDS[name])}")
+            pragmas[name] = value
+        elif name == "cache_size_kb":
+            # 负数表示以KB为单位
+            pragmas["cache_size"] = -abs(int(value))
+        elif name == "busy_timeout_ms":
+            pragmas["busy_timeout"] = int(value)
+        else:
+            pragmas[name] = int(value)
+    return pragmas
+
+
+class _BackupRestartLimit(Exception):
+    """分步备份重新开始的次数超过上限"""
 
 
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, pragmas: Optional[Dict[str, Any]] = None):
         self.database_url = database_url or settings.database.url
-        self.db_path = Path(settings.database_path)
+        self.db_path = Path(self.database_url.replace("sqlite:///", ""))
         self._ensure_database_directory()
+        # 每个连接建立时设置的PRAGMA
+        self.pragmas = pragmas if pragmas is not None else resolve_pragmas(settings.database)
+        # 当前SQLite是否支持FTS5 trigram全文索引（init_database 时检测）
+        self.search_index_available = False
+        self._pool = ConnectionPool(
+            self.get_connection,
+            max_size=settings.database.pool_size,
+            timeout=settings.database.pool_timeout,
+            health_check_interval=settings.database.pool_health_check_interval
+        )
 
     def _ensure_database_directory(self) -> None:
         """确保数据库目录存在"""
@@ -27,60 +151,97 @@ class DatabaseManager:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
     def get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
+        """创建新的数据库连接（连接池通过此方法建立连接）"""
         try:
             conn = sqlite3.connect(
                 self.database_url.replace("sqlite:///", ""),
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=settings.database.statement_cache_size
             )
             conn.row_factory = sqlite3.Row
             # 启用外键约束
             conn.execute("PRAGMA foreign_keys = ON")
             # 设置WAL模式提高并发性能
             conn.execute("PRAGMA journal_mode = WAL")
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
             return conn
         except Exception as e:
             raise ConnectionError(f"数据库连接失败: {str(e)}")
 
     @contextmanager
     def get_cursor(self) -> sqlite3.Cursor:
-        """获取数据库游标的上下文管理器"""
-        conn = self.get_connection()
-        try:
+        """获取数据库游标的上下文管理器（连接从连接池借出，退出时归还）"""
+        with self._pool.connection() as conn:
             cursor = conn.cursor()
-            yield cursor
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
 
     def init_database(self) -> None:
-        """初始化数据库表结构"""
+        """初始化数据库表结构：执行未执行的迁移，已是最新版本时不执行任何DDL
+
+        同时检查已执行迁移创建的索引和触发器，缺失时（如批量导入期间进程被杀死）重新创建
+        """
+        runner = self._migration_runner()
+        if runner.pending():
+            runner.migrate()
+        runner.repair()
+        self.load_schema_state()
+
+    def load_schema_state(self) -> None:
+        """读取已迁移数据库的状态而不执行任何DDL（多进程服务器的worker使用，迁移由主进程在fork之前完成）"""
+        self.search_index_available = self.table_exists(SEARCH_INDEX_TABLE)
+
+    def _migration_runner(self) -> MigrationRunner:
+        """按配置创建迁移执行器"""
+        return MigrationRunner(
+            self,
+            batch_size=settings.database.migration_batch_size,
+            batch_sleep=settings.database.migration_batch_sleep_ms / 1000
+        )
+
+    @contextmanager
+    def deferred_indexes(self):
+        """批量导入期间暂停二级索引和全文索引的逐行维护，结束后一次性重建
+
+        去重依赖的 question_hash 索引保持不变；结束时按迁移中的定义重新创建索引和触发器并重建全文索引，
+        导入期间其他进程写入的数据也会补上。进程在导入期间被杀死时由下次启动的 init_database 补上
+        """
+        with self.get_cursor() as cursor:
+            for index in DEFERRED_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {index}")
+            for trigger in SEARCH_INDEX_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        logger.info("批量写入期间暂停二级索引和全文索引维护")
+
+        try:
+            yield
+        finally:
+            self._migration_runner().repair()
+            logger.info("二级索引和全文索引已重建")
+
+    def rebuild_search_index(self) -> int:
+        """根据问题表重建全文索引（用于已有数据库或索引损坏时）
+
+        Returns:
+            索引的问题数量
+        """
+        if not self.search_index_available:
+            raise RuntimeError("当前SQLite不支持FTS5 trigram全文索引")
+
         with self.get_cursor() as cursor:
-            # 创建问题答案表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS question_answer (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    question TEXT NOT NULL,
-                    answer TEXT NOT NULL,
-                    options TEXT,
-                    type TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # 创建索引提高查询性能
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_question_answer_question
-                ON question_answer(question)
-            ''')
-
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_question_answer_type
-                ON question_answer(type)
-            ''')
+            cursor.execute(f"INSERT INTO {SEARCH_INDEX_TABLE}({SEARCH_INDEX_TABLE}) VALUES ('rebuild')")
+            cursor.execute("SELECT COUNT(*) AS count FROM question_answer")
+            count = cursor.fetchone()['count']
+
+        logger.info(f"全文索引重建完成，共 {count} 条问题")
+        return count
 
     def execute_query(
         self,
@@ -100,10 +261,15 @@ class DatabaseManager:
 
             return cursor.lastrowid
 
-    def execute_many(self, query: str, params_list: List[tuple]) -> None:
-        """批量执行语句"""
+    def execute_many(self, query: str, params_list: List[tuple]) -> int:
+        """批量执行语句（在同一个事务中提交）
+
+        Returns:
+            影响的行数
+        """
         with self.get_cursor() as cursor:
             cursor.executemany(query, params_list)
+            return max(cursor.rowcount, 0)
 
     def table_exists(self, table_name: str) -> bool:
         """检查表是否存在"""
@@ -120,20 +286,125 @@ class DatabaseManager:
             cursor.execute(f"PRAGMA table_info({table_name})")
             return [dict(row) for row in cursor.fetchall()]
 
-    def backup_database(self, backup_path: str) -> None:
-        """备份数据库"""
-        source = sqlite3.connect(self.database_url.replace("sqlite:///", ""))
-        backup = sqlite3.connect(backup_path)
+    def backup_database(
+        self,
+        backup_path: str,
+        pages_per_step: int = -1,
+        step_sleep: float = 0.0,
+        max_restarts: int = 3,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """在线备份数据库
+
+        每步只复制 pages_per_step 页并在步与步之间休眠 step_sleep 秒，读锁只在每一步内持有，
+        查询和写入不会被整个复制过程阻塞。其他连接在备份期间写入会使SQLite从头开始复制，
+        重新开始超过 max_restarts 次后在一个读事务中复制剩余页（WAL模式下读事务不阻塞写入）。
+
+        备份先写入临时文件，完成后原子替换为 backup_path，并切换为DELETE日志模式，
+        得到不依赖 -wal 文件的独立数据库文件。
+
+        Args:
+            backup_path: 备份文件路径
+            pages_per_step: 每一步复制的页数，-1表示一次复制全部
+            step_sleep: 每一步之间的休眠时间（秒）
+            max_restarts: 分步复制的最大重新开始次数
+            progress: 进度回调，参数为 (已复制页数, 总页数)
+
+        Returns:
+            备份统计：页数、重新开始次数、是否退回一次性复制、检查点结果
+        """
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"数据库文件不存在: {self.db_path}")
+
+        target = Path(backup_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".partial")
+        state = {"remaining": None, "total": 0, "restarts": 0, "limit": max_restarts}
+
+        def on_progress(status: int, remaining: int, total: int) -> None:
+            # 剩余页数变多说明源数据库被修改，SQLite已从头开始复制
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["limit"] is not None and state["restarts"] > state["limit"]:
+                    raise _BackupRestartLimit()
+            state["remaining"], state["total"] = remaining, total
+            if progress is not None:
+                progress(total - remaining, total)
+            if remaining and step_sleep > 0:
+                time.sleep(step_sleep)
+
+        source = sqlite3.connect(str(self.db_path))
         try:
-            source.backup(backup)
+            # 先将WAL中的页写回主库（PASSIVE模式不等待其他读写连接），备份时从WAL读取的页更少
+            checkpoint = source.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            fallback = False
+            backup = sqlite3.connect(str(partial))
+            try:
+                try:
+                    source.backup(backup, pages=pages_per_step, progress=on_progress)
+                except _BackupRestartLimit:
+                    logger.warning(f"备份期间数据库被频繁修改（重新开始 {max_restarts} 次），改为一次复制剩余页")
+                    fallback = True
+                    state["limit"] = None
+                    state["remaining"] = None
+                    source.backup(backup, pages=-1, progress=on_progress)
+                backup.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                backup.close()
+            partial.replace(target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
         finally:
             source.close()
-            backup.close()
+
+        return {
+            "pages": state["total"],
+            "restarts": state["restarts"],
+            "fallback": fallback,
+            "wal_checkpoint": {"busy": checkpoint[0], "wal_pages": checkpoint[1], "checkpointed": checkpoint[2]}
+        }
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Dict[str, int]:
+        """执行WAL检查点，将WAL中的页写回主库
+
+        Args:
+            mode: PASSIVE（不等待其他连接）、FULL、RESTART 或 TRUNCATE（等待读者后截断WAL文件）
+
+        Returns:
+            busy: 是否因其他连接未能完成；wal_pages: WAL中的页数；checkpointed: 已写回的页数
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ConfigurationError(f"不支持的检查点模式: {mode}，可选: {', '.join(CHECKPOINT_MODES)}")
+
+        with self.get_cursor() as cursor:
+            cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, wal_pages, checkpointed = cursor.fetchone()
+        return {"busy": busy, "wal_pages": wal_pages, "checkpointed": checkpointed}
+
+    def optimize(self) -> None:
+        """执行 PRAGMA optimize，按需更新查询规划器的统计信息"""
+        with self.get_cursor() as cursor:
+            cursor.execute("PRAGMA optimize")
+
+    def get_pragma_values(self) -> Dict[str, Any]:
+        """读取连接上实际生效的PRAGMA值"""
+        with self.get_cursor() as cursor:
+            values = {}
+            for name in ("journal_mode", *self.pragmas):
+                cursor.execute(f"PRAGMA {name}")
+                row = cursor.fetchone()
+                values[name] = row[0] if row else None
+            return values
 
     def close_all_connections(self) -> None:
-        """关闭所有数据库连接（SQLite特性）"""
-        # SQLite会自动管理连接，这里可以实现连接池管理
-        pass
+        """关闭连接池中的所有连接（使用中的连接在归还时关闭）"""
+        self._pool.close_all()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        return self._pool.get_stats()
 
 
 # 全局数据库管理器实例
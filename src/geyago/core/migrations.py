@@ -0,0 +1,471 @@
+"""
+数据库表结构迁移模块
+
+按版本号顺序执行迁移，已执行的版本记录在 schema_version 表中：
+
+- 每个迁移的DDL在一个事务中执行，并且可以重复执行（IF NOT EXISTS / 检查列是否存在），
+  迁移在回填途中中断时重新执行即可继续
+- 大表的数据回填分批进行，每批单独提交，批与批之间可以休眠，不长时间占用写锁
+- 已是最新版本时启动过程不执行任何DDL；已执行迁移创建的对象缺失时重新执行该迁移补上
+  （如批量导入暂停索引维护期间进程被杀死，或执行迁移时SQLite还不支持FTS5）
+- dry-run 在回滚的事务中处理少量样本行，按样本耗时估算每个待执行迁移的耗时
+"""
+
+from __future__ import annotations
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.helpers import build_question_key, hash_question_key
+
+if TYPE_CHECKING:
+    from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 迁移版本记录表
+SCHEMA_VERSION_TABLE = "schema_version"
+
+# dry-run 估算耗时时处理的样本行数
+ESTIMATE_SAMPLE_ROWS = 1000
+
+# 与 database.SEARCH_INDEX_TABLE / SEARCH_INDEX_TRIGGERS 一致（迁移中的表结构保持为编写时的状态）
+FTS_TABLE = "question_answer_fts"
+FTS_TRIGGERS = ("question_answer_fts_insert", "question_answer_fts_delete", "question_answer_fts_update")
+
+
+@dataclass(frozen=True)
+class Migration:
+    """一个表结构迁移
+
+    Attributes:
+        version: 版本号（从1开始递增）
+        name: 迁移名称
+        description: 迁移说明
+        apply: 在一个事务中执行的DDL，必须可以重复执行
+        backfill: 分批回填数据，参数为 (游标, 每批行数, 上一批最后一行的id)，
+            返回 (本批处理的行数, 本批最后一行的id)，处理行数为0表示完成
+        pending_rows: 需要处理的行数（用于估算耗时）
+        sample: 处理最多N行的代表性工作（在回滚的事务中执行，用于估算耗时）
+        objects: 迁移创建的表、索引和触发器名称，启动时检查，缺失时重新执行 apply
+    """
+    version: int
+    name: str
+    description: str
+    apply: Callable[[sqlite3.Cursor], None]
+    backfill: Optional[Callable[[sqlite3.Cursor, int, int], Tuple[int, int]]] = None
+    pending_rows: Optional[Callable[[sqlite3.Cursor], int]] = None
+    sample: Optional[Callable[[sqlite3.Cursor, int], int]] = None
+    objects: Tuple[str, ...] = ()
+
+
+def _count_rows(cursor: sqlite3.Cursor) -> int:
+    """问题表总行数"""
+    cursor.execute("SELECT COUNT(*) FROM question_answer")
+    return cursor.fetchone()[0]
+
+
+def _columns(cursor: sqlite3.Cursor) -> set:
+    """问题表的列名"""
+    cursor.execute("PRAGMA table_info(question_answer)")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _scan_rows(cursor: sqlite3.Cursor, limit: int) -> int:
+    """读取最多 limit 行问题（估算建索引等全表扫描的耗时）"""
+    cursor.execute("SELECT id, question, answer, options, type, created_at FROM question_answer LIMIT ?", (limit,))
+    return len(cursor.fetchall())
+
+
+# 1. 初始表结构
+def _apply_initial_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS question_answer (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            options TEXT,
+            type TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_answer_type
+        ON question_answer(type)
+    ''')
+
+
+# 2. 标准化问题和哈希列
+def _apply_question_hash(cursor: sqlite3.Cursor) -> None:
+    columns = _columns(cursor)
+    if 'normalized_question' not in columns:
+        cursor.execute("ALTER TABLE question_answer ADD COLUMN normalized_question TEXT")
+    if 'question_hash' not in columns:
+        cursor.execute("ALTER TABLE question_answer ADD COLUMN question_hash INTEGER")
+
+    # 精确匹配走定长哈希索引，不再在长文本列上建B树索引
+    cursor.execute("DROP INDEX IF EXISTS idx_question_answer_question")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_answer_question_hash
+        ON question_answer(question_hash)
+    ''')
+
+
+def _backfill_question_hash(cursor: sqlite3.Cursor, batch_size: int, after_id: int) -> Tuple[int, int]:
+    cursor.execute(
+        "SELECT id, question FROM question_answer WHERE question_hash IS NULL AND id > ? ORDER BY id LIMIT ?",
+        (after_id, batch_size)
+    )
+    rows = cursor.fetchall()
+    updates = []
+    for row in rows:
+        key = build_question_key(row[1])
+        updates.append((key, hash_question_key(key), row[0]))
+    cursor.executemany(
+        "UPDATE question_answer SET normalized_question = ?, question_hash = ? WHERE id = ?",
+        updates
+    )
+    return len(rows), rows[-1][0] if rows else after_id
+
+
+def _pending_question_hash(cursor: sqlite3.Cursor) -> int:
+    if 'question_hash' not in _columns(cursor):
+        return _count_rows(cursor)
+    cursor.execute("SELECT COUNT(*) FROM question_answer WHERE question_hash IS NULL")
+    return cursor.fetchone()[0]
+
+
+def _sample_question_hash(cursor: sqlite3.Cursor, limit: int) -> int:
+    _apply_question_hash(cursor)
+    return _backfill_question_hash(cursor, limit, 0)[0]
+
+
+# 3. FTS5 trigram 全文索引
+def _apply_full_text_search(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE name IN (?, {', '.join('?' * len(FTS_TRIGGERS))})",
+        (FTS_TABLE,) + FTS_TRIGGERS
+    )
+    # 索引表新建或触发器缺失（期间写入的数据没有进入索引）时需要重建索引
+    needs_rebuild = len(cursor.fetchall()) < 1 + len(FTS_TRIGGERS)
+
+    try:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                question, answer, options,
+                content='question_answer',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite版本低于3.34或未编译FTS5时退回LIKE查询
+        logger.warning(f"当前SQLite不支持FTS5 trigram全文索引，搜索将使用LIKE查询: {str(e)}")
+        return
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS question_answer_fts_insert
+        AFTER INSERT ON question_answer BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, question, answer, options)
+            VALUES (new.id, new.question, new.answer, new.options);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS question_answer_fts_delete
+        AFTER DELETE ON question_answer BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, options)
+            VALUES ('delete', old.id, old.question, old.answer, old.options);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS question_answer_fts_update
+        AFTER UPDATE OF question, answer, options ON question_answer BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, options)
+            VALUES ('delete', old.id, old.question, old.answer, old.options);
+            INSERT INTO {FTS_TABLE}(rowid, question, answer, options)
+            VALUES (new.id, new.question, new.answer, new.options);
+        END
+    ''')
+
+    # 在创建索引表与触发器的同一个事务中为已有数据建立索引，中断时整体回滚
+    if needs_rebuild:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _sample_full_text_search(cursor: sqlite3.Cursor, limit: int) -> int:
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts_estimate USING fts5(
+            question, answer, options, tokenize='trigram'
+        )
+    ''')
+    cursor.execute(
+        "INSERT INTO temp.fts_estimate(question, answer, options) "
+        "SELECT question, answer, options FROM question_answer LIMIT ?",
+        (limit,)
+    )
+    return cursor.rowcount
+
+
+# 4. 问题列表 keyset 分页索引
+def _apply_created_at_index(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_answer_created_at_id
+        ON question_answer(created_at DESC, id DESC)
+    ''')
+
+
+# 5. 按保留运算符和小数点的标准化规则重新计算匹配键
+def _noop(cursor: sqlite3.Cursor) -> None:
+    pass
+
+
+def _backfill_question_keys(cursor: sqlite3.Cursor, batch_size: int, after_id: int) -> Tuple[int, int]:
+    cursor.execute(
+        "SELECT id, question, normalized_question FROM question_answer WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, batch_size)
+    )
+    rows = cursor.fetchall()
+    updates = []
+    for row in rows:
+        key = build_question_key(row[1])
+        # 只改写匹配键发生变化的行
+        if key != row[2]:
+            updates.append((key, hash_question_key(key), row[0]))
+    cursor.executemany(
+        "UPDATE question_answer SET normalized_question = ?, question_hash = ? WHERE id = ?",
+        updates
+    )
+    return len(rows), rows[-1][0] if rows else after_id
+
+
+def _sample_question_keys(cursor: sqlite3.Cursor, limit: int) -> int:
+    # dry-run 时之前的迁移可能还未执行
+    _apply_question_hash(cursor)
+    return _backfill_question_keys(cursor, limit, 0)[0]
+
+
+# 按版本号排列的全部迁移（只能追加，不能修改已发布的迁移）
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1, "initial_schema", "创建问题答案表和类型索引",
+        _apply_initial_schema,
+        sample=_scan_rows,
+        objects=("idx_question_answer_type",)
+    ),
+    Migration(
+        2, "question_hash", "增加标准化问题和哈希列，精确匹配改用哈希索引，分批回填已有数据",
+        _apply_question_hash,
+        backfill=_backfill_question_hash,
+        pending_rows=_pending_question_hash,
+        sample=_sample_question_hash,
+        objects=("idx_question_answer_question_hash",)
+    ),
+    Migration(
+        3, "full_text_search", "创建FTS5 trigram全文索引和同步触发器，为已有数据建立索引",
+        _apply_full_text_search,
+        sample=_sample_full_text_search,
+        # 当前SQLite不支持FTS5时版本照常记录，升级SQLite后由启动检查补建索引表
+        objects=(FTS_TABLE,) + FTS_TRIGGERS
+    ),
+    Migration(
+        4, "created_at_index", "增加 (created_at, id) 索引用于keyset分页",
+        _apply_created_at_index,
+        sample=_scan_rows,
+        objects=("idx_question_answer_created_at_id",)
+    ),
+    Migration(
+        5, "question_key_operators", "匹配键保留运算符、比较符号和小数点，按新规则分批重新计算已有问题的匹配键",
+        _noop,
+        backfill=_backfill_question_keys,
+        pending_rows=_count_rows,
+        sample=_sample_question_keys
+    )
+]
+
+
+class MigrationRunner:
+    """表结构迁移执行器"""
+
+    def __init__(
+        self,
+        database: DatabaseManager,
+        migrations: Optional[List[Migration]] = None,
+        batch_size: int = 1000,
+        batch_sleep: float = 0.0
+    ):
+        self.database = database
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self.batch_size = max(1, batch_size)
+        self.batch_sleep = batch_sleep
+
+    @property
+    def head(self) -> int:
+        """最新的迁移版本"""
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self) -> int:
+        """数据库当前的迁移版本，没有版本记录时为0"""
+        with self.database.get_cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+                (SCHEMA_VERSION_TABLE,)
+            )
+            if cursor.fetchone() is None:
+                return 0
+            cursor.execute(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")
+            return cursor.fetchone()[0] or 0
+
+    def pending(self, target: Optional[int] = None) -> List[Migration]:
+        """待执行的迁移"""
+        current = self.current_version()
+        target = self.head if target is None else target
+        return [m for m in self.migrations if current < m.version <= target]
+
+    def plan(self, target: Optional[int] = None) -> List[Dict[str, Any]]:
+        """dry-run：列出待执行的迁移及估算的处理行数和耗时，不修改数据库"""
+        report = []
+        for migration in self.pending(target):
+            rows, seconds = self._estimate(migration)
+            report.append({
+                "version": migration.version,
+                "name": migration.name,
+                "description": migration.description,
+                "rows": rows,
+                "estimated_seconds": round(seconds, 2)
+            })
+        return report
+
+    def migrate(
+        self,
+        target: Optional[int] = None,
+        progress: Optional[Callable[[Migration, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """执行待执行的迁移
+
+        Args:
+            target: 迁移到的版本，默认最新版本
+            progress: 回填进度回调，参数为 (迁移, 已回填行数)
+
+        Returns:
+            每个已执行迁移的版本、名称、回填行数和耗时
+        """
+        applied = []
+        for migration in self.pending(target):
+            start = time.monotonic()
+            logger.info(f"执行数据库迁移 {migration.version}: {migration.name}")
+
+            # sqlite3 模块不会为DDL自动开启事务，显式开启使迁移的DDL整体提交或回滚
+            with self.database.get_cursor() as cursor:
+                cursor.execute("BEGIN")
+                self._ensure_version_table(cursor)
+                migration.apply(cursor)
+
+            backfilled = self._backfill(migration, progress) if migration.backfill else 0
+            duration = time.monotonic() - start
+
+            with self.database.get_cursor() as cursor:
+                cursor.execute(
+                    f"INSERT OR IGNORE INTO {SCHEMA_VERSION_TABLE} (version, name, duration_ms) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, int(duration * 1000))
+                )
+
+            logger.info(f"数据库迁移 {migration.version} 完成，回填 {backfilled} 行，耗时 {duration:.2f} 秒")
+            applied.append({
+                "version": migration.version,
+                "name": migration.name,
+                "backfilled": backfilled,
+                "duration_seconds": round(duration, 3)
+            })
+        return applied
+
+    def repair(self) -> List[str]:
+        """重新创建已执行迁移中缺失的表、索引和触发器
+
+        没有缺失时只查询一次 sqlite_master，不执行DDL
+
+        Returns:
+            重新创建的对象名称（当前SQLite仍不支持而无法创建的不包括在内）
+        """
+        current = self.current_version()
+        existing = self._existing_objects()
+
+        attempted = []
+        for migration in self.migrations:
+            missing = [name for name in migration.objects if name not in existing]
+            if migration.version > current or not missing:
+                continue
+            logger.warning(f"数据库迁移 {migration.version} 创建的对象缺失，重新创建: {', '.join(missing)}")
+            with self.database.get_cursor() as cursor:
+                cursor.execute("BEGIN")
+                migration.apply(cursor)
+            attempted.extend(missing)
+
+        if not attempted:
+            return []
+        existing = self._existing_objects()
+        return [name for name in attempted if name in existing]
+
+    def _existing_objects(self) -> set:
+        """数据库中已有的表、索引和触发器名称"""
+        with self.database.get_cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master")
+            return {row[0] for row in cursor.fetchall()}
+
+    def _backfill(self, migration: Migration, progress: Optional[Callable[[Migration, int], None]]) -> int:
+        """分批回填，每批单独提交，批与批之间休眠 batch_sleep 秒
+
+        按id顺序推进，中断后重新执行时从头扫描（回填只改写需要更新的行，可以重复执行）
+        """
+        total = 0
+        last_id = 0
+        while True:
+            with self.database.get_cursor() as cursor:
+                count, last_id = migration.backfill(cursor, self.batch_size, last_id)
+            if not count:
+                return total
+            total += count
+            if progress is not None:
+                progress(migration, total)
+            if self.batch_sleep > 0:
+                time.sleep(self.batch_sleep)
+
+    def _estimate(self, migration: Migration) -> tuple:
+        """在回滚的事务中处理样本行，按样本耗时估算 (处理行数, 耗时秒数)"""
+        with self.database.get_cursor() as cursor:
+            if not self._table_exists(cursor, "question_answer"):
+                return 0, 0.0
+            rows = (migration.pending_rows or _count_rows)(cursor)
+
+        sample = migration.sample
+        if not rows or sample is None:
+            return rows, 0.0
+
+        conn = self.database.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            start = time.monotonic()
+            sampled = sample(cursor, min(rows, ESTIMATE_SAMPLE_ROWS))
+            elapsed = time.monotonic() - start
+            conn.rollback()
+        finally:
+            conn.close()
+        return rows, elapsed / sampled * rows if sampled else 0.0
+
+    @staticmethod
+    def _table_exists(cursor: sqlite3.Cursor, table_name: str) -> bool:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def _ensure_version_table(cursor: sqlite3.Cursor) -> None:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duration_ms INTEGER
+            )
+        ''')
\ No newline at end of file
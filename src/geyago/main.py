@@ -5,9 +5,11 @@ Geyago智能题库主应用入口
 """
 
 from __future__ import annotations
+import atexit
 import logging
 import json
-from typing import NoReturn
+import sys
+from typing import List, NoReturn, Optional
 
 from flask import Flask, request
 from flask_cors import CORS
@@ -17,6 +19,31 @@ from .core.database import db_manager
 from .api.routes.query import query_bp, main_bp
 from .utils.helpers import setup_logging, get_client_ip, format_error_response
 from .services.ai_service_manager import ai_service_manager
+from .services.database_backup import backup_manager
+from .services.database_maintenance import database_maintenance
+from .services.qa_service import qa_service
+from .cli import parse_args
+
+
+# 退出清理函数是否已注册（重新加载应用时再次初始化服务，不能重复注册）
+_exit_hooks_registered = False
+
+
+def register_exit_hooks() -> None:
+    """注册进程退出时的清理函数（只注册一次）
+
+    后注册的先执行：退出时先关闭AI服务和后台线程，再写入队列中的AI答案，最后关闭数据库连接
+    """
+    global _exit_hooks_registered
+    if _exit_hooks_registered:
+        return
+    _exit_hooks_registered = True
+
+    atexit.register(db_manager.close_all_connections)
+    atexit.register(qa_service.shutdown)
+    atexit.register(database_maintenance.stop)
+    atexit.register(backup_manager.stop)
+    atexit.register(ai_service_manager.shutdown)
 
 
 class GeyagoApp:
@@ -93,17 +120,33 @@ class GeyagoApp:
             logger.info(f"请求完成: {response.status_code}")
             return response
 
-    def init_services(self) -> None:
-        """初始化服务"""
+    def init_services(self, start_background: bool = True, migrate: bool = True) -> None:
+        """初始化服务
+
+        Args:
+            start_background: 是否启动后台健康检查、数据库维护和定时备份线程（多进程服务器在fork之前预加载时为False，
+                由每个worker在fork之后自行启动）
+            migrate: 是否执行数据库迁移（多进程服务器不预加载时为False，迁移已由主进程执行，worker只建立连接）
+        """
         try:
             # 初始化数据库
-            db_manager.init_database()
+            if migrate:
+                db_manager.init_database()
+            else:
+                db_manager.load_schema_state()
+            register_exit_hooks()
             logging.getLogger(__name__).info("数据库初始化完成")
+            if start_background:
+                database_maintenance.start()
+            if start_background and settings.backup.enabled:
+                backup_manager.start()
 
             # 初始化AI服务管理器
             try:
                 ai_service_manager.settings = settings
                 ai_service_manager.initialize()
+                if start_background:
+                    ai_service_manager.start_health_monitor()
                 logging.getLogger(__name__).info("AI服务管理器初始化完成")
             except Exception as init_error:
                 logging.getLogger(__name__).error(f"AI服务管理器初始化失败: {str(init_error)}", exc_info=True)
@@ -130,6 +173,7 @@ class GeyagoApp:
         # 可用端点
         print(f"\n🛠️  可用端点:")
         print(f"  GET  /api/query      - 查询问题答案")
+        print(f"  POST /api/query/batch - 批量查询问题答案")
         print(f"  GET  /api/config     - 获取API配置")
         print(f"  GET  /api/health     - 健康检查")
         print(f"  GET  /api/stats      - 题库统计")
@@ -147,6 +191,15 @@ class GeyagoApp:
         self.print_startup_info()
         return self.app
 
+    def run_asgi(self) -> None:
+        """以ASGI模式运行应用（uvicorn，查询接口异步处理）"""
+        from .asgi import GeyagoASGIApp, serve
+
+        self.init_services()
+        self.print_startup_info()
+        print("⚡ 服务模式: ASGI（uvicorn）\n")
+        serve(GeyagoASGIApp(self.app), host=settings.host, port=settings.port, debug=settings.debug)
+
     def run(self) -> NoReturn:
         """运行应用"""
         self.init_services()
@@ -164,14 +217,32 @@ def create_app() -> Flask:
     return app_instance.create_app()
 
 
-def main() -> NoReturn:
+def create_asgi_app():
+    """ASGI应用工厂函数（uvicorn geyago.main:create_asgi_app --factory）"""
+    from .asgi import GeyagoASGIApp
+
+    app_instance = GeyagoApp()
+    app_instance.init_services()
+    return GeyagoASGIApp(app_instance.app)
+
+
+def main(argv: Optional[List[str]] = None) -> NoReturn:
     """主函数"""
+    args = parse_args(argv)
+
     # 设置日志
     setup_logging()
 
+    # 执行管理命令
+    if getattr(args, "func", None) is not None:
+        sys.exit(args.func(args))
+
     # 创建并运行应用
     app_instance = GeyagoApp()
-    app_instance.run()
+    if args.asgi:
+        app_instance.run_asgi()
+    else:
+        app_instance.run()
 
 
 if __name__ == '__main__':
@@ -5,12 +5,52 @@
 """
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
+import base64
+import json
+import sqlite3
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 
-from ..core.database import db_manager
-from ..core.exceptions import DatabaseError, QuestionNotFoundError
+from ..core.database import db_manager, SEARCH_INDEX_TABLE, SUPPORTS_RETURNING
+from ..core.exceptions import DatabaseError, QuestionNotFoundError, ValidationError
+from ..utils.helpers import build_question_key, extract_ngrams, hash_question_key
+
+# trigram分词的最短可检索长度，更短的关键词只能使用LIKE查询
+FTS_MIN_TERM_LENGTH = 3
+
+# 相似问题查询最多使用的trigram数量，限制长题目的查询开销
+SIMILAR_QUERY_MAX_TERMS = 64
+
+# 批量查询时每条SQL绑定的最大参数数量（低于旧版SQLite的999限制）
+BATCH_LOOKUP_CHUNK_SIZE = 500
+
+
+def encode_page_cursor(created_at: Optional[str], question_id: int) -> str:
+    """将分页位置编码为不透明的游标字符串"""
+    raw = json.dumps([created_at, question_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(cursor: str) -> Tuple[str, int]:
+    """解析分页游标
+
+    Raises:
+        ValidationError: 游标无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, question_id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(question_id, int):
+            raise ValueError("游标格式错误")
+        return created_at, question_id
+    except (ValueError, TypeError) as e:
+        raise ValidationError(f"无效的分页游标: {cursor}") from e
+
+
+def _fts_phrase(text: str) -> str:
+    """将文本转义为FTS5短语（trigram分词下等价于子串匹配）"""
+    return '"' + text.replace('"', '""') + '"'
 
 
 @dataclass
@@ -55,20 +95,121 @@ class QuestionRepository:
 
     @staticmethod
     def find_by_question(question_text: str) -> Optional[Question]:
-        """根据问题文本查找问题"""
+        """根据问题文本查找问题（原文完全一致）"""
         try:
+            key = build_question_key(question_text)
             row = db_manager.execute_query(
-                "SELECT * FROM question_answer WHERE question = ?",
-                (question_text,),
+                "SELECT * FROM question_answer WHERE question_hash = ? AND question = ?",
+                (hash_question_key(key), question_text),
+                fetch_one=True
+            )
+            return Question.from_db_row(row)
+        except Exception as e:
+            raise DatabaseError(f"查询问题失败: {str(e)}")
+
+    @staticmethod
+    def find_by_id(question_id: int) -> Optional[Question]:
+        """根据ID查找问题"""
+        try:
+            row = db_manager.execute_query(
+                "SELECT * FROM question_answer WHERE id = ?",
+                (question_id,),
+                fetch_one=True
+            )
+            return Question.from_db_row(row)
+        except Exception as e:
+            raise DatabaseError(f"查询问题失败: {str(e)}")
+
+    @staticmethod
+    def find_by_normalized_question(question_text: str) -> Optional[Question]:
+        """根据标准化后的问题文本查找问题（忽略大小写、空白和标点差异）
+
+        同一标准化文本有多条记录时优先返回原文完全一致的记录
+        """
+        try:
+            key = build_question_key(question_text)
+            row = db_manager.execute_query(
+                """
+                SELECT * FROM question_answer
+                WHERE question_hash = ? AND normalized_question = ?
+                ORDER BY (question = ?) DESC, id ASC
+                LIMIT 1
+                """,
+                (hash_question_key(key), key, question_text),
                 fetch_one=True
             )
             return Question.from_db_row(row)
         except Exception as e:
             raise DatabaseError(f"查询问题失败: {str(e)}")
 
+    @staticmethod
+    def find_by_normalized_questions(question_texts: List[str]) -> Dict[str, Question]:
+        """批量按标准化问题查找（按哈希集合查询，每批一条SQL）
+
+        Returns:
+            原问题文本 -> 匹配的问题（未命中的问题不在结果中）；
+            匹配规则与 find_by_normalized_question 一致
+        """
+        keys = {text: build_question_key(text) for text in question_texts}
+        hashes = list({hash_question_key(key) for key in keys.values()})
+
+        rows_by_key: Dict[str, List[Any]] = {}
+        try:
+            for start in range(0, len(hashes), BATCH_LOOKUP_CHUNK_SIZE):
+                chunk = hashes[start:start + BATCH_LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = db_manager.execute_query(
+                    f"SELECT * FROM question_answer WHERE question_hash IN ({placeholders}) ORDER BY id ASC",
+                    tuple(chunk),
+                    fetch_all=True
+                ) or []
+                for row in rows:
+                    rows_by_key.setdefault(row['normalized_question'], []).append(row)
+        except Exception as e:
+            raise DatabaseError(f"批量查询问题失败: {str(e)}")
+
+        results = {}
+        for text, key in keys.items():
+            candidates = rows_by_key.get(key)
+            if not candidates:
+                continue
+            # 优先原文完全一致的记录，其次ID最小的记录
+            row = next((row for row in candidates if row['question'] == text), candidates[0])
+            results[text] = Question.from_db_row(row)
+        return results
+
     @staticmethod
     def find_similar_questions(question_text: str, limit: int = 5) -> List[Question]:
-        """查找相似问题（简单实现，基于模糊匹配）"""
+        """查找相似问题：按共享trigram在全文索引中召回，使用bm25排序"""
+        question_text = (question_text or "").strip()
+        if not question_text:
+            return []
+
+        if not db_manager.search_index_available or len(question_text) < FTS_MIN_TERM_LENGTH:
+            return QuestionRepository._find_similar_questions_like(question_text, limit)
+
+        terms = extract_ngrams(question_text, FTS_MIN_TERM_LENGTH)[:SIMILAR_QUERY_MAX_TERMS]
+        match_query = "question : (" + " OR ".join(_fts_phrase(term) for term in terms) + ")"
+        try:
+            rows = db_manager.execute_query(
+                f"""
+                SELECT q.*
+                FROM {SEARCH_INDEX_TABLE}
+                JOIN question_answer q ON q.id = {SEARCH_INDEX_TABLE}.rowid
+                WHERE {SEARCH_INDEX_TABLE} MATCH ?
+                ORDER BY bm25({SEARCH_INDEX_TABLE}), length(q.question) ASC
+                LIMIT ?
+                """,
+                (match_query, limit),
+                fetch_all=True
+            )
+            return [Question.from_db_row(row) for row in rows] if rows else []
+        except Exception as e:
+            raise DatabaseError(f"查找相似问题失败: {str(e)}")
+
+    @staticmethod
+    def _find_similar_questions_like(question_text: str, limit: int) -> List[Question]:
+        """无全文索引或文本过短时的LIKE子串匹配"""
         try:
             rows = db_manager.execute_query(
                 """
@@ -88,36 +229,163 @@ class QuestionRepository:
 
     @staticmethod
     def save(question: Question) -> Question:
-        """保存问题到数据库"""
+        """保存问题到数据库，直接返回写入后的行（不再按问题文本重新查询）
+
+        修改已有答案时应通过 QAService.save_question 调用，以便同时使答案缓存失效
+
+        Raises:
+            QuestionNotFoundError: 更新的问题ID不存在
+            DatabaseError: 数据库错误
+        """
+        key = build_question_key(question.question)
+        values = (question.question, question.answer, question.options,
+                  question.question_type, key, hash_question_key(key))
         try:
-            if question.id is None:
-                # 新增问题
-                question.id = db_manager.execute_query(
-                    """
-                    INSERT INTO question_answer
-                    (question, answer, options, type)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (question.question, question.answer, question.options,
-                     question.question_type)
-                )
-            else:
-                # 更新问题
-                db_manager.execute_query(
+            with db_manager.get_cursor() as cursor:
+                if question.id is None:
+                    # 新增问题
+                    row = QuestionRepository._execute_returning(
+                        cursor,
+                        """
+                        INSERT INTO question_answer
+                        (question, answer, options, type, normalized_question, question_hash)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        values
+                    )
+                else:
+                    # 更新问题
+                    row = QuestionRepository._execute_returning(
+                        cursor,
+                        """
+                        UPDATE question_answer
+                        SET question=?, answer=?, options=?, type=?,
+                            normalized_question=?, question_hash=?
+                        WHERE id=?
+                        """,
+                        values + (question.id,),
+                        question.id
+                    )
+        except Exception as e:
+            raise DatabaseError(f"保存问题失败: {str(e)}")
+
+        if row is None:
+            raise QuestionNotFoundError(f"问题不存在: {question.id}")
+        return Question.from_db_row(row)
+
+    @staticmethod
+    def upsert(
+        question_text: str,
+        answer: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None
+    ) -> Tuple[Question, bool]:
+        """按标准化问题插入或更新问题
+
+        标准化文本已存在时更新该问题的答案、选项和类型（有多条时优先原文一致的记录），
+        否则插入新问题。查找和写入在同一个写事务中完成。
+        应通过 QAService.upsert_question 调用，以便同时使答案缓存失效。
+
+        Returns:
+            (写入后的问题, 是否为新插入)
+        """
+        key = build_question_key(question_text)
+        question_hash = hash_question_key(key)
+        try:
+            with db_manager.get_cursor() as cursor:
+                # 先取得写锁，避免并发upsert都未查到而重复插入
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(
                     """
-                    UPDATE question_answer
-                    SET question=?, answer=?, options=?, type=?
-                    WHERE id=?
+                    SELECT id FROM question_answer
+                    WHERE question_hash = ? AND normalized_question = ?
+                    ORDER BY (question = ?) DESC, id ASC
+                    LIMIT 1
                     """,
-                    (question.question, question.answer, question.options,
-                     question.question_type, question.id)
+                    (question_hash, key, question_text)
                 )
-
-            # 重新获取更新后的数据
-            return QuestionRepository.find_by_question(question.question)
+                existing = cursor.fetchone()
+                if existing is not None:
+                    row = QuestionRepository._execute_returning(
+                        cursor,
+                        "UPDATE question_answer SET answer=?, options=?, type=? WHERE id=?",
+                        (answer, options, question_type, existing['id']),
+                        existing['id']
+                    )
+                else:
+                    row = QuestionRepository._execute_returning(
+                        cursor,
+                        """
+                        INSERT INTO question_answer
+                        (question, answer, options, type, normalized_question, question_hash)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (question_text, answer, options, question_type, key, question_hash)
+                    )
         except Exception as e:
             raise DatabaseError(f"保存问题失败: {str(e)}")
 
+        return Question.from_db_row(row), existing is None
+
+    @staticmethod
+    def _execute_returning(cursor, query: str, params: tuple, row_id: Optional[int] = None):
+        """执行INSERT/UPDATE并返回写入后的行
+
+        支持时使用 RETURNING 在同一条语句中取回；旧版SQLite在同一连接上按主键查询一次。
+        """
+        if SUPPORTS_RETURNING:
+            cursor.execute(query.rstrip() + " RETURNING *", params)
+            # 读完所有结果，保证语句在提交前执行完毕
+            rows = cursor.fetchall()
+            return rows[0] if rows else None
+
+        cursor.execute(query, params)
+        if row_id is None:
+            row_id = cursor.lastrowid
+        elif cursor.rowcount == 0:
+            return None
+        cursor.execute("SELECT * FROM question_answer WHERE id = ?", (row_id,))
+        return cursor.fetchone()
+
+    @staticmethod
+    def insert_many_if_absent(questions: List[Question], keys: Optional[List[str]] = None) -> int:
+        """在一个事务中批量插入问题，标准化问题文本已存在的问题跳过
+
+        Args:
+            questions: 待插入的问题
+            keys: 调用方已计算好的标准化问题（与 questions 一一对应），避免重复计算
+
+        Returns:
+            实际插入的行数
+        """
+        if not questions:
+            return 0
+
+        params = []
+        for index, question in enumerate(questions):
+            key = keys[index] if keys is not None else build_question_key(question.question)
+            question_hash = hash_question_key(key)
+            params.append((
+                question.question, question.answer, question.options, question.question_type,
+                key, question_hash, question_hash, key
+            ))
+
+        try:
+            return db_manager.execute_many(
+                """
+                INSERT INTO question_answer
+                (question, answer, options, type, normalized_question, question_hash)
+                SELECT ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM question_answer
+                    WHERE question_hash = ? AND normalized_question = ?
+                )
+                """,
+                params
+            )
+        except Exception as e:
+            raise DatabaseError(f"批量保存问题失败: {str(e)}")
+
     @staticmethod
     def create_question(
         question_text: str,
@@ -136,20 +404,56 @@ class QuestionRepository:
 
     @staticmethod
     def get_all_questions(limit: int = 100, offset: int = 0) -> List[Question]:
-        """获取所有问题列表"""
+        """获取所有问题列表（按添加时间倒序）"""
+        questions, _ = QuestionRepository.get_questions_page(limit, offset=offset)
+        return questions
+
+    @staticmethod
+    def get_questions_page(
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        offset: int = 0
+    ) -> Tuple[List[Question], Optional[str]]:
+        """按 (created_at, id) 倒序分页获取问题
+
+        传入游标时从游标之后继续（keyset分页，走 (created_at, id) 索引，与页码深度无关）；
+        否则跳过 offset 行（兼容按页码访问）。
+
+        Returns:
+            (本页问题, 下一页游标)，没有下一页时游标为None
+
+        Raises:
+            ValidationError: 游标无效
+        """
+        if cursor:
+            created_at, last_id = decode_page_cursor(cursor)
+            query = """
+                SELECT * FROM question_answer
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """
+            params: tuple = (created_at, last_id, limit + 1)
+        else:
+            query = """
+                SELECT * FROM question_answer
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            """
+            params = (limit + 1, offset)
+
         try:
-            rows = db_manager.execute_query(
-                "SELECT * FROM question_answer ORDER BY created_at DESC LIMIT ? OFFSET ?",
-                (limit, offset),
-                fetch_all=True
-            )
-            if rows:
-                return [Question.from_db_row(dict(row)) for row in rows]
-            else:
-                return []
+            rows = db_manager.execute_query(query, params, fetch_all=True) or []
         except Exception as e:
             raise DatabaseError(f"获取问题列表失败: {str(e)}")
 
+        # 多取一行判断是否还有下一页
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_page_cursor(rows[-1]['created_at'], rows[-1]['id'])
+        return [Question.from_db_row(row) for row in rows], next_cursor
+
     @staticmethod
     def count_questions() -> int:
         """统计问题总数"""
@@ -162,6 +466,67 @@ class QuestionRepository:
         except Exception as e:
             raise DatabaseError(f"统计问题数量失败: {str(e)}")
 
+    @staticmethod
+    def iter_rows(
+        question_type: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[Tuple[Any, ...]]:
+        """按keyset分页逐块读取问题行（用于导出，不构建Question对象）
+
+        每块单独查询并立即归还连接，导出下载很慢时也不会长时间占用连接池，
+        也不会持有读事务阻止WAL检查点；导出期间新写入的问题可能出现在结果中
+
+        Args:
+            question_type: 只读取该类型的问题
+            since: 只读取 created_at >= since 的问题
+            until: 只读取 created_at < until 的问题
+            chunk_size: 每次查询的行数
+
+        Yields:
+            (id, question, answer, options, type, created_at)
+        """
+        conditions = []
+        params: list = []
+        if question_type:
+            conditions.append("type = ?")
+            params.append(question_type)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+
+        # 按时间范围导出时沿 (created_at, id) 索引顺序读取，否则按主键顺序，都不需要额外排序
+        by_time = bool(since or until)
+        order = "created_at, id" if by_time else "id"
+        keyset = "(created_at, id) > (?, ?)" if by_time else "id > ?"
+
+        last: Optional[tuple] = None
+        while True:
+            page_conditions = conditions + [keyset] if last is not None else conditions
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            query = f"""
+                SELECT id, question, answer, options, type, created_at
+                FROM question_answer {where}
+                ORDER BY {order}
+                LIMIT ?
+            """
+            try:
+                rows = db_manager.execute_query(
+                    query, tuple(params) + (last or ()) + (chunk_size,), fetch_all=True
+                ) or []
+            except sqlite3.Error as e:
+                raise DatabaseError(f"读取问题失败: {str(e)}")
+
+            for row in rows:
+                yield tuple(row)
+            if len(rows) < chunk_size:
+                return
+            last = (rows[-1]['created_at'], rows[-1]['id']) if by_time else (rows[-1]['id'],)
+
     @staticmethod
     def delete_question(question_id: int) -> bool:
         """删除问题"""
@@ -188,16 +553,41 @@ class QuestionRepository:
             raise DatabaseError(f"根据类型获取问题失败: {str(e)}")
 
     @staticmethod
-    def search_questions(keyword: str) -> List[Question]:
-        """搜索问题"""
+    def search_questions(keyword: str, limit: int = 10) -> List[Question]:
+        """搜索问题（问题、答案、选项），有全文索引时按bm25相关度排序"""
+        if not db_manager.search_index_available or len(keyword) < FTS_MIN_TERM_LENGTH:
+            return QuestionRepository._search_questions_like(keyword, limit)
+
+        try:
+            # 问题列的匹配权重高于答案和选项
+            rows = db_manager.execute_query(
+                f"""
+                SELECT q.*
+                FROM {SEARCH_INDEX_TABLE}
+                JOIN question_answer q ON q.id = {SEARCH_INDEX_TABLE}.rowid
+                WHERE {SEARCH_INDEX_TABLE} MATCH ?
+                ORDER BY bm25({SEARCH_INDEX_TABLE}, 10.0, 2.0, 1.0), q.created_at DESC
+                LIMIT ?
+                """,
+                (_fts_phrase(keyword), limit),
+                fetch_all=True
+            )
+            return [Question.from_db_row(row) for row in rows] if rows else []
+        except Exception as e:
+            raise DatabaseError(f"搜索问题失败: {str(e)}")
+
+    @staticmethod
+    def _search_questions_like(keyword: str, limit: int) -> List[Question]:
+        """无全文索引或关键词过短（不足一个trigram）时的LIKE查询"""
         try:
             rows = db_manager.execute_query(
                 """
                 SELECT * FROM question_answer
                 WHERE question LIKE ? OR answer LIKE ? OR options LIKE ?
                 ORDER BY created_at DESC
+                LIMIT ?
                 """,
-                (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"),
+                (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", limit),
                 fetch_all=True
             )
             return [Question.from_db_row(row) for row in rows] if rows else []
@@ -0,0 +1,184 @@
+"""
+生产服务器模块
+
+基于gunicorn的多进程服务器，worker数量、线程数、backlog、keep-alive等参数来自 ServerConfig：
+
+    geyago serve            多进程 + 多线程（gthread worker）
+    geyago --asgi serve     多进程 + uvicorn worker（查询接口异步处理）
+
+- 数据库迁移只在主进程中执行一次（preload 时加载应用时执行，否则在 on_starting 中执行），worker只建立连接
+- preload 开启时在fork之前加载配置和AI服务提供商，fork之后每个worker重新建立数据库连接并启动健康检查
+- 收到 SIGHUP 时重新读取 config.json，重新加载应用并平滑替换所有worker
+"""
+
+from __future__ import annotations
+import logging
+import multiprocessing
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # 可选依赖，仅生产服务器需要（pip install geyago[server]）
+    BaseApplication = None
+
+from .config.settings import ServerConfig, settings
+from .core.database import db_manager
+from .core.exceptions import ConfigurationError
+from .services.ai_service_manager import ai_service_manager
+from .services.database_backup import backup_manager
+from .services.database_maintenance import database_maintenance
+
+logger = logging.getLogger(__name__)
+
+# worker类型 -> gunicorn worker_class
+WORKER_CLASSES = {
+    "gthread": "gthread",
+    "asgi": "uvicorn.workers.UvicornWorker"
+}
+
+
+def resolve_workers(workers: int) -> int:
+    """计算worker进程数，0表示按CPU核数自动计算"""
+    if workers > 0:
+        return workers
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def build_server_options(
+    server_config: ServerConfig,
+    asgi: bool = False,
+    workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """根据 ServerConfig 构建gunicorn配置
+
+    Args:
+        server_config: 服务器配置
+        asgi: 是否强制使用ASGI worker
+        workers: 覆盖配置中的worker进程数
+
+    Returns:
+        gunicorn配置项
+    """
+    worker_type = "asgi" if asgi else server_config.worker_class
+    if worker_type not in WORKER_CLASSES:
+        raise ConfigurationError(
+            f"不支持的worker类型: {worker_type}，可选: {', '.join(WORKER_CLASSES)}"
+        )
+
+    return {
+        "bind": f"{server_config.host}:{server_config.port}",
+        "workers": resolve_workers(workers if workers is not None else server_config.workers),
+        "worker_class": WORKER_CLASSES[worker_type],
+        "threads": max(1, server_config.threads),
+        "backlog": server_config.backlog,
+        "keepalive": server_config.keepalive,
+        "timeout": server_config.timeout,
+        "graceful_timeout": server_config.graceful_timeout,
+        "preload_app": server_config.preload,
+        "on_starting": on_starting,
+        "post_fork": post_fork
+    }
+
+
+def load_application(asgi: bool = False, preloaded: bool = False) -> Callable[..., Any]:
+    """加载Web应用
+
+    Args:
+        asgi: 是否返回ASGI应用
+        preloaded: 是否在fork之前的主进程中加载（此时执行数据库迁移，但不启动后台线程、不保留数据库连接）；
+            否则在worker中加载，迁移已由主进程的 on_starting 执行
+    """
+    from .main import GeyagoApp
+
+    app_instance = GeyagoApp()
+    app_instance.init_services(start_background=not preloaded, migrate=preloaded)
+    if preloaded:
+        # fork出的worker不能共用主进程的SQLite连接
+        db_manager.close_all_connections()
+
+    if asgi:
+        from .asgi import GeyagoASGIApp
+        return GeyagoASGIApp(app_instance.app)
+    return app_instance.app
+
+
+def on_starting(server: Any) -> None:
+    """主进程启动时执行数据库迁移（不预加载时worker不再各自迁移，避免多个进程同时执行DDL）
+
+    preload 时应用在此之前已由主进程加载并完成迁移
+    """
+    if server.cfg.preload_app:
+        return
+    db_manager.init_database()
+    # fork出的worker不能共用主进程的SQLite连接
+    db_manager.close_all_connections()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """worker进程fork后的初始化：丢弃继承的数据库连接，在worker内启动后台健康检查、数据库维护和定时备份"""
+    db_manager.close_all_connections()
+    if server.cfg.preload_app:
+        ai_service_manager.start_health_monitor()
+        database_maintenance.start()
+        if settings.backup.enabled:
+            # 各worker通过备份目录的文件锁协调，同一时间只有一个进程备份
+            backup_manager.start()
+
+
+def reload_settings() -> None:
+    """重新读取配置文件，并按新配置重建AI服务提供商、路由和对冲设置
+
+    重新加载应用时 init_services() 中的 initialize() 在已有提供商时直接返回，需要在这里重建
+    """
+    settings.reload()
+    ai_service_manager.settings = settings
+    ai_service_manager.reload_providers(reset_routing=True)
+
+
+if BaseApplication is not None:
+    class GeyagoServer(BaseApplication):
+        """嵌入式gunicorn应用"""
+
+        def __init__(self, asgi: bool = False, workers: Optional[int] = None):
+            self.force_asgi = asgi
+            self.asgi = asgi
+            self.workers = workers
+            super().__init__()
+
+        def load_config(self) -> None:
+            """将 ServerConfig 写入gunicorn配置（重载时重新读取）"""
+            self.asgi = self.force_asgi or settings.server.worker_class == "asgi"
+            for key, value in build_server_options(settings.server, self.asgi, self.workers).items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Callable[..., Any]:
+            """加载Web应用（preload时在主进程执行，否则在每个worker中执行）"""
+            return load_application(self.asgi, preloaded=self.cfg.preload_app)
+
+        def reload(self) -> None:
+            """SIGHUP：重新读取配置文件，预加载的应用也重新加载，随后由gunicorn平滑替换worker"""
+            logger.info("收到重载信号，重新读取配置")
+            reload_settings()
+            self.callable = None
+            super().reload()
+else:
+    GeyagoServer = None
+
+
+def run_production_server(asgi: bool = False, workers: Optional[int] = None) -> int:
+    """启动生产服务器（阻塞直到服务器退出）
+
+    Returns:
+        退出码
+    """
+    if GeyagoServer is None:
+        raise ConfigurationError("生产服务器需要安装gunicorn: pip install geyago[server]")
+
+    server = GeyagoServer(asgi=asgi, workers=workers)
+    options = build_server_options(settings.server, server.asgi, workers)
+    print(
+        f"🚀 生产服务器启动: http://{options['bind']}，"
+        f"{options['workers']} 个worker（{options['worker_class']}，每个 {options['threads']} 线程）"
+    )
+    server.run()
+    return 0
\ No newline at end of file
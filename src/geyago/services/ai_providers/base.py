@@ -5,14 +5,222 @@ AI服务基础类
 """
 
 from __future__ import annotations
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Sequence, Tuple, TypeVar
 import json
+import logging
+import random
 import re
 import time
 
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，仅异步接口需要（pip install geyago[async]）
+    httpx = None
+
 from ...config.settings import AIProviderConfig
-from ...core.exceptions import AIServiceError, TimeoutError, RateLimitError
+from ...core.exceptions import AIServiceError, ConfigurationError, TimeoutError, RateLimitError
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 可重试的AIServiceError错误码
+RETRYABLE_ERROR_CODES = frozenset({"SERVER_ERROR", "CONNECTION_ERROR"})
+
+# 批量答题提示词：多道题共用一份说明，要求按序号返回JSON数组
+BATCH_PROMPT_PREAMBLE = (
+    '你是一个题库接口函数，请根据每道题的问题和选项提供答案。'
+    '如果是选择题，直接返回对应选项的内容，注意是内容，不是对应字母；'
+    '如果题目是多选题，将内容用"###"连接；'
+    '如果选项内容是"对","错"，且只有两项，或者类型是judgement，你直接返回"对"或"错"的文字，不要返回字母；'
+    '如果是填空题，直接返回填空内容，多个空使用###连接。'
+    '题目以JSON数组给出，每道题包含index、问题、选项、类型。'
+    '回答格式为：[{"index":0,"answer":"your_answer_string"}]，每道题一项，index与题目一致，严格使用此格式回答。'
+    '不要回答嗯、好的、我知道了之类的话，你的回答只能是json。'
+)
+
+# 批量答题的题目：(问题, 选项, 类型)
+BatchQuestion = Tuple[str, str, str]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """判断错误是否值得重试（超时、限流、连接错误和5xx）"""
+    if isinstance(error, (TimeoutError, RateLimitError)):
+        return True
+    return isinstance(error, AIServiceError) and error.error_code in RETRYABLE_ERROR_CODES
+
+
+class RetryPolicy:
+    """重试策略
+
+    带抖动的有上限指数退避；所有尝试共享 total_timeout 总时间预算，
+    每次尝试的超时不超过剩余预算；429响应优先按 Retry-After 等待。
+    策略对象本身无状态，可在并发请求间共享。
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 2.0,
+        max_delay: float = 10.0,
+        jitter: float = 0.5,
+        total_timeout: float = 30.0,
+        attempt_timeout: Optional[float] = None
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.total_timeout = total_timeout
+        self.attempt_timeout = attempt_timeout or total_timeout
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """计算第 attempt 次（从0开始）失败后的等待时间"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter * random.random())
+
+    def execute(
+        self,
+        func: Callable[[float], T],
+        should_retry: Callable[[Exception], bool] = is_retryable_error
+    ) -> T:
+        """按策略执行调用
+
+        Args:
+            func: 实际调用，参数为本次尝试可用的超时时间（秒）
+            should_retry: 判断异常是否可重试
+
+        Returns:
+            调用结果
+
+        Raises:
+            最后一次失败的异常；预算耗尽时抛出 TimeoutError
+        """
+        deadline = time.monotonic() + self.total_timeout
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                return func(min(self.attempt_timeout, remaining))
+            except Exception as e:
+                last_error = e
+                delay = self._retry_delay(e, attempt, deadline, should_retry)
+                if delay is None:
+                    break
+                time.sleep(delay)
+
+        if last_error is not None:
+            raise last_error
+        raise TimeoutError(f"请求超出总时间预算（{self.total_timeout}秒）")
+
+    async def execute_async(
+        self,
+        func: Callable[[float], Awaitable[T]],
+        should_retry: Callable[[Exception], bool] = is_retryable_error
+    ) -> T:
+        """按策略执行异步调用（asyncio.sleep 退避，单次尝试超时后取消该请求）
+
+        Args:
+            func: 实际调用，参数为本次尝试可用的超时时间（秒）
+            should_retry: 判断异常是否可重试
+
+        Returns:
+            调用结果
+
+        Raises:
+            最后一次失败的异常；预算耗尽时抛出 TimeoutError
+        """
+        deadline = time.monotonic() + self.total_timeout
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            timeout = min(self.attempt_timeout, remaining)
+            try:
+                try:
+                    return await asyncio.wait_for(func(timeout), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"API请求超时（{timeout:.1f}秒）")
+            except Exception as e:
+                last_error = e
+                delay = self._retry_delay(e, attempt, deadline, should_retry)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+        if last_error is not None:
+            raise last_error
+        raise TimeoutError(f"请求超出总时间预算（{self.total_timeout}秒）")
+
+    def _retry_delay(
+        self,
+        error: Exception,
+        attempt: int,
+        deadline: float,
+        should_retry: Callable[[Exception], bool]
+    ) -> Optional[float]:
+        """计算失败后重试前的等待时间
+
+        Returns:
+            等待秒数；返回None表示不再重试（调用方抛出最后一次的异常）
+
+        Raises:
+            不可重试的异常或最后一次尝试的异常直接抛出
+        """
+        if not should_retry(error) or attempt == self.max_attempts - 1:
+            raise error
+
+        retry_after = None
+        if isinstance(error, RateLimitError):
+            retry_after = error.details.get("retry_after")
+        delay = self.compute_delay(attempt, retry_after)
+        if time.monotonic() + delay >= deadline:
+            return None
+
+        logger.warning(
+            f"第 {attempt + 1}/{self.max_attempts} 次请求失败: {str(error)}，"
+            f"{delay:.2f} 秒后重试"
+        )
+        return delay
 
 
 class BaseAIProvider(ABC):
@@ -24,6 +232,66 @@ class BaseAIProvider(ABC):
         self.timeout = api_config.get("timeout", 30)
         self.max_retries = api_config.get("max_retries", 3)
         self.retry_delay = api_config.get("retry_delay", 2)
+        self.pool_connections = api_config.get("pool_connections", 10)
+        self.pool_maxsize = api_config.get("pool_maxsize", 20)
+        self.batch_size = max(1, api_config.get("batch_size", 10))
+        self.batch_retries = api_config.get("batch_retries", 1)
+        self.async_max_connections = api_config.get("async_max_connections", 100)
+        # 持久化的keep-alive会话，避免每次请求重新进行TCP/TLS握手
+        self.session = self._create_session()
+        # 异步客户端绑定在事件循环上，按循环分别创建
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.max_retries,
+            base_delay=self.retry_delay,
+            max_delay=api_config.get("max_retry_delay", 10),
+            jitter=api_config.get("retry_jitter", 0.5),
+            total_timeout=self.timeout,
+            attempt_timeout=api_config.get("attempt_timeout")
+        )
+
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的HTTP会话"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        """关闭HTTP会话及其连接池（异步客户端需在各自的事件循环中调用 aclose）"""
+        self.session.close()
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        """获取当前事件循环的异步HTTP客户端（带连接池，按需创建）"""
+        if httpx is None:
+            raise ConfigurationError("异步AI接口需要安装httpx: pip install geyago[async]")
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                verify=False,
+                limits=httpx.Limits(
+                    max_connections=self.async_max_connections,
+                    max_keepalive_connections=self.pool_maxsize
+                )
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的异步HTTP客户端"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
 
     @abstractmethod
     def _build_prompt(self, question: str, options: str = "", question_type: str = "") -> str:
@@ -46,10 +314,101 @@ class BaseAIProvider(ABC):
         pass
 
     @abstractmethod
-    def _make_request(self, payload: Dict[str, Any], headers: Dict[str, str], model: str) -> str:
-        """发起API请求（包含重试逻辑）"""
+    def _extract_response_content(self, result: Dict[str, Any]) -> str:
+        """从API响应JSON中提取模型输出的文本"""
+        pass
+
+    def _get_request_url(self, model: str) -> str:
+        """获取请求URL"""
+        return self.config.base_url
+
+    def _check_response_status(self, response: requests.Response) -> None:
+        """检查提供商特定的HTTP状态码（子类可覆盖，同步和异步请求共用）"""
         pass
 
+    def _make_request(self, payload: Dict[str, Any], headers: Dict[str, str], model: str) -> str:
+        """发起API请求（按重试策略重试）"""
+        url = self._get_request_url(model)
+        return self.retry_policy.execute(
+            lambda timeout: self._send_request(url, payload, headers, timeout)
+        )
+
+    async def _make_request_async(self, payload: Dict[str, Any], headers: Dict[str, str], model: str) -> str:
+        """异步发起API请求（按重试策略重试，等待期间不占用线程）"""
+        url = self._get_request_url(model)
+        return await self.retry_policy.execute_async(
+            lambda timeout: self._send_request_async(url, payload, headers, timeout)
+        )
+
+    def _send_request(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: float
+    ) -> str:
+        """发送单次请求，并将失败统一转换为应用异常"""
+        logger.debug(f"发送请求到 {url}，请求体: {json.dumps(payload, ensure_ascii=False)}")
+
+        try:
+            response = self.session.post(
+                url,
+                json=payload,
+                headers=headers,
+                verify=False,
+                timeout=timeout
+            )
+        except requests.exceptions.Timeout as e:
+            raise TimeoutError(f"API请求超时: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            raise AIServiceError(f"API请求异常: {str(e)}", error_code="CONNECTION_ERROR")
+
+        return self._handle_response(response)
+
+    async def _send_request_async(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: float
+    ) -> str:
+        """异步发送单次请求，并将失败统一转换为应用异常"""
+        logger.debug(f"异步发送请求到 {url}，请求体: {json.dumps(payload, ensure_ascii=False)}")
+
+        client = self._get_async_client()
+        try:
+            response = await client.post(url, json=payload, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"API请求超时: {str(e)}")
+        except httpx.HTTPError as e:
+            raise AIServiceError(f"API请求异常: {str(e)}", error_code="CONNECTION_ERROR")
+
+        return self._handle_response(response)
+
+    def _handle_response(self, response: Any) -> str:
+        """检查HTTP响应并提取模型输出（requests 和 httpx 的响应对象通用）"""
+        logger.debug(f"API响应状态码: {response.status_code}，内容: {response.text[:200]}")
+
+        if response.status_code == 429:
+            raise RateLimitError(
+                "API调用频率超限，请稍后重试",
+                details={"retry_after": parse_retry_after(response.headers.get("Retry-After"))}
+            )
+        if response.status_code >= 500:
+            raise AIServiceError(f"服务器错误: {response.status_code}", error_code="SERVER_ERROR")
+
+        self._check_response_status(response)
+
+        if response.status_code >= 400:
+            raise AIServiceError(f"API请求失败: HTTP {response.status_code} {response.text[:200]}")
+
+        try:
+            result = response.json()
+        except ValueError as e:
+            raise AIServiceError(f"API响应解析失败: {str(e)}")
+
+        return self._extract_response_content(result)
+
     def _parse_standard_json_response(self, response_text: str) -> Optional[str]:
         """标准JSON响应解析（大多数AI服务通用）"""
         if not response_text:
@@ -129,11 +488,7 @@ class BaseAIProvider(ABC):
             TimeoutError: 请求超时错误
             RateLimitError: 频率限制错误
         """
-        if not model:
-            model = self.config.models.get("default", "")
-
-        if not self._validate_config():
-            raise AIServiceError(f"AI服务配置无效: {self.config.name}")
+        model = self._prepare_model(model)
 
         # 构建提示词和请求
         prompt = self._build_prompt(question, options, question_type)
@@ -146,6 +501,125 @@ class BaseAIProvider(ABC):
 
         return answer
 
+    async def query_answer_async(
+        self,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        异步查询问题答案（与 query_answer 使用相同的提示词和解析逻辑）
+
+        Raises:
+            AIServiceError: AI服务相关错误
+            TimeoutError: 请求超时错误（超时的请求会被取消）
+            RateLimitError: 频率限制错误
+        """
+        model = self._prepare_model(model)
+
+        prompt = self._build_prompt(question, options, question_type)
+        payload = self._build_payload(prompt, model)
+        response_text = await self._make_request_async(payload, self._build_headers(), model)
+        return self._parse_ai_response(response_text)
+
+    def _prepare_model(self, model: Optional[str]) -> str:
+        """校验配置并确定使用的模型"""
+        if not self._validate_config():
+            raise AIServiceError(f"AI服务配置无效: {self.config.name}")
+        return model or self.config.models.get("default", "")
+
+    def query_answers_batch(
+        self,
+        questions: Sequence[BatchQuestion],
+        model: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        在一次请求中回答多道题（共用一份提示词说明）
+
+        每次请求最多包含 batch_size 道题；解析失败或缺失的题目
+        最多再重试 batch_retries 轮，每轮只重新请求失败的题目。
+
+        Args:
+            questions: (问题, 选项, 类型) 列表
+            model: 指定模型，如果为None则使用默认模型
+
+        Returns:
+            与输入顺序一致的答案列表，未能得到答案的题目为None
+
+        Raises:
+            AIServiceError: AI服务相关错误
+            TimeoutError: 请求超时错误
+            RateLimitError: 频率限制错误
+        """
+        model = self._prepare_model(model)
+
+        answers: List[Optional[str]] = [None] * len(questions)
+        pending = list(range(len(questions)))
+        headers = self._build_headers()
+
+        for attempt in range(self.batch_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                logger.info(f"{self.config.name} 批量答题有 {len(pending)} 道题未解析出答案，重试第 {attempt} 轮")
+
+            failed = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                prompt = self._build_batch_prompt([questions[index] for index in chunk])
+                response_text = self._make_request(self._build_payload(prompt, model), headers, model)
+                parsed = self._parse_batch_response(response_text, len(chunk))
+                for position, index in enumerate(chunk):
+                    if parsed.get(position):
+                        answers[index] = parsed[position]
+                    else:
+                        failed.append(index)
+            pending = failed
+
+        return answers
+
+    def _build_batch_prompt(self, questions: Sequence[BatchQuestion]) -> str:
+        """构建批量答题提示词"""
+        items = [
+            {"index": index, "问题": question, "选项": options or "", "类型": question_type or ""}
+            for index, (question, options, question_type) in enumerate(questions)
+        ]
+        return BATCH_PROMPT_PREAMBLE + "\n" + json.dumps(items, ensure_ascii=False)
+
+    @staticmethod
+    def _parse_batch_response(response_text: str, count: int) -> Dict[int, str]:
+        """解析批量答题响应，按序号映射答案（无法解析的题目不在结果中）"""
+        if not response_text:
+            return {}
+
+        start = response_text.find("[")
+        end = response_text.rfind("]")
+        if start == -1 or end <= start:
+            return {}
+
+        try:
+            items = json.loads(response_text[start:end + 1])
+        except json.JSONDecodeError:
+            logger.warning(f"批量答题响应不是有效的JSON数组: {response_text[:200]}")
+            return {}
+
+        answers = {}
+        for position, item in enumerate(items if isinstance(items, list) else []):
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get("index", position))
+            except (TypeError, ValueError):
+                continue
+
+            answer = item.get("answer", item.get("anwser"))
+            if isinstance(answer, list):
+                answer = "###".join(str(part) for part in answer)
+            if 0 <= index < count and isinstance(answer, (str, int, float)) and str(answer).strip():
+                answers[index] = str(answer).strip()
+        return answers
+
     def _validate_config(self) -> bool:
         """验证配置是否有效"""
         if not self.config.enabled:
@@ -161,14 +635,45 @@ class BaseAIProvider(ABC):
 
         return True
 
-    def health_check(self) -> bool:
-        """检查AI服务健康状态"""
+    def _get_probe_url(self) -> Optional[str]:
+        """获取轻量级健康探测URL（默认为OpenAI兼容的模型列表接口），返回None表示不做网络探测"""
+        base_url = self.config.base_url
+        if base_url.endswith("/chat/completions"):
+            return base_url[:-len("/chat/completions")] + "/models"
+        return None
+
+    def _handle_probe_response(self, response: requests.Response) -> None:
+        """处理探测响应（子类可覆盖，如缓存模型列表）"""
+        pass
+
+    def health_check(self, timeout: Optional[float] = None) -> bool:
+        """轻量级健康检查
+
+        只请求模型列表等免费接口，不调用模型生成答案；
+        没有可用探测接口的提供商只检查配置，实际可用性依赖真实请求的结果。
+        """
+        if not self._validate_config():
+            return False
+
+        url = self._get_probe_url()
+        if url is None:
+            return True
+
         try:
-            # 使用简单的问题进行测试
-            test_response = self.query_answer("1+1=?", "A.1 B.2 C.3", "single")
-            return test_response is not None
-        except Exception:
+            response = self.session.get(
+                url,
+                headers=self._build_headers(),
+                timeout=timeout or 5,
+                verify=False
+            )
+        except requests.RequestException:
+            return False
+
+        # 认证失败或服务端错误视为不健康；其他状态码（如接口不存在）说明服务可达
+        if response.status_code in (401, 403) or response.status_code >= 500:
             return False
+        self._handle_probe_response(response)
+        return True
 
     def get_service_info(self) -> Dict[str, Any]:
         """获取服务信息"""
@@ -180,6 +685,5 @@ class BaseAIProvider(ABC):
             "models": self.config.models,
             "timeout": self.timeout,
             "max_retries": self.max_retries,
-            "health_status": self.health_check(),
             "has_api_key": bool(self.config.api_key.strip()) if self.config.api_key else True
         }
\ No newline at end of file
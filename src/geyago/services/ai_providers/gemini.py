@@ -6,17 +6,10 @@ Google Gemini AI服务
 
 from __future__ import annotations
 import json
-import time
-import traceback
-from typing import Optional, Dict, Any, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    import requests
-else:
-    import requests
+from typing import Optional, Dict, Any
 
 from .base import BaseAIProvider
-from ...core.exceptions import AIServiceError, TimeoutError, RateLimitError
+from ...core.exceptions import AIServiceError
 
 
 class GeminiProvider(BaseAIProvider):
@@ -98,89 +91,24 @@ class GeminiProvider(BaseAIProvider):
         """解析AI响应，提取答案"""
         return self._parse_standard_json_response(response_text)
 
-    def _make_request(self, payload: Dict[str, Any], headers: Dict[str, str], model: str) -> str:
-        """发起API请求（包含重试逻辑）"""
-        last_exception = None
-
-        for attempt in range(self.max_retries):
-            try:
-                # 构建完整URL（替换模型名称占位符）
-                url = self.config.base_url.replace("{model}", model)
-
-                print(f"尝试 {attempt+1}/{self.max_retries} - 准备发送请求到 {url}")
-                print(f"请求体: {json.dumps(payload, ensure_ascii=False)}")
-
-                # 发送请求
-                response = requests.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    verify=False,
-                    timeout=self.timeout
-                )
-
-                print(f"API响应状态码: {response.status_code}")
-                print(f"API响应内容: {response.text[:200]}...")  # 只打印前200个字符
-
-                # 检查HTTP状态码
-                if response.status_code == 429:
-                    raise RateLimitError("API调用频率超限，请稍后重试")
-
-                if response.status_code >= 500:
-                    if attempt < self.max_retries - 1:
-                        print(f"服务器错误，将在 {self.retry_delay} 秒后重试...")
-                        time.sleep(self.retry_delay)
-                        self.retry_delay *= 2  # 指数退避
-                        continue
-                    else:
-                        raise AIServiceError(f"服务器错误: {response.status_code}")
-
-                response.raise_for_status()  # 检查请求是否成功
-
-                # 解析响应
-                result = response.json()
-
-                # Gemini API的响应格式
-                if "candidates" in result and len(result["candidates"]) > 0:
-                    candidate = result["candidates"][0]
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        parts = candidate["content"]["parts"]
-                        if len(parts) > 0 and "text" in parts[0]:
-                            return parts[0]["text"]
-
-                raise AIServiceError(f"API响应格式异常: {json.dumps(result, ensure_ascii=False)}")
-
-            except requests.exceptions.Timeout as e:
-                last_exception = TimeoutError(f"API请求超时: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    print(f"将在 {self.retry_delay} 秒后重试...")
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-            except requests.exceptions.RequestException as e:
-                last_exception = AIServiceError(f"API请求异常: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    print(f"将在 {self.retry_delay} 秒后重试...")
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-            except json.JSONDecodeError as e:
-                raise AIServiceError(f"API响应解析失败: {str(e)}")
-
-            except Exception as e:
-                error_trace = traceback.format_exc()
-                print(f"调用AI模型异常: {str(e)}")
-                print(f"详细错误信息: {error_trace}")
-                last_exception = AIServiceError(f"AI模型调用失败: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-        # 如果所有重试都失败了
-        if last_exception:
-            raise last_exception
-        else:
-            raise AIServiceError("多次尝试后仍无法获取答案")
\ No newline at end of file
+    def _get_request_url(self, model: str) -> str:
+        """构建完整URL（替换模型名称占位符）"""
+        return self.config.base_url.replace("{model}", model)
+
+    def _get_probe_url(self) -> Optional[str]:
+        """使用默认模型的元数据接口作为健康探测URL"""
+        model = self.config.models.get("default", "")
+        url = self._get_request_url(model)
+        return url[:url.rindex(":")] if url.endswith(":generateContent") else None
+
+    def _extract_response_content(self, result: Dict[str, Any]) -> str:
+        """从API响应JSON中提取模型输出的文本"""
+        # Gemini API的响应格式
+        if "candidates" in result and len(result["candidates"]) > 0:
+            candidate = result["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                parts = candidate["content"]["parts"]
+                if len(parts) > 0 and "text" in parts[0]:
+                    return parts[0]["text"]
+
+        raise AIServiceError(f"API响应格式异常: {json.dumps(result, ensure_ascii=False)}")
\ No newline at end of file
@@ -6,22 +6,22 @@ Ollama本地AI服务
 
 from __future__ import annotations
 import json
-import time
-import traceback
-from typing import Optional, Dict, Any, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    import requests
-else:
-    import requests
+from typing import Optional, Dict, Any
 
 from .base import BaseAIProvider
-from ...core.exceptions import AIServiceError, TimeoutError, RateLimitError
+from ...config.settings import AIProviderConfig
+from ...core.exceptions import AIServiceError
 
 
 class OllamaProvider(BaseAIProvider):
     """Ollama本地AI服务提供商"""
 
+    def __init__(self, config: AIProviderConfig, api_config: Dict[str, Any]):
+        super().__init__(config, api_config)
+        # 最近一次健康探测的结果和本地模型列表（由后台健康检查更新）
+        self._service_available: Optional[bool] = None
+        self._local_models: list = []
+
     def _build_prompt(self, question: str, options: str = "", question_type: str = "") -> str:
         """构建AI提示词"""
         prompt = (
@@ -68,85 +68,12 @@ class OllamaProvider(BaseAIProvider):
         """解析AI响应，提取答案"""
         return self._parse_standard_json_response(response_text)
 
-    def _make_request(self, payload: Dict[str, Any], headers: Dict[str, str], model: str) -> str:
-        """发起API请求（包含重试逻辑）"""
-        last_exception = None
-
-        for attempt in range(self.max_retries):
-            try:
-                print(f"尝试 {attempt+1}/{self.max_retries} - 准备发送请求到 {self.config.base_url}")
-                print(f"请求体: {json.dumps(payload, ensure_ascii=False)}")
-
-                # 发送请求
-                response = requests.post(
-                    self.config.base_url,
-                    json=payload,
-                    headers=headers,
-                    verify=False,
-                    timeout=self.timeout
-                )
-
-                print(f"API响应状态码: {response.status_code}")
-                print(f"API响应内容: {response.text[:200]}...")  # 只打印前200个字符
-
-                # 检查HTTP状态码
-                if response.status_code == 429:
-                    raise RateLimitError("API调用频率超限，请稍后重试")
-
-                if response.status_code >= 500:
-                    if attempt < self.max_retries - 1:
-                        print(f"服务器错误，将在 {self.retry_delay} 秒后重试...")
-                        time.sleep(self.retry_delay)
-                        self.retry_delay *= 2  # 指数退避
-                        continue
-                    else:
-                        raise AIServiceError(f"服务器错误: {response.status_code}")
-
-                response.raise_for_status()  # 检查请求是否成功
-
-                # 解析响应
-                result = response.json()
-
-                # Ollama API的响应格式
-                if "response" in result:
-                    return result["response"]
-                else:
-                    raise AIServiceError(f"API响应格式异常: {json.dumps(result, ensure_ascii=False)}")
-
-            except requests.exceptions.Timeout as e:
-                last_exception = TimeoutError(f"API请求超时: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    print(f"将在 {self.retry_delay} 秒后重试...")
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-            except requests.exceptions.RequestException as e:
-                last_exception = AIServiceError(f"API请求异常: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    print(f"将在 {self.retry_delay} 秒后重试...")
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-            except json.JSONDecodeError as e:
-                raise AIServiceError(f"API响应解析失败: {str(e)}")
-
-            except Exception as e:
-                error_trace = traceback.format_exc()
-                print(f"调用AI模型异常: {str(e)}")
-                print(f"详细错误信息: {error_trace}")
-                last_exception = AIServiceError(f"AI模型调用失败: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    self.retry_delay *= 2
-                    continue
-
-        # 如果所有重试都失败了
-        if last_exception:
-            raise last_exception
-        else:
-            raise AIServiceError("多次尝试后仍无法获取答案")
+    def _extract_response_content(self, result: Dict[str, Any]) -> str:
+        """从API响应JSON中提取模型输出的文本"""
+        # Ollama API的响应格式
+        if "response" in result:
+            return result["response"]
+        raise AIServiceError(f"API响应格式异常: {json.dumps(result, ensure_ascii=False)}")
 
     def _validate_config(self) -> bool:
         """验证配置是否有效"""
@@ -160,12 +87,31 @@ class OllamaProvider(BaseAIProvider):
         # Ollama不需要API密钥
         return True
 
+    def _get_probe_url(self) -> Optional[str]:
+        """使用本地模型列表接口作为健康探测URL"""
+        return self.config.base_url.replace("/api/chat", "/api/tags")
+
+    def _handle_probe_response(self, response) -> None:
+        """缓存探测时返回的本地模型列表"""
+        try:
+            result = response.json()
+        except ValueError:
+            return
+        if "models" in result:
+            self._local_models = [model["name"] for model in result["models"]]
+
+    def health_check(self, timeout: Optional[float] = None) -> bool:
+        """请求 /api/tags 检查Ollama服务是否可用"""
+        healthy = super().health_check(timeout)
+        self._service_available = healthy
+        return healthy
+
     def check_ollama_service(self) -> bool:
         """检查Ollama服务是否可用"""
         try:
             # 尝试获取本地模型列表
             url = self.config.base_url.replace("/api/chat", "/api/tags")
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -174,7 +120,7 @@ class OllamaProvider(BaseAIProvider):
         """获取本地可用模型列表"""
         try:
             url = self.config.base_url.replace("/api/chat", "/api/tags")
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             if response.status_code == 200:
                 result = response.json()
                 if "models" in result:
@@ -187,7 +133,7 @@ class OllamaProvider(BaseAIProvider):
         """获取服务信息"""
         base_info = super().get_service_info()
         base_info.update({
-            "service_available": self.check_ollama_service(),
-            "local_models": self.get_local_models()
+            "service_available": self._service_available,
+            "local_models": self._local_models
         })
         return base_info
\ No newline at end of file
@@ -10,6 +10,7 @@ from typing import Optional, Dict, Any
 from ..config.settings import settings
 from ..core.exceptions import AIServiceError, ValidationError
 from .ai_service_manager import AIServiceManager
+from .health_monitor import STATUS_HEALTHY
 
 
 class AIService:
@@ -52,12 +53,11 @@ class AIService:
         )
 
     def health_check(self) -> bool:
-        """检查默认AI服务健康状态"""
-        try:
-            test_response = self.manager.query_answer("1+1=?", "A.1 B.2 C.3", "single")
-            return test_response is not None
-        except Exception:
+        """检查默认AI服务健康状态（读取缓存的健康检查结果）"""
+        if not self.manager.default_provider_id:
             return False
+        health = self.manager.get_provider_health(self.manager.default_provider_id)
+        return bool(health and health.get("status") == STATUS_HEALTHY)
 
     def get_service_info(self) -> Dict[str, Any]:
         """获取AI服务信息"""
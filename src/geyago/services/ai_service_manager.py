@@ -5,11 +5,19 @@ AI服务管理器
 """
 
 from __future__ import annotations
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, List, Sequence
 from ..config.settings import Settings
 from ..core.exceptions import AIServiceError, ValidationError
+from .ai_providers.base import BatchQuestion
 from .ai_providers.factory import AIProviderFactory
+from .circuit_breaker import CircuitBreaker
+from .health_monitor import ProviderHealthMonitor, STATUS_HEALTHY
+from .provider_router import ProviderRouter
 
 
 logger = logging.getLogger(__name__)
@@ -21,7 +29,25 @@ class AIServiceManager:
     def __init__(self, settings: Optional[Settings] = None):
         self.settings = settings
         self.providers: Dict[str, Any] = {}
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
         self.default_provider_id: Optional[str] = None
+        self.router: Optional[ProviderRouter] = None
+        self.health_monitor: Optional[ProviderHealthMonitor] = None
+
+        # 提供商列表的切换锁，以及创建熔断器时的配置快照（用于重新加载时保留未变化提供商的熔断器）
+        self._providers_lock = threading.Lock()
+        self._provider_signatures: Dict[str, Any] = {}
+
+        # 对冲请求线程池（按需创建）及统计
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        self._hedge_stats = {
+            "eligible": 0,
+            "fired": 0,
+            "won": 0,
+            "primary_won": 0,
+            "skipped_budget": 0
+        }
 
     def initialize(self):
         """初始化所有可用的AI服务提供商"""
@@ -35,14 +61,11 @@ class AIServiceManager:
 
         logger.info(f"开始初始化AI服务提供商，默认AI: {self.settings.app.default_ai}")
 
+        self._create_router()
         enabled_providers = self.settings.get_enabled_providers()
         logger.info(f"找到 {len(enabled_providers)} 个启用的AI服务提供商: {list(enabled_providers.keys())}")
 
-        api_config = {
-            "timeout": self.settings.api_config.timeout,
-            "max_retries": self.settings.api_config.max_retries,
-            "retry_delay": self.settings.api_config.retry_delay
-        }
+        api_config = self._build_api_config()
 
         for provider_id, config in enabled_providers.items():
             try:
@@ -50,6 +73,8 @@ class AIServiceManager:
                 provider = AIProviderFactory.create_provider(config, api_config)
                 if provider:
                     self.providers[provider_id] = provider
+                    self.circuit_breakers[provider_id] = self._create_circuit_breaker(provider_id)
+                    self._provider_signatures[provider_id] = self._provider_signature(config)
                     logger.info(f"成功初始化AI服务提供商: {config.name}")
                 else:
                     logger.warning(f"AI服务提供商 {provider_id} 创建失败，返回None")
@@ -72,35 +97,96 @@ class AIServiceManager:
         else:
             logger.info(f"AI服务管理器初始化完成，共 {len(self.providers)} 个提供商")
 
+    def _build_api_config(self) -> Dict[str, Any]:
+        """构建传递给提供商的API调用配置"""
+        return self.settings.api_config.model_dump()
+
+    def _create_router(self) -> None:
+        """创建自适应路由器和健康监控器（重新加载提供商时保留已有的统计）"""
+        if self.health_monitor is None:
+            health_config = self.settings.health_check
+            self.health_monitor = ProviderHealthMonitor(
+                ttl_seconds=health_config.ttl_seconds,
+                interval_seconds=health_config.interval_seconds,
+                probe_timeout=health_config.probe_timeout,
+                failure_threshold=health_config.failure_threshold
+            )
+
+        if self.router is not None:
+            return
+
+        routing_config = self.settings.routing
+        self.router = ProviderRouter(
+            latency_weight=routing_config.latency_weight,
+            failure_penalty=routing_config.failure_penalty,
+            exploration_ratio=routing_config.exploration_ratio,
+            ewma_alpha=routing_config.ewma_alpha
+        )
+
+    def _create_circuit_breaker(self, provider_id: str) -> CircuitBreaker:
+        """为提供商创建熔断器"""
+        breaker_config = self.settings.circuit_breaker
+        return CircuitBreaker(
+            provider_id,
+            failure_threshold=breaker_config.failure_threshold,
+            recovery_timeout=breaker_config.recovery_timeout,
+            enabled=breaker_config.enabled
+        )
+
+    def _provider_signature(self, config) -> Any:
+        """提供商配置快照，配置和熔断参数都未变化时重新加载可沿用原熔断器"""
+        return (config.model_dump(), self.settings.circuit_breaker.model_dump())
+
     def _initialize_providers(self):
-        """初始化所有可用的AI服务提供商"""
+        """初始化所有可用的AI服务提供商
+
+        新的提供商和熔断器先在旁边构建好，再在锁内一次性替换，最后才关闭被替换的旧提供商，
+        重新加载期间并发请求始终能看到完整的提供商列表。配置未变化的提供商沿用原熔断器及其状态。
+        """
+        self._create_router()
         enabled_providers = self.settings.get_enabled_providers()
-        api_config = {
-            "timeout": self.settings.api_timeout,
-            "max_retries": self.settings.max_retries,
-            "retry_delay": self.settings.retry_delay
-        }
+        api_config = self._build_api_config()
 
+        providers: Dict[str, Any] = {}
+        circuit_breakers: Dict[str, CircuitBreaker] = {}
+        signatures: Dict[str, Any] = {}
         for provider_id, config in enabled_providers.items():
             try:
                 provider = AIProviderFactory.create_provider(config, api_config)
                 if provider:
-                    self.providers[provider_id] = provider
+                    signature = self._provider_signature(config)
+                    breaker = self.circuit_breakers.get(provider_id)
+                    if breaker is None or self._provider_signatures.get(provider_id) != signature:
+                        breaker = self._create_circuit_breaker(provider_id)
+                    providers[provider_id] = provider
+                    circuit_breakers[provider_id] = breaker
+                    signatures[provider_id] = signature
                     logger.info(f"成功初始化AI服务提供商: {config.name}")
 
             except Exception as e:
                 logger.error(f"初始化AI服务提供商失败 {provider_id}: {str(e)}")
                 continue
 
-        # 设置默认提供商
+        # 选择默认提供商
+        default_provider_id = None
         default_provider = self.settings.get_default_ai_provider()
         if default_provider:
-            self.default_provider_id = self.settings.app.default_ai
+            default_provider_id = self.settings.app.default_ai
             logger.info(f"设置默认AI服务提供商: {default_provider.name}")
-        elif self.providers:
+        elif providers:
             # 如果配置的默认提供商不可用，使用第一个可用的
-            self.default_provider_id = list(self.providers.keys())[0]
-            logger.warning(f"配置的默认AI服务不可用，使用: {self.default_provider_id}")
+            default_provider_id = list(providers.keys())[0]
+            logger.warning(f"配置的默认AI服务不可用，使用: {default_provider_id}")
+
+        with self._providers_lock:
+            old_providers = self.providers
+            self.providers = providers
+            self.circuit_breakers = circuit_breakers
+            self._provider_signatures = signatures
+            if default_provider_id:
+                self.default_provider_id = default_provider_id
+
+        self._close_provider_sessions(old_providers)
 
         if not self.providers:
             logger.warning("没有可用的AI服务提供商")
@@ -137,16 +223,28 @@ class AIServiceManager:
         if provider_id:
             if provider_id not in self.providers:
                 raise ValidationError(f"AI服务提供商不存在: {provider_id}")
-            provider = self.providers[provider_id]
+            if not self._is_provider_available(provider_id):
+                raise AIServiceError(f"AI服务 {provider_id} 已熔断，暂时不可用")
         else:
             if not self.default_provider_id:
                 raise AIServiceError("没有可用的AI服务提供商")
-            provider = self.providers[self.default_provider_id]
+            if self.settings.routing.mode == "adaptive":
+                return self._query_adaptive(question, options, question_type, model)
             provider_id = self.default_provider_id
+            if not self._is_provider_available(provider_id):
+                # 已知不可用的默认提供商直接跳过，不再等待超时和重试
+                logger.warning(f"默认AI服务 {provider_id} 已熔断，直接使用备用提供商")
+                return self._try_fallback_providers(question, options, question_type, model)
+            if self._hedging_enabled():
+                logger.info(f"使用AI服务提供商 {provider_id} 查询问题（启用对冲）: {question[:50]}...")
+                return self._query_in_order(
+                    [provider_id] + self._available_fallback_ids(),
+                    question, options, question_type, model
+                )
 
         try:
             logger.info(f"使用AI服务提供商 {provider_id} 查询问题: {question[:50]}...")
-            answer = provider.query_answer(question, options, question_type, model)
+            answer = self._call_provider(provider_id, question, options, question_type, model)
             logger.info(f"AI服务 {provider_id} 返回答案: {answer}")
             return answer
 
@@ -158,6 +256,18 @@ class AIServiceManager:
             else:
                 raise AIServiceError(f"AI服务查询失败: {str(e)}")
 
+    def _available_fallback_ids(self) -> List[str]:
+        """获取除默认提供商外、当前未熔断的备用提供商"""
+        fallback_ids = []
+        for fallback_id in list(self.providers.keys()):
+            if fallback_id == self.default_provider_id:
+                continue
+            if not self._is_provider_available(fallback_id):
+                logger.info(f"备用AI服务提供商 {fallback_id} 已熔断，跳过")
+                continue
+            fallback_ids.append(fallback_id)
+        return fallback_ids
+
     def _try_fallback_providers(
         self,
         question: str,
@@ -166,41 +276,573 @@ class AIServiceManager:
         model: Optional[str] = None
     ) -> Optional[str]:
         """尝试使用备用提供商"""
-        for fallback_id, fallback_provider in self.providers.items():
-            if fallback_id == self.default_provider_id:
-                continue  # 跳过已经失败的默认提供商
+        return self._query_in_order(self._available_fallback_ids(), question, options, question_type, model)
+
+    def _query_adaptive(
+        self,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """自适应路由：按延迟和成功率排序可用的提供商，依次尝试"""
+        candidates = [
+            (provider_id, self._model_key(provider_id, model))
+            for provider_id in list(self.providers.keys())
+            if self._is_provider_available(provider_id)
+        ]
+        if not candidates:
+            logger.warning("所有AI服务提供商均已熔断")
+            return None
+
+        ranked_ids = [provider_id for provider_id, _ in self.router.rank(candidates)]
+        logger.info(f"自适应路由选择AI服务提供商 {ranked_ids[0]} 查询问题: {question[:50]}...")
+        return self._query_in_order(ranked_ids, question, options, question_type, model)
+
+    def _query_in_order(
+        self,
+        provider_ids: List[str],
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """按顺序尝试提供商，启用对冲时前两个提供商以对冲方式并发竞争"""
+        remaining = list(provider_ids)
+        if self._hedging_enabled() and len(remaining) >= 2:
+            primary_id, backup_id = remaining[0], remaining[1]
+            remaining = remaining[2:]
+            try:
+                answer = self._hedged_call(primary_id, backup_id, question, options, question_type, model)
+                if answer:
+                    return answer
+            except Exception as e:
+                logger.warning(f"AI服务 {primary_id} 和 {backup_id} 均查询失败，尝试下一个提供商: {str(e)}")
+
+        for provider_id in remaining:
+            try:
+                logger.info(f"尝试使用AI服务提供商 {provider_id}")
+                answer = self._call_provider(provider_id, question, options, question_type, model)
+                logger.info(f"AI服务 {provider_id} 返回答案: {answer}")
+                return answer
+            except Exception as e:
+                logger.warning(f"AI服务 {provider_id} 查询失败，尝试下一个提供商: {str(e)}")
+
+        return None
+
+    def _hedging_enabled(self) -> bool:
+        """是否启用对冲请求"""
+        return bool(self.settings and self.settings.hedging.enabled)
+
+    def _hedge_delay(self, provider_id: str, model: Optional[str]) -> float:
+        """计算对冲延迟：首选提供商最近延迟的分位数，样本不足时使用配置的固定延迟"""
+        hedging_config = self.settings.hedging
+        delay = None
+        if self.router:
+            delay = self.router.latency_percentile(
+                provider_id,
+                self._model_key(provider_id, model),
+                hedging_config.percentile,
+                hedging_config.min_samples
+            )
+        if delay is None:
+            delay = hedging_config.delay_seconds
+        return max(hedging_config.min_delay_seconds, delay)
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        """获取对冲请求线程池"""
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=max(2, self.settings.hedging.max_workers),
+                    thread_name_prefix="ai-hedge"
+                )
+            return self._hedge_executor
+
+    def _try_acquire_hedge_budget(self) -> bool:
+        """检查对冲请求是否超过 max_hedge_ratio 预算，未超过时计入一次对冲"""
+        with self._hedge_lock:
+            allowed = self._hedge_stats["fired"] + 1 <= (
+                self.settings.hedging.max_hedge_ratio * self._hedge_stats["eligible"]
+            )
+            if allowed:
+                self._hedge_stats["fired"] += 1
+            else:
+                self._hedge_stats["skipped_budget"] += 1
+            return allowed
+
+    def _record_hedge_result(self, key: str) -> None:
+        """记录对冲结果统计"""
+        with self._hedge_lock:
+            self._hedge_stats[key] += 1
+
+    def _hedged_call(
+        self,
+        primary_id: str,
+        backup_id: str,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """对冲调用：首选提供商超过对冲延迟仍未返回时向备用提供商再发一次请求，返回先到达的有效答案
 
+        未被采用的请求无法中断，其结果会被丢弃（仍计入熔断器和路由统计）。
+        首选提供商在对冲触发前失败时退化为普通的故障转移。
+        """
+        with self._hedge_lock:
+            self._hedge_stats["eligible"] += 1
+
+        executor = self._get_hedge_executor()
+        delay = self._hedge_delay(primary_id, model)
+        primary = executor.submit(self._call_provider, primary_id, question, options, question_type, model)
+
+        done, _ = wait([primary], timeout=delay)
+        if done and (primary.exception() is not None or not primary.result()):
+            if primary.exception() is not None:
+                logger.warning(f"AI服务 {primary_id} 查询失败，使用备用提供商 {backup_id}: {primary.exception()}")
+            return self._call_provider(backup_id, question, options, question_type, model)
+        if done:
+            return primary.result()
+
+        if not self._try_acquire_hedge_budget():
+            logger.debug(f"对冲请求已达比例上限，继续等待AI服务 {primary_id}")
             try:
-                logger.info(f"尝试使用备用AI服务提供商 {fallback_id}")
-                answer = fallback_provider.query_answer(question, options, question_type, model)
-                logger.info(f"备用AI服务 {fallback_id} 返回答案: {answer}")
+                answer = primary.result()
+            except Exception as e:
+                logger.warning(f"AI服务 {primary_id} 查询失败，使用备用提供商 {backup_id}: {str(e)}")
+                answer = None
+            if answer:
                 return answer
+            return self._call_provider(backup_id, question, options, question_type, model)
+
+        logger.info(f"AI服务 {primary_id} 超过 {delay:.3f} 秒未返回，向 {backup_id} 发起对冲请求")
+        backup = executor.submit(self._call_provider, backup_id, question, options, question_type, model)
+        futures = {primary: primary_id, backup: backup_id}
+        pending = set(futures)
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    last_error = error
+                    logger.warning(f"AI服务 {futures[future]} 查询失败: {str(error)}")
+                    continue
+                answer = future.result()
+                if answer:
+                    self._record_hedge_result("won" if future is backup else "primary_won")
+                    for other in pending:
+                        other.cancel()
+                    logger.info(f"对冲请求由AI服务 {futures[future]} 胜出")
+                    return answer
+
+        if last_error is not None:
+            raise last_error
+        return None
+
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """获取对冲请求统计"""
+        with self._hedge_lock:
+            stats = dict(self._hedge_stats)
+        stats["enabled"] = self._hedging_enabled()
+        stats["max_hedge_ratio"] = self.settings.hedging.max_hedge_ratio if self.settings else 0.0
+        stats["hedge_ratio"] = round(stats["fired"] / stats["eligible"], 4) if stats["eligible"] else 0.0
+        return stats
+
+    async def query_answer_async(
+        self,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        异步查询问题答案（选择提供商、故障转移和对冲的规则与 query_answer 相同）
+
+        等待AI响应期间不占用线程；超时或对冲失败的请求会被真正取消。
+
+        Args:
+            question: 问题文本
+            options: 选项文本
+            question_type: 问题类型
+            provider_id: 指定AI服务提供商，如果为None则使用默认提供商
+            model: 指定模型，如果为None则使用提供商默认模型
+
+        Returns:
+            答案文本，如果失败返回None
 
+        Raises:
+            AIServiceError: AI服务相关错误
+            ValidationError: 数据验证错误
+        """
+        if not question.strip():
+            raise ValidationError("问题不能为空")
+
+        if provider_id:
+            if provider_id not in self.providers:
+                raise ValidationError(f"AI服务提供商不存在: {provider_id}")
+            if not self._is_provider_available(provider_id):
+                raise AIServiceError(f"AI服务 {provider_id} 已熔断，暂时不可用")
+            try:
+                logger.info(f"使用AI服务提供商 {provider_id} 异步查询问题: {question[:50]}...")
+                return await self._call_provider_async(provider_id, question, options, question_type, model)
             except Exception as e:
-                logger.warning(f"备用AI服务 {fallback_id} 也失败了: {str(e)}")
-                continue
+                logger.error(f"AI服务 {provider_id} 查询失败: {str(e)}")
+                raise AIServiceError(f"AI服务查询失败: {str(e)}")
+
+        if not self.default_provider_id:
+            raise AIServiceError("没有可用的AI服务提供商")
+        provider_ids = self._ordered_provider_ids(model)
+        if not provider_ids:
+            logger.warning("所有AI服务提供商均已熔断")
+            return None
+        return await self._query_in_order_async(provider_ids, question, options, question_type, model)
+
+    async def _query_in_order_async(
+        self,
+        provider_ids: List[str],
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """按顺序异步尝试提供商，启用对冲时前两个提供商以对冲方式并发竞争"""
+        remaining = list(provider_ids)
+        if self._hedging_enabled() and len(remaining) >= 2:
+            primary_id, backup_id = remaining[0], remaining[1]
+            remaining = remaining[2:]
+            try:
+                answer = await self._hedged_call_async(primary_id, backup_id, question, options, question_type, model)
+                if answer:
+                    return answer
+            except Exception as e:
+                logger.warning(f"AI服务 {primary_id} 和 {backup_id} 均查询失败，尝试下一个提供商: {str(e)}")
+
+        for provider_id in remaining:
+            try:
+                logger.info(f"尝试使用AI服务提供商 {provider_id}")
+                answer = await self._call_provider_async(provider_id, question, options, question_type, model)
+                logger.info(f"AI服务 {provider_id} 返回答案: {answer}")
+                return answer
+            except Exception as e:
+                logger.warning(f"AI服务 {provider_id} 查询失败，尝试下一个提供商: {str(e)}")
 
         return None
 
-    def health_check(self) -> Dict[str, Any]:
-        """检查所有AI服务的健康状态"""
-        health_status = {}
+    async def _hedged_call_async(
+        self,
+        primary_id: str,
+        backup_id: str,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """异步对冲调用：与 _hedged_call 规则相同，但未被采用的请求会被取消而不是丢弃结果"""
+        with self._hedge_lock:
+            self._hedge_stats["eligible"] += 1
+
+        delay = self._hedge_delay(primary_id, model)
+        primary = asyncio.ensure_future(
+            self._call_provider_async(primary_id, question, options, question_type, model)
+        )
+
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done and (primary.exception() is not None or not primary.result()):
+            if primary.exception() is not None:
+                logger.warning(f"AI服务 {primary_id} 查询失败，使用备用提供商 {backup_id}: {primary.exception()}")
+            return await self._call_provider_async(backup_id, question, options, question_type, model)
+        if done:
+            return primary.result()
+
+        if not self._try_acquire_hedge_budget():
+            logger.debug(f"对冲请求已达比例上限，继续等待AI服务 {primary_id}")
+            try:
+                answer = await primary
+            except Exception as e:
+                logger.warning(f"AI服务 {primary_id} 查询失败，使用备用提供商 {backup_id}: {str(e)}")
+                answer = None
+            if answer:
+                return answer
+            return await self._call_provider_async(backup_id, question, options, question_type, model)
 
-        for provider_id, provider in self.providers.items():
+        logger.info(f"AI服务 {primary_id} 超过 {delay:.3f} 秒未返回，向 {backup_id} 发起对冲请求")
+        backup = asyncio.ensure_future(
+            self._call_provider_async(backup_id, question, options, question_type, model)
+        )
+        tasks = {primary: primary_id, backup: backup_id}
+        pending = set(tasks)
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        last_error = error
+                        logger.warning(f"AI服务 {tasks[task]} 查询失败: {str(error)}")
+                        continue
+                    answer = task.result()
+                    if answer:
+                        self._record_hedge_result("won" if task is backup else "primary_won")
+                        logger.info(f"对冲请求由AI服务 {tasks[task]} 胜出")
+                        return answer
+        finally:
+            # 胜出或调用方被取消时，取消仍在进行的请求
+            for task in pending:
+                task.cancel()
+
+        if last_error is not None:
+            raise last_error
+        return None
+
+    async def aclose_providers(self) -> None:
+        """关闭所有提供商在当前事件循环中的异步HTTP客户端"""
+        for provider_id, provider in list(self.providers.items()):
             try:
-                is_healthy = provider.health_check()
-                health_status[provider_id] = {
-                    "status": "healthy" if is_healthy else "unhealthy",
-                    "last_check": "now"
-                }
+                await provider.aclose()
             except Exception as e:
-                health_status[provider_id] = {
-                    "status": "error",
-                    "error": str(e),
-                    "last_check": "now"
-                }
+                logger.warning(f"关闭AI服务提供商 {provider_id} 的异步HTTP客户端失败: {str(e)}")
+
+    def query_answers_batch(
+        self,
+        questions: Sequence[BatchQuestion],
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        批量查询多道题的答案（每个提供商按 batch_size 把多道题合并到一次请求）
+
+        提供商的选择顺序与 query_answer 相同；某个提供商失败或部分题目没有答案时，
+        只把剩余题目交给下一个提供商。
+
+        Args:
+            questions: (问题, 选项, 类型) 列表
+            provider_id: 指定AI服务提供商（只使用该提供商）
+            model: 指定模型
+
+        Returns:
+            与输入顺序一致的答案列表，未能得到答案的题目为None
+        """
+        if provider_id:
+            if provider_id not in self.providers:
+                raise ValidationError(f"AI服务提供商不存在: {provider_id}")
+            if not self._is_provider_available(provider_id):
+                raise AIServiceError(f"AI服务 {provider_id} 已熔断，暂时不可用")
+            provider_ids = [provider_id]
+        else:
+            if not self.default_provider_id:
+                raise AIServiceError("没有可用的AI服务提供商")
+            provider_ids = self._ordered_provider_ids(model)
+
+        answers: List[Optional[str]] = [None] * len(questions)
+        pending = list(range(len(questions)))
+        for current_id in provider_ids:
+            if not pending:
+                break
+            try:
+                logger.info(f"使用AI服务提供商 {current_id} 批量回答 {len(pending)} 道题")
+                results = self._call_provider_batch(current_id, [questions[index] for index in pending], model)
+            except Exception as e:
+                logger.warning(f"AI服务 {current_id} 批量查询失败，尝试下一个提供商: {str(e)}")
+                continue
+
+            for index, answer in zip(pending, results):
+                answers[index] = answer
+            pending = [index for index in pending if not answers[index]]
+
+        return answers
+
+    def _ordered_provider_ids(self, model: Optional[str] = None) -> List[str]:
+        """按当前路由模式获取可用提供商的尝试顺序"""
+        if self.settings.routing.mode == "adaptive":
+            candidates = [
+                (provider_id, self._model_key(provider_id, model))
+                for provider_id in list(self.providers.keys())
+                if self._is_provider_available(provider_id)
+            ]
+            return [provider_id for provider_id, _ in self.router.rank(candidates)]
+
+        provider_ids = []
+        if self._is_provider_available(self.default_provider_id):
+            provider_ids.append(self.default_provider_id)
+        return provider_ids + self._available_fallback_ids()
+
+    def _call_provider_batch(
+        self,
+        provider_id: str,
+        questions: Sequence[BatchQuestion],
+        model: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """批量调用指定提供商并记录熔断器和健康状态
+
+        批量请求的耗时与题目数量相关，不计入路由的延迟统计。
+        """
+        provider = self.providers[provider_id]
+        breaker = self.circuit_breakers.get(provider_id)
+        try:
+            answers = provider.query_answers_batch(questions, model)
+        except Exception as e:
+            if breaker:
+                breaker.record_failure()
+            if self.health_monitor:
+                self.health_monitor.record_traffic(provider_id, False, str(e))
+            raise
+
+        if breaker:
+            breaker.record_success()
+        if self.health_monitor:
+            self.health_monitor.record_traffic(provider_id, True)
+        return answers
+
+    def _model_key(self, provider_id: str, model: Optional[str]) -> str:
+        """获取用于统计的模型名称（未指定时为提供商默认模型）"""
+        if model:
+            return model
+        provider = self.providers.get(provider_id)
+        return provider.config.models.get("default", "") if provider else ""
+
+    def _call_provider(
+        self,
+        provider_id: str,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """调用指定提供商并将结果记录到熔断器和路由统计"""
+        provider = self.providers[provider_id]
+        start = time.monotonic()
+        try:
+            answer = provider.query_answer(question, options, question_type, model)
+        except Exception as e:
+            self._record_call(provider_id, model, time.monotonic() - start, e)
+            raise
+
+        self._record_call(provider_id, model, time.monotonic() - start)
+        return answer
+
+    async def _call_provider_async(
+        self,
+        provider_id: str,
+        question: str,
+        options: str = "",
+        question_type: str = "",
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """异步调用指定提供商并将结果记录到熔断器和路由统计（被取消的请求不计入统计）"""
+        provider = self.providers[provider_id]
+        start = time.monotonic()
+        try:
+            answer = await provider.query_answer_async(question, options, question_type, model)
+        except Exception as e:
+            self._record_call(provider_id, model, time.monotonic() - start, e)
+            raise
+
+        self._record_call(provider_id, model, time.monotonic() - start)
+        return answer
 
-        return health_status
+    def _record_call(
+        self,
+        provider_id: str,
+        model: Optional[str],
+        latency: float,
+        error: Optional[Exception] = None
+    ) -> None:
+        """将一次调用结果记录到熔断器、路由统计和健康状态"""
+        breaker = self.circuit_breakers.get(provider_id)
+        success = error is None
+        if breaker:
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+        if self.router:
+            self.router.record(provider_id, self._model_key(provider_id, model), latency, success)
+        if self.health_monitor:
+            self.health_monitor.record_traffic(provider_id, success, None if success else str(error))
+
+    def _is_provider_available(self, provider_id: str) -> bool:
+        """检查提供商是否可以接收请求，熔断恢复时间已到时在后台发起探测"""
+        breaker = self.circuit_breakers.get(provider_id)
+        if breaker is None or breaker.allow_request():
+            return True
+
+        if breaker.begin_probe():
+            threading.Thread(
+                target=self._probe_provider,
+                args=(provider_id,),
+                name=f"ai-probe-{provider_id}",
+                daemon=True
+            ).start()
+        return False
+
+    def _probe_provider(self, provider_id: str) -> None:
+        """后台探测已熔断的提供商是否恢复"""
+        provider = self.providers.get(provider_id)
+        breaker = self.circuit_breakers.get(provider_id)
+        if provider is None or breaker is None:
+            return
+
+        if self.health_monitor:
+            healthy = self.health_monitor.probe(provider_id, provider)
+        else:
+            try:
+                healthy = provider.health_check()
+            except Exception:
+                healthy = False
+
+        if healthy:
+            logger.info(f"AI服务 {provider_id} 探测成功，熔断器关闭")
+            breaker.record_success()
+        else:
+            logger.warning(f"AI服务 {provider_id} 探测失败，熔断器保持打开")
+            breaker.record_failure()
+
+    def get_routing_stats(self, provider_id: Optional[str] = None) -> Dict[str, Any]:
+        """获取路由统计（按提供商/模型）"""
+        return self.router.get_stats(provider_id) if self.router else {}
+
+    def get_circuit_breaker_status(self, provider_id: str) -> Optional[Dict[str, Any]]:
+        """获取指定提供商的熔断器状态"""
+        breaker = self.circuit_breakers.get(provider_id)
+        return breaker.get_status() if breaker else None
+
+    def health_check(self) -> Dict[str, Any]:
+        """获取所有AI服务的健康状态（只读取后台检查和真实请求缓存的结果）"""
+        if self.health_monitor is None:
+            return {}
+        return self.health_monitor.get_all(list(self.providers.keys()))
+
+    def is_any_provider_healthy(self) -> bool:
+        """是否至少有一个提供商的缓存状态为健康"""
+        return any(
+            status.get("status") == STATUS_HEALTHY
+            for status in self.health_check().values()
+        )
+
+    def get_provider_health(self, provider_id: str) -> Optional[Dict[str, Any]]:
+        """获取指定提供商缓存的健康状态"""
+        if self.health_monitor is None or provider_id not in self.providers:
+            return None
+        return self.health_monitor.get(provider_id)
+
+    def refresh_health(self, force: bool = True) -> Dict[str, Any]:
+        """立即探测提供商并返回最新的健康状态"""
+        if self.health_monitor is not None:
+            self.health_monitor.refresh(dict(self.providers), force=force)
+        return self.health_check()
+
+    def start_health_monitor(self) -> None:
+        """启动后台健康检查线程"""
+        if not self.settings or not self.settings.health_check.enabled:
+            return
+        self._create_router()
+        self.health_monitor.start(lambda: dict(self.providers))
 
     def get_providers_info(self) -> Dict[str, Any]:
         """获取所有AI服务提供商的详细信息"""
@@ -209,6 +851,7 @@ class AIServiceManager:
         for provider_id, provider in self.providers.items():
             try:
                 providers_info[provider_id] = provider.get_service_info()
+                providers_info[provider_id]["health_status"] = self.get_provider_health(provider_id)
             except Exception as e:
                 providers_info[provider_id] = {
                     "provider_id": provider_id,
@@ -242,15 +885,66 @@ class AIServiceManager:
             "default_provider": self.default_provider_id,
             "health_status": self.health_check(),
             "available_providers": list(self.providers.keys()),
+            "routing": {
+                "mode": self.settings.routing.mode if self.settings else "default",
+                "summary": self.router.get_summary() if self.router else None,
+                "stats": self.get_routing_stats()
+            },
+            "hedging": self.get_hedging_stats(),
+            "health_monitor": self.health_monitor.get_stats() if self.health_monitor else None,
+            "circuit_breakers": {
+                provider_id: breaker.get_status()
+                for provider_id, breaker in self.circuit_breakers.items()
+            },
             "providers_info": self.get_providers_info()
         }
 
-    def reload_providers(self):
-        """重新加载AI服务提供商（用于配置更新后）"""
+    def reload_providers(self, reset_routing: bool = False):
+        """重新加载AI服务提供商（用于配置更新后）
+
+        Args:
+            reset_routing: 是否按新配置重建路由器、健康监控器和对冲线程池（重新读取配置文件时使用，
+                会丢弃已有的路由统计）
+        """
         logger.info("重新加载AI服务提供商")
-        self.providers.clear()
+        if reset_routing:
+            with self._hedge_lock:
+                executor, self._hedge_executor = self._hedge_executor, None
+            if executor is not None:
+                executor.shutdown(wait=False)
+            if self.health_monitor is not None:
+                self.health_monitor.stop(timeout=1.0)
+            self.health_monitor = None
+            self.router = None
         self._initialize_providers()
 
+    def _close_provider_sessions(self, providers: Dict[str, Any]):
+        """关闭给定提供商的HTTP会话"""
+        for provider_id, provider in providers.items():
+            try:
+                provider.close()
+            except Exception as e:
+                logger.warning(f"关闭AI服务提供商 {provider_id} 的HTTP会话失败: {str(e)}")
+
+    def close_providers(self):
+        """关闭所有提供商的HTTP会话并清空提供商列表"""
+        with self._providers_lock:
+            providers = self.providers
+            self.providers = {}
+            self.circuit_breakers = {}
+            self._provider_signatures = {}
+        self._close_provider_sessions(providers)
+
+    def shutdown(self):
+        """停止后台健康检查，关闭对冲线程池和所有提供商的HTTP会话"""
+        with self._hedge_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.health_monitor is not None:
+            self.health_monitor.stop(timeout=1.0)
+        self.close_providers()
+
     def set_default_provider(self, provider_id: str) -> bool:
         """设置默认AI服务提供商"""
         if provider_id not in self.providers:
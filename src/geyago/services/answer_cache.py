@@ -0,0 +1,193 @@
+"""
+答案缓存模块
+
+在问答服务前提供进程内的LRU/TTL答案缓存，按字节数限制内存占用
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Set, Tuple
+
+from ..utils.helpers import build_question_key, normalize_question_text
+
+# 缓存键：(标准化问题, 标准化选项, 题目类型)
+CacheKey = Tuple[str, str, str]
+
+# 每个条目除文本外的估算固定开销（字节）
+ENTRY_OVERHEAD_BYTES = 256
+
+
+@dataclass
+class CachedAnswer:
+    """缓存的答案（code 和 source 与首次查询结果一致）"""
+    answer: str
+    source: str
+    size: int
+    expires_at: float
+    code: int = 1
+
+
+class AnswerCache:
+    """线程安全的LRU答案缓存
+
+    同时受条目数和总字节数限制，超出任一限制时淘汰最久未使用的条目；
+    ttl_seconds 大于0时条目过期后在读取时惰性删除。
+
+    缓存只在当前进程内有效：多进程服务器中每个worker各有一份，失效操作只作用于执行写入的worker，
+    其他worker中的旧答案在 ttl_seconds 后过期。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        enabled: bool = True
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[CacheKey, CachedAnswer] = OrderedDict()
+        # 标准化问题 -> 该问题下的所有缓存键，用于按问题失效
+        self._keys_by_question: Dict[str, Set[CacheKey]] = {}
+        self._current_bytes = 0
+
+        # 统计信息
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(
+        question_text: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None
+    ) -> CacheKey:
+        """构建缓存键"""
+        return (
+            build_question_key(question_text),
+            normalize_question_text(options or ""),
+            (question_type or "").strip().lower()
+        )
+
+    def get(self, key: CacheKey) -> Optional[CachedAnswer]:
+        """读取缓存，命中时将条目移动到最近使用的位置"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            if entry.expires_at and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def set(self, key: CacheKey, answer: str, source: str, code: int = 1) -> bool:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            answer: 答案
+            source: 答案来源（database / fuzzy / ai）
+            code: 首次查询结果的 code，命中缓存时原样返回
+
+        Returns:
+            是否写入成功（单个条目超过字节上限时不缓存）
+        """
+        if not self.enabled or not answer:
+            return False
+
+        size = ENTRY_OVERHEAD_BYTES + sum(len(part.encode('utf-8')) for part in key)
+        size += len(answer.encode('utf-8'))
+        if size > self.max_bytes:
+            return False
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = CachedAnswer(answer, source, size, expires_at, code)
+            self._keys_by_question.setdefault(key[0], set()).add(key)
+            self._current_bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._current_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+        return True
+
+    def invalidate_question(self, question_text: str) -> int:
+        """使某个问题（任意选项和类型）的所有缓存失效
+
+        Returns:
+            失效的条目数
+        """
+        question_key = build_question_key(question_text)
+        with self._lock:
+            keys = list(self._keys_by_question.get(question_key, ()))
+            for key in keys:
+                self._remove(key)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_question.clear()
+            self._current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        """删除条目（调用方需持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self._current_bytes -= entry.size
+        question_keys = self._keys_by_question.get(key[0])
+        if question_keys is not None:
+            question_keys.discard(key)
+            if not question_keys:
+                del self._keys_by_question[key[0]]
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+AI答案后台写入模块
+
+AI生成的答案先进入有界队列，由后台线程每隔 flush_interval 或累计 batch_size 条时
+在一个事务中批量写入数据库，请求在AI返回后即可响应，不再等待INSERT和提交
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..models.question import Question, QuestionRepository
+from ..utils.helpers import build_question_key
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerWriter:
+    """AI答案的write-behind写入器
+
+    - 队列按标准化问题去重，同一问题在写入前多次提交只保留最新的答案
+    - 写入时跳过数据库中已存在的标准化问题
+    - 队列达到 max_queue_size 时 submit 返回False，由调用方同步写入
+    - close() 会写入队列中剩余的答案，应在进程退出前调用
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 0.05,
+        batch_size: int = 100,
+        max_queue_size: int = 10000,
+        enabled: bool = True,
+        writer: Optional[Callable[[List[Question]], int]] = None
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_queue_size = max(1, max_queue_size)
+        self.enabled = enabled
+        self._writer = writer or QuestionRepository.insert_many_if_absent
+
+        self._condition = threading.Condition()
+        # 标准化问题 -> (问题, 入队时间)
+        self._pending: "OrderedDict[str, Tuple[Question, float]]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._closed = False
+
+        # 统计信息
+        self._enqueued = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._written = 0
+        self._skipped_existing = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_flush_time = 0.0
+        self._total_flush_time = 0.0
+        self._max_flush_time = 0.0
+        self._max_queue_wait = 0.0
+
+    def submit(
+        self,
+        question_text: str,
+        answer: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None
+    ) -> bool:
+        """提交一条待写入的答案
+
+        Returns:
+            是否已进入队列；未启用、已关闭或队列已满时返回False
+        """
+        if not self.enabled:
+            return False
+
+        key = build_question_key(question_text)
+        question = Question(question=question_text, answer=answer, options=options, question_type=question_type)
+        with self._condition:
+            if self._closed:
+                return False
+            if key in self._pending:
+                self._pending[key] = (question, self._pending[key][1])
+                self._deduplicated += 1
+                return True
+            if len(self._pending) >= self.max_queue_size:
+                self._rejected += 1
+                return False
+
+            self._pending[key] = (question, time.monotonic())
+            self._enqueued += 1
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+            return True
+
+    def flush(self) -> int:
+        """立即写入队列中的所有答案（阻塞直到写入完成）
+
+        Returns:
+            本次写入的行数
+        """
+        written = 0
+        while True:
+            with self._condition:
+                # 后台线程正在写入的批次也要等待完成
+                while self._in_flight:
+                    self._condition.wait()
+                if not self._pending:
+                    return written
+                batch = self._take_batch()
+            written += self._write_batch(batch)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程并写入剩余的答案"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入统计信息"""
+        with self._condition:
+            oldest = next(iter(self._pending.values()), None)
+            return {
+                "enabled": self.enabled,
+                "queue_depth": len(self._pending),
+                "max_queue_size": self.max_queue_size,
+                "oldest_pending_ms": round((time.monotonic() - oldest[1]) * 1000, 1) if oldest else 0.0,
+                "enqueued": self._enqueued,
+                "deduplicated": self._deduplicated,
+                "rejected_queue_full": self._rejected,
+                "written": self._written,
+                "skipped_existing": self._skipped_existing,
+                "failed": self._failed,
+                "batches": self._batches,
+                "last_flush_ms": round(self._last_flush_time * 1000, 2),
+                "avg_flush_ms": round(self._total_flush_time / self._batches * 1000, 2) if self._batches else 0.0,
+                "max_flush_ms": round(self._max_flush_time * 1000, 2),
+                "max_queue_wait_ms": round(self._max_queue_wait * 1000, 2)
+            }
+
+    def _ensure_thread(self) -> None:
+        """按需启动后台写入线程（调用方需持有锁；fork后的子进程会重新启动）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="answer-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """后台写入循环：累计 batch_size 条或最早的答案等待超过 flush_interval 时写入"""
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        first_enqueued = next(iter(self._pending.values()))[1]
+                        remaining = first_enqueued + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                batch = self._take_batch()
+            self._write_batch(batch)
+
+    def _take_batch(self) -> List[Tuple[Question, float]]:
+        """取出最多 batch_size 条答案并标记写入中（调用方需持有锁）"""
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        self._in_flight += 1
+        return batch
+
+    def _write_batch(self, batch: List[Tuple[Question, float]]) -> int:
+        """在一个事务中写入一批答案，失败时记录日志（答案仍在答案缓存中）"""
+        start = time.monotonic()
+        written = 0
+        error = None
+        try:
+            written = self._writer([question for question, _ in batch])
+        except Exception as e:
+            error = e
+            logger.error(f"批量保存AI答案失败（{len(batch)} 条）: {str(e)}")
+        end = time.monotonic()
+
+        with self._condition:
+            self._in_flight -= 1
+            self._batches += 1
+            elapsed = end - start
+            self._last_flush_time = elapsed
+            self._total_flush_time += elapsed
+            self._max_flush_time = max(self._max_flush_time, elapsed)
+            self._max_queue_wait = max(self._max_queue_wait, end - min(enqueued for _, enqueued in batch))
+            if error is None:
+                self._written += written
+                self._skipped_existing += len(batch) - written
+            else:
+                self._failed += len(batch)
+            self._condition.notify_all()
+
+        if error is None:
+            logger.debug(f"批量保存AI答案 {written} 条，耗时 {elapsed * 1000:.1f} 毫秒")
+        return written
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+熔断器模块
+
+跟踪每个AI服务提供商的连续失败次数，失败过多时暂时跳过该提供商
+"""
+
+from __future__ import annotations
+import threading
+import time
+from typing import Optional, Dict, Any
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """熔断器
+
+    - closed: 正常放行请求，连续失败达到 failure_threshold 次后打开
+    - open: 拒绝请求，经过 recovery_timeout 秒后允许发起一次探测
+    - half_open: 探测进行中，期间仍拒绝普通请求；探测成功则关闭，失败则重新打开
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 30.0,
+        enabled: bool = True
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+
+        # 统计信息
+        self._total_failures = 0
+        self._total_successes = 0
+        self._rejected = 0
+        self._open_count = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态"""
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """是否放行普通请求"""
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            self._rejected += 1
+            return False
+
+    def begin_probe(self) -> bool:
+        """打开状态超过恢复时间后进入半开状态
+
+        Returns:
+            调用方是否应该发起一次探测
+        """
+        if not self.enabled:
+            return False
+
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return False
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                return False
+            self._state = STATE_HALF_OPEN
+            return True
+
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        with self._lock:
+            self._total_successes += 1
+            self._consecutive_failures = 0
+            self._state = STATE_CLOSED
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        with self._lock:
+            self._total_failures += 1
+            self._consecutive_failures += 1
+            if self._state == STATE_HALF_OPEN or (
+                self._state == STATE_CLOSED
+                and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._open_count += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        with self._lock:
+            retry_in = None
+            if self._state == STATE_OPEN and self._opened_at is not None:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "enabled": self.enabled,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "probe_in_seconds": round(retry_in, 3) if retry_in is not None else None,
+                "total_failures": self._total_failures,
+                "total_successes": self._total_successes,
+                "rejected_requests": self._rejected,
+                "open_count": self._open_count
+            }
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+数据库备份模块
+
+定时在线备份数据库：按页分步复制（见 DatabaseManager.backup_database），
+备份完成后只保留最新的 keep 个备份文件，并记录进度和耗时供统计接口查看。
+
+多进程部署时每个worker都会启动定时线程，通过备份目录中的文件锁和最新备份的时间
+保证同一时间只有一个进程在备份，且每个间隔只备份一次
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，仅靠进程内的锁
+    fcntl = None
+
+from ..config.settings import settings
+from ..core.database import DatabaseManager, db_manager
+
+logger = logging.getLogger(__name__)
+
+# 备份目录中的锁文件
+LOCK_FILE_NAME = ".backup.lock"
+
+# 定时线程检查是否需要备份的最长间隔（秒）
+CHECK_INTERVAL_SECONDS = 60.0
+
+
+class BackupInProgressError(RuntimeError):
+    """已有备份正在进行"""
+
+
+class BackupManager:
+    """数据库备份管理器
+
+    - backup_now() 立即备份一次并清理旧备份，已有备份进行中时抛出 BackupInProgressError
+    - start() 启动后台线程，最新备份超过 interval_hours 时自动备份
+    """
+
+    def __init__(
+        self,
+        database: DatabaseManager,
+        directory: str = "backups",
+        interval_hours: float = 24.0,
+        keep: int = 7,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.01,
+        max_restarts: int = 3
+    ):
+        self.database = database
+        self.directory = Path(directory)
+        self.interval_seconds = interval_hours * 3600
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 进行中的备份和最近一次备份的结果
+        self._current: Optional[Dict[str, Any]] = None
+        self._current_start = 0.0
+        self._last: Optional[Dict[str, Any]] = None
+        self._backup_count = 0
+        self._failure_count = 0
+
+    @property
+    def file_prefix(self) -> str:
+        """备份文件名前缀（数据库文件名）"""
+        return f"{self.database.db_path.stem}_"
+
+    def list_backups(self) -> List[Path]:
+        """列出已有的备份文件（最新的在前）"""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{self.file_prefix}*.db"), reverse=True)
+
+    def is_due(self) -> bool:
+        """最新的备份是否已超过备份间隔"""
+        backups = self.list_backups()
+        if not backups:
+            return True
+        return time.time() - backups[0].stat().st_mtime >= self.interval_seconds
+
+    def backup_now(
+        self,
+        path: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """立即备份一次
+
+        Args:
+            path: 备份文件路径，默认在备份目录中按时间命名（并清理旧备份）
+            progress: 进度回调，参数为 (已复制页数, 总页数)
+
+        Returns:
+            备份结果
+
+        Raises:
+            BackupInProgressError: 本进程或其他进程正在备份
+        """
+        with self._exclusive():
+            return self._run_backup(path, progress)
+
+    def rotate(self) -> List[str]:
+        """删除超出保留数量的旧备份
+
+        Returns:
+            删除的文件路径
+        """
+        if self.keep <= 0:
+            return []
+
+        removed = []
+        for backup in self.list_backups()[self.keep:]:
+            try:
+                backup.unlink()
+                removed.append(str(backup))
+            except OSError as e:
+                logger.warning(f"删除旧备份失败: {backup}: {str(e)}")
+        if removed:
+            logger.info(f"已清理 {len(removed)} 个旧备份")
+        return removed
+
+    def start(self) -> None:
+        """启动后台定时备份线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="database-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台定时备份线程（进行中的备份会在完成后退出）"""
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取备份状态：进行中的进度、最近一次备份的耗时和结果"""
+        current = self._current
+        if current is not None:
+            current = {**current, "elapsed_seconds": round(time.monotonic() - self._current_start, 3)}
+
+        return {
+            "scheduled": self._thread is not None and self._thread.is_alive(),
+            "interval_hours": self.interval_seconds / 3600,
+            "directory": str(self.directory),
+            "backups": len(self.list_backups()),
+            "backup_count": self._backup_count,
+            "failure_count": self._failure_count,
+            "in_progress": current,
+            "last": self._last
+        }
+
+    def _run_backup(
+        self,
+        path: Optional[str],
+        progress: Optional[Callable[[int, int], None]]
+    ) -> Dict[str, Any]:
+        """执行备份并记录结果（调用方需持有锁）"""
+        target = Path(path) if path else self.directory / (
+            f"{self.file_prefix}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db"
+        )
+        started_at = datetime.now().isoformat(timespec="seconds")
+        start = time.monotonic()
+        self._current_start = start
+        self._current = {"path": str(target), "started_at": started_at, "pages_done": 0,
+                         "pages_total": 0, "percent": 0.0}
+
+        def on_progress(done: int, total: int) -> None:
+            self._current = {**self._current, "pages_done": done, "pages_total": total,
+                             "percent": round(done / total * 100, 1) if total else 100.0}
+            if progress is not None:
+                progress(done, total)
+
+        logger.info(f"开始备份数据库到 {target}")
+        try:
+            stats = self.database.backup_database(
+                str(target),
+                pages_per_step=self.pages_per_step,
+                step_sleep=self.step_sleep,
+                max_restarts=self.max_restarts,
+                progress=on_progress
+            )
+        except Exception as e:
+            self._failure_count += 1
+            self._last = {"path": str(target), "started_at": started_at, "success": False,
+                          "duration_seconds": round(time.monotonic() - start, 3), "error": str(e)}
+            logger.error(f"数据库备份失败: {str(e)}")
+            raise
+        finally:
+            self._current = None
+
+        duration = time.monotonic() - start
+        self._backup_count += 1
+        self._last = {
+            "path": str(target),
+            "started_at": started_at,
+            "success": True,
+            "duration_seconds": round(duration, 3),
+            "size_bytes": target.stat().st_size,
+            **stats
+        }
+        logger.info(f"数据库备份完成: {target}，{stats['pages']} 页，耗时 {duration:.2f} 秒")
+
+        if path is None:
+            self._last["removed"] = self.rotate()
+        return dict(self._last)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """获取进程内的锁和备份目录中的文件锁
+
+        Raises:
+            BackupInProgressError: 本进程或其他进程正在备份
+        """
+        if not self._lock.acquire(blocking=False):
+            raise BackupInProgressError("已有备份正在进行")
+        lock_file = None
+        try:
+            if fcntl is not None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                lock_file = open(self.directory / LOCK_FILE_NAME, "a")
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    raise BackupInProgressError("其他进程正在备份")
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+            self._lock.release()
+
+    def _run(self) -> None:
+        """后台定时备份循环"""
+        check_interval = max(1.0, min(CHECK_INTERVAL_SECONDS, self.interval_seconds))
+        while not self._stop_event.is_set():
+            try:
+                if self.is_due():
+                    with self._exclusive():
+                        # 其他进程可能刚刚完成备份
+                        if self.is_due():
+                            self._run_backup(None, None)
+            except BackupInProgressError:
+                pass
+            except Exception as e:
+                logger.warning(f"定时备份失败: {str(e)}")
+            self._stop_event.wait(check_interval)
+
+
+# 全局备份管理器实例
+backup_manager = BackupManager(
+    db_manager,
+    directory=settings.backup.directory,
+    interval_hours=settings.backup.interval_hours,
+    keep=settings.backup.keep,
+    pages_per_step=settings.backup.pages_per_step,
+    step_sleep=settings.backup.step_sleep_ms / 1000,
+    max_restarts=settings.backup.max_restarts
+)
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+数据库后台维护模块
+
+后台线程定期执行WAL检查点，避免长时间有读连接时WAL文件持续增长，
+并定期执行 PRAGMA optimize 更新查询规划器的统计信息
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..config.settings import settings
+from ..core.database import DatabaseManager, db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseMaintenance:
+    """数据库后台维护任务
+
+    - 每 checkpoint_interval 秒按 checkpoint_mode 执行一次WAL检查点，0表示关闭
+    - 每 optimize_interval 秒执行一次 PRAGMA optimize，0表示关闭；停止时也会执行一次
+    """
+
+    def __init__(
+        self,
+        database: DatabaseManager,
+        checkpoint_interval: float = 300.0,
+        checkpoint_mode: str = "PASSIVE",
+        optimize_interval: float = 3600.0
+    ):
+        self.database = database
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_mode = checkpoint_mode
+        self.optimize_interval = optimize_interval
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self._checkpoint_count = 0
+        self._checkpoint_busy = 0
+        self._last_checkpoint: Optional[Dict[str, Any]] = None
+        self._optimize_count = 0
+        self._last_optimize_at: Optional[str] = None
+        self._failures = 0
+
+    def run_checkpoint(self) -> Dict[str, Any]:
+        """执行一次WAL检查点并记录结果"""
+        start = time.monotonic()
+        result = self.database.checkpoint(self.checkpoint_mode)
+        elapsed = time.monotonic() - start
+
+        with self._lock:
+            self._checkpoint_count += 1
+            if result["busy"]:
+                self._checkpoint_busy += 1
+            self._last_checkpoint = {
+                **result,
+                "mode": self.checkpoint_mode,
+                "duration_ms": round(elapsed * 1000, 2),
+                "checked_at": datetime.now().isoformat(timespec="seconds")
+            }
+        if result["busy"]:
+            logger.debug(f"WAL检查点未完成（其他连接正在使用），WAL共 {result['wal_pages']} 页")
+        return result
+
+    def run_optimize(self) -> None:
+        """执行一次 PRAGMA optimize"""
+        self.database.optimize()
+        with self._lock:
+            self._optimize_count += 1
+            self._last_optimize_at = datetime.now().isoformat(timespec="seconds")
+
+    def start(self) -> None:
+        """启动后台维护线程（检查点和optimize都关闭时不启动）"""
+        if self.checkpoint_interval <= 0 and self.optimize_interval <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="database-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台维护线程，并在退出前执行一次 PRAGMA optimize"""
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        thread.join(timeout)
+        if self.optimize_interval > 0:
+            try:
+                self.run_optimize()
+            except Exception as e:
+                logger.warning(f"退出前执行 PRAGMA optimize 失败: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取维护任务统计信息"""
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "checkpoint_interval_seconds": self.checkpoint_interval,
+                "checkpoint_mode": self.checkpoint_mode,
+                "checkpoint_count": self._checkpoint_count,
+                "checkpoint_busy": self._checkpoint_busy,
+                "last_checkpoint": self._last_checkpoint,
+                "optimize_interval_seconds": self.optimize_interval,
+                "optimize_count": self._optimize_count,
+                "last_optimize_at": self._last_optimize_at,
+                "failures": self._failures
+            }
+
+    def _run(self) -> None:
+        """后台维护循环"""
+        now = time.monotonic()
+        next_checkpoint = now + self.checkpoint_interval
+        next_optimize = now + self.optimize_interval
+
+        while True:
+            pending = [
+                due for due, interval in ((next_checkpoint, self.checkpoint_interval),
+                                          (next_optimize, self.optimize_interval))
+                if interval > 0
+            ]
+            if self._stop_event.wait(max(0.0, min(pending) - time.monotonic())):
+                return
+
+            now = time.monotonic()
+            try:
+                if self.checkpoint_interval > 0 and now >= next_checkpoint:
+                    next_checkpoint = now + self.checkpoint_interval
+                    self.run_checkpoint()
+                if self.optimize_interval > 0 and now >= next_optimize:
+                    next_optimize = now + self.optimize_interval
+                    self.run_optimize()
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                logger.warning(f"数据库后台维护失败: {str(e)}")
+
+
+# 全局数据库维护任务实例
+database_maintenance = DatabaseMaintenance(
+    db_manager,
+    checkpoint_interval=settings.database.checkpoint_interval_seconds,
+    checkpoint_mode=settings.database.checkpoint_mode,
+    optimize_interval=settings.database.optimize_interval_seconds
+)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+模糊匹配模块
+
+精确匹配失败时，先从全文索引按共享trigram召回候选问题，再逐个计算相似度校验，
+命中阈值的题库答案可以直接返回，避免为错别字或标点差异的问题调用AI
+"""
+
+from __future__ import annotations
+import re
+import threading
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, Optional
+
+from ..models.question import Question, QuestionRepository
+from ..utils.helpers import build_question_key, normalize_question_text, parse_options_string
+
+# 选项前的字母标识，如 "A." "B、" "(C)"
+OPTION_LABEL_PATTERN = re.compile(r'^\(?[A-Za-z][\.\、\)）:：]\s*')
+
+
+@dataclass
+class FuzzyMatch:
+    """模糊匹配结果"""
+    question: Question
+    score: float
+
+
+def normalize_options(options: Optional[str]) -> FrozenSet[str]:
+    """将选项文本标准化为与顺序和字母标识无关的集合"""
+    if not options or not options.strip():
+        return frozenset()
+
+    items = parse_options_string(options) or [options]
+    normalized = {
+        normalize_question_text(OPTION_LABEL_PATTERN.sub('', item.strip()))
+        for item in items
+    }
+    normalized.discard("")
+    return frozenset(normalized)
+
+
+class FuzzyMatcher:
+    """基于全文索引候选 + 相似度校验的模糊匹配器
+
+    候选必须同时满足：
+    - 标准化问题相似度不低于 threshold
+    - 问题中的数字完全一致（"1+1" 与 "1+2" 只差一个字符，但答案不同）
+    - 选项集合一致（忽略顺序和字母标识），双方都指定类型时类型一致
+    """
+
+    def __init__(
+        self,
+        repository: QuestionRepository,
+        threshold: float = 0.85,
+        candidate_limit: int = 20,
+        min_length: int = 6,
+        enabled: bool = True
+    ):
+        self.repository = repository
+        self.threshold = threshold
+        self.candidate_limit = candidate_limit
+        self.min_length = min_length
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._matches = 0
+        self._rejected_options = 0
+        self._rejected_score = 0
+
+    def find_match(
+        self,
+        question_text: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None
+    ) -> Optional[FuzzyMatch]:
+        """查找与问题足够相似且选项一致的题库问题"""
+        if not self.enabled:
+            return None
+
+        key = build_question_key(question_text)
+        if len(key) < self.min_length:
+            return None
+
+        candidates = self.repository.find_similar_questions(question_text, limit=self.candidate_limit)
+
+        option_set = normalize_options(options)
+        numbers = re.findall(r'\d+', key)
+        question_type = (question_type or "").strip().lower()
+
+        best: Optional[FuzzyMatch] = None
+        rejected_options = rejected_score = 0
+        for candidate in candidates:
+            if not candidate.answer:
+                continue
+            if normalize_options(candidate.options) != option_set:
+                rejected_options += 1
+                continue
+            candidate_type = (candidate.question_type or "").strip().lower()
+            if question_type and candidate_type and candidate_type != question_type:
+                rejected_options += 1
+                continue
+
+            candidate_key = build_question_key(candidate.question)
+            if re.findall(r'\d+', candidate_key) != numbers:
+                rejected_score += 1
+                continue
+
+            score = SequenceMatcher(None, key, candidate_key).ratio()
+            if score < self.threshold:
+                rejected_score += 1
+                continue
+            if best is None or score > best.score:
+                best = FuzzyMatch(candidate, score)
+
+        with self._lock:
+            self._lookups += 1
+            self._rejected_options += rejected_options
+            self._rejected_score += rejected_score
+            if best is not None:
+                self._matches += 1
+        return best
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取模糊匹配统计信息"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "lookups": self._lookups,
+                "matches": self._matches,
+                "match_rate": round(self._matches / self._lookups, 4) if self._lookups else 0.0,
+                "rejected_options": self._rejected_options,
+                "rejected_score": self._rejected_score
+            }
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+AI服务健康监控模块
+
+由后台线程定期进行轻量级探测，并结合真实请求的成功/失败信号缓存各提供商的健康状态，
+健康检查接口只读取缓存，不再发起真实的模型调用
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 健康状态
+STATUS_HEALTHY = "healthy"
+STATUS_UNHEALTHY = "unhealthy"
+STATUS_UNKNOWN = "unknown"
+
+# 状态来源
+SOURCE_PROBE = "probe"
+SOURCE_TRAFFIC = "traffic"
+
+
+@dataclass
+class ProviderHealth:
+    """单个提供商的缓存健康状态"""
+    status: str = STATUS_UNKNOWN
+    source: Optional[str] = None
+    updated_at: Optional[float] = None
+    checked_at: Optional[str] = None
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    probe_latency: Optional[float] = None
+
+
+class ProviderHealthMonitor:
+    """提供商健康状态缓存与后台检查器
+
+    - 真实请求成功时立即标记为健康；连续失败 failure_threshold 次后标记为不健康
+    - 状态超过 ttl_seconds 未更新时，后台线程每 interval_seconds 秒调用提供商的
+      health_check() 做一次轻量级探测（如模型列表接口），不会调用模型生成答案
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 120.0,
+        interval_seconds: float = 30.0,
+        probe_timeout: float = 5.0,
+        failure_threshold: int = 3
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = max(1, failure_threshold)
+
+        self._lock = threading.Lock()
+        self._health: Dict[str, ProviderHealth] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self._probe_count = 0
+        self._probe_failures = 0
+
+    def record_traffic(self, provider_id: str, success: bool, error: Optional[str] = None) -> None:
+        """记录一次真实请求的结果（被动健康信号）"""
+        with self._lock:
+            health = self._health.setdefault(provider_id, ProviderHealth())
+            if success:
+                health.consecutive_failures = 0
+                health.last_error = None
+                self._mark(health, STATUS_HEALTHY, SOURCE_TRAFFIC)
+                return
+
+            health.consecutive_failures += 1
+            health.last_error = error
+            if health.consecutive_failures >= self.failure_threshold:
+                self._mark(health, STATUS_UNHEALTHY, SOURCE_TRAFFIC)
+
+    def record_probe(
+        self,
+        provider_id: str,
+        healthy: bool,
+        latency: Optional[float] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """记录一次主动探测的结果"""
+        with self._lock:
+            self._probe_count += 1
+            health = self._health.setdefault(provider_id, ProviderHealth())
+            health.probe_latency = latency
+            if healthy:
+                health.consecutive_failures = 0
+                health.last_error = None
+                self._mark(health, STATUS_HEALTHY, SOURCE_PROBE)
+            else:
+                self._probe_failures += 1
+                health.last_error = error or "探测失败"
+                self._mark(health, STATUS_UNHEALTHY, SOURCE_PROBE)
+
+    def is_stale(self, provider_id: str) -> bool:
+        """健康状态是否缺失或已超过有效期"""
+        with self._lock:
+            health = self._health.get(provider_id)
+            return self._is_stale(health, time.monotonic())
+
+    def probe(self, provider_id: str, provider: Any) -> bool:
+        """对提供商进行一次轻量级探测并更新缓存"""
+        start = time.monotonic()
+        error = None
+        try:
+            healthy = bool(provider.health_check(timeout=self.probe_timeout))
+        except Exception as e:
+            healthy = False
+            error = str(e)
+
+        self.record_probe(provider_id, healthy, time.monotonic() - start, error)
+        return healthy
+
+    def refresh(self, providers: Dict[str, Any], force: bool = False) -> int:
+        """探测状态已过期的提供商，并清理已移除提供商的状态
+
+        Args:
+            providers: 提供商ID -> 提供商实例
+            force: 是否忽略有效期，探测所有提供商
+
+        Returns:
+            本次探测的提供商数量
+        """
+        with self._lock:
+            for provider_id in list(self._health):
+                if provider_id not in providers:
+                    del self._health[provider_id]
+
+        probed = 0
+        for provider_id, provider in providers.items():
+            if force or self.is_stale(provider_id):
+                self.probe(provider_id, provider)
+                probed += 1
+        return probed
+
+    def get(self, provider_id: str) -> Dict[str, Any]:
+        """读取缓存的健康状态（不发起任何请求）"""
+        now = time.monotonic()
+        with self._lock:
+            health = self._health.get(provider_id) or ProviderHealth()
+            return {
+                "status": health.status,
+                "source": health.source,
+                "checked_at": health.checked_at,
+                "age_seconds": round(now - health.updated_at, 3) if health.updated_at is not None else None,
+                "stale": self._is_stale(health, now),
+                "consecutive_failures": health.consecutive_failures,
+                "last_error": health.last_error,
+                "probe_latency_ms": round(health.probe_latency * 1000, 1) if health.probe_latency is not None else None
+            }
+
+    def get_all(self, provider_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """读取多个提供商的缓存健康状态"""
+        return {provider_id: self.get(provider_id) for provider_id in provider_ids}
+
+    def is_healthy(self, provider_id: str) -> bool:
+        """缓存状态是否为健康"""
+        with self._lock:
+            health = self._health.get(provider_id)
+            return health is not None and health.status == STATUS_HEALTHY
+
+    def start(self, providers_getter: Callable[[], Dict[str, Any]]) -> None:
+        """启动后台检查线程（启动后立即进行一次检查）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(providers_getter,),
+            name="ai-health-monitor",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台检查线程"""
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取健康检查统计信息"""
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "interval_seconds": self.interval_seconds,
+                "ttl_seconds": self.ttl_seconds,
+                "probe_count": self._probe_count,
+                "probe_failures": self._probe_failures
+            }
+
+    def _run(self, providers_getter: Callable[[], Dict[str, Any]]) -> None:
+        """后台检查循环"""
+        while not self._stop_event.is_set():
+            try:
+                self.refresh(providers_getter())
+            except Exception as e:
+                logger.warning(f"AI服务健康检查失败: {str(e)}")
+            self._stop_event.wait(self.interval_seconds)
+
+    def _is_stale(self, health: Optional[ProviderHealth], now: float) -> bool:
+        """判断状态是否过期（调用方需持有锁）"""
+        return health is None or health.updated_at is None or now - health.updated_at > self.ttl_seconds
+
+    @staticmethod
+    def _mark(health: ProviderHealth, status: str, source: str) -> None:
+        """更新状态和检查时间（调用方需持有锁）"""
+        health.status = status
+        health.source = source
+        health.updated_at = time.monotonic()
+        health.checked_at = datetime.now().isoformat(timespec="seconds")
\ No newline at end of file
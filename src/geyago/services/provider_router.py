@@ -0,0 +1,146 @@
+"""
+AI服务路由模块
+
+按提供商/模型跟踪EWMA延迟和成功率，为每个请求选择当前最优的提供商
+"""
+
+from __future__ import annotations
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+# 路由键：(提供商ID, 模型名称)
+RouteKey = Tuple[str, str]
+
+# 每个提供商/模型保留的最近成功延迟样本数，用于计算分位数
+LATENCY_WINDOW = 100
+
+
+@dataclass
+class RouteStats:
+    """单个提供商/模型的运行统计"""
+    ewma_latency: Optional[float] = None
+    success_rate: float = 1.0
+    requests: int = 0
+    failures: int = 0
+    last_used: Optional[float] = None
+    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "success_rate": round(self.success_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class ProviderRouter:
+    """基于延迟和成功率的自适应路由器
+
+    得分 = latency_weight × EWMA延迟(秒) + failure_penalty × (1 - 成功率)，得分越低越优先。
+    尚无样本的提供商得分为0，会被优先尝试以获取样本；
+    另有 exploration_ratio 比例的请求随机选择首选提供商，避免统计长期停留在旧数据上。
+    """
+
+    def __init__(
+        self,
+        latency_weight: float = 1.0,
+        failure_penalty: float = 10.0,
+        exploration_ratio: float = 0.05,
+        ewma_alpha: float = 0.2
+    ):
+        self.latency_weight = latency_weight
+        self.failure_penalty = failure_penalty
+        self.exploration_ratio = exploration_ratio
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self._stats: Dict[RouteKey, RouteStats] = {}
+        self._explorations = 0
+        self._decisions = 0
+
+    def record(self, provider_id: str, model: str, latency: float, success: bool) -> None:
+        """记录一次调用结果"""
+        alpha = self.ewma_alpha
+        with self._lock:
+            stats = self._stats.setdefault((provider_id, model), RouteStats())
+            stats.requests += 1
+            stats.last_used = time.monotonic()
+            stats.success_rate = (1 - alpha) * stats.success_rate + alpha * (1.0 if success else 0.0)
+            if success:
+                stats.recent_latencies.append(latency)
+                if stats.ewma_latency is None:
+                    stats.ewma_latency = latency
+                else:
+                    stats.ewma_latency = (1 - alpha) * stats.ewma_latency + alpha * latency
+            else:
+                stats.failures += 1
+
+    def score(self, provider_id: str, model: str) -> float:
+        """计算路由得分（越低越好）"""
+        with self._lock:
+            stats = self._stats.get((provider_id, model))
+            if stats is None:
+                return 0.0
+            latency = stats.ewma_latency or 0.0
+            return self.latency_weight * latency + self.failure_penalty * (1 - stats.success_rate)
+
+    def latency_percentile(
+        self,
+        provider_id: str,
+        model: str,
+        percentile: float,
+        min_samples: int = 1
+    ) -> Optional[float]:
+        """计算最近成功请求延迟的分位数（秒），样本不足时返回None"""
+        with self._lock:
+            stats = self._stats.get((provider_id, model))
+            if stats is None or len(stats.recent_latencies) < max(1, min_samples):
+                return None
+            samples = sorted(stats.recent_latencies)
+
+        index = min(len(samples) - 1, max(0, int(round(percentile * (len(samples) - 1)))))
+        return samples[index]
+
+    def rank(self, candidates: List[RouteKey]) -> List[RouteKey]:
+        """按得分排序候选提供商，少量请求随机选择首选项用于探索"""
+        if not candidates:
+            return []
+
+        ranked = sorted(candidates, key=lambda key: self.score(*key))
+        with self._lock:
+            self._decisions += 1
+            explore = len(ranked) > 1 and random.random() < self.exploration_ratio
+            if explore:
+                self._explorations += 1
+
+        if explore:
+            chosen = random.choice(ranked[1:])
+            ranked.remove(chosen)
+            ranked.insert(0, chosen)
+        return ranked
+
+    def get_stats(self, provider_id: Optional[str] = None) -> Dict[str, Any]:
+        """获取路由统计（可按提供商过滤），键为 "提供商/模型" """
+        with self._lock:
+            return {
+                f"{key[0]}/{key[1]}": stats.to_dict()
+                for key, stats in self._stats.items()
+                if provider_id is None or key[0] == provider_id
+            }
+
+    def get_summary(self) -> Dict[str, Any]:
+        """获取路由决策汇总"""
+        with self._lock:
+            return {
+                "decisions": self._decisions,
+                "explorations": self._explorations,
+                "latency_weight": self.latency_weight,
+                "failure_penalty": self.failure_penalty,
+                "exploration_ratio": self.exploration_ratio
+            }
\ No newline at end of file
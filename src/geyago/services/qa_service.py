@@ -5,17 +5,38 @@
 """
 
 from __future__ import annotations
-from typing import Optional, Dict, Any, List
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, Iterator, List, TextIO, Tuple
 import logging
+import threading
+import time
 
+from ..config.settings import settings
+from ..core.database import db_manager
 from ..models.question import QuestionRepository, Question
 from ..services.ai_service import ai_service, AIServiceError
 from ..services.ai_service_manager import ai_service_manager
+from ..services.answer_cache import AnswerCache, CachedAnswer, CacheKey
+from ..services.answer_writer import AnswerWriter
+from ..services.database_backup import backup_manager
+from ..services.database_maintenance import database_maintenance
+from ..services.fuzzy_matcher import FuzzyMatch, FuzzyMatcher
+from ..services.health_monitor import STATUS_HEALTHY, STATUS_UNHEALTHY
+from ..services.question_importer import ImportResult, QuestionImporter
+from ..services.single_flight import SingleFlight
 from ..core.exceptions import DatabaseError, ValidationError, QuestionNotFoundError
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 答案来源 -> 查询结果的 msg（缓存命中时按首次查询的来源返回）
+RESULT_MESSAGES = {
+    "database": "数据库匹配",
+    "fuzzy": "模糊匹配",
+    "ai": "AI生成答案"
+}
+
 
 class QAService:
     """问答服务类"""
@@ -23,6 +44,34 @@ class QAService:
     def __init__(self):
         self.question_repo = QuestionRepository()
         self.ai_service_manager = ai_service_manager
+        self.answer_cache = AnswerCache(
+            max_entries=settings.cache.max_entries,
+            max_bytes=settings.cache.max_bytes,
+            ttl_seconds=settings.cache.ttl_seconds,
+            enabled=settings.cache.enabled
+        )
+        self.fuzzy_matcher = FuzzyMatcher(
+            self.question_repo,
+            threshold=settings.fuzzy_match.threshold,
+            candidate_limit=settings.fuzzy_match.candidate_limit,
+            min_length=settings.fuzzy_match.min_length,
+            enabled=settings.fuzzy_match.enabled
+        )
+        # 相同问题的并发AI请求合并为一次调用
+        self.ai_flights = SingleFlight()
+        # AI答案在后台批量写入数据库
+        self.answer_writer = AnswerWriter(
+            flush_interval=settings.write_behind.flush_interval_ms / 1000,
+            batch_size=settings.write_behind.batch_size,
+            max_queue_size=settings.write_behind.max_queue_size,
+            enabled=settings.write_behind.enabled
+        )
+        # 题库总数缓存：(数量, 统计时间)
+        self._count_lock = threading.Lock()
+        self._count_cache: Optional[Tuple[int, float]] = None
+        # 批量查询的线程池（按需创建）
+        self._batch_lock = threading.Lock()
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
 
     def query_answer(
         self,
@@ -36,45 +85,97 @@ class QAService:
         try:
             logger.info(f"查询问题: {question_text[:50]}...")
 
+            # 第零步：查询进程内答案缓存
+            cache_key = self.answer_cache.make_key(question_text, options, question_type)
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                logger.info("命中答案缓存: %s...", cached.answer[:50])
+                return self._cache_result(cached)
+
             # 第一步：在本地数据库中搜索
             question = self._search_local_database(question_text)
             if question:
                 logger.info("在本地数据库中找到答案: %s...", question.answer[:50] if question.answer else "None")
-                return {
-                    "code": 0,
-                    "data": question.answer,
-                    "msg": "数据库匹配",
-                    "source": "database"
-                }
-
-            # 第二步：使用AI生成答案
+                return self._database_result(question, cache_key)
+
+            return self._resolve_database_miss(question_text, options, question_type, provider_id, model, cache_key)
+
+        except (DatabaseError, AIServiceError, ValidationError):
+            raise
+        except Exception as e:
+            logger.error(f"查询答案时发生未知错误: {str(e)}")
+            raise DatabaseError(f"查询失败: {str(e)}")
+
+    def _resolve_database_miss(
+        self,
+        question_text: str,
+        options: Optional[str],
+        question_type: Optional[str],
+        provider_id: Optional[str],
+        model: Optional[str],
+        cache_key: CacheKey
+    ) -> Dict[str, Any]:
+        """精确匹配未命中后的处理：模糊匹配，然后调用AI生成答案"""
+        # 第二步：模糊匹配题库（错别字、标点差异），选项不同的问题不会匹配
+        fuzzy = self._search_fuzzy_match(question_text, options, question_type)
+        if fuzzy:
+            return self._fuzzy_result(fuzzy, cache_key)
+
+        # 第三步：使用AI生成答案（相同问题的并发请求共享同一次AI调用）
+        logger.info("本地数据库中未找到答案，尝试AI生成...")
+        ai_answer, shared = self.ai_flights.do(
+            (cache_key, provider_id, model),
+            lambda: self._generate_and_save_ai_answer(
+                question_text, options or "", question_type or "", provider_id, model, cache_key
+            )
+        )
+        if shared:
+            logger.info("复用并发请求的AI生成结果")
+
+        return self._ai_result(ai_answer)
+
+    async def query_answer_async(
+        self,
+        question_text: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """异步查询答案（ASGI模式使用）
+
+        查询顺序与 query_answer 相同。SQLite查询耗时很短，放到线程池执行；
+        等待AI响应的过程完全异步，不占用线程。
+        """
+        try:
+            logger.info(f"异步查询问题: {question_text[:50]}...")
+
+            cache_key = self.answer_cache.make_key(question_text, options, question_type)
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                logger.info("命中答案缓存: %s...", cached.answer[:50])
+                return self._cache_result(cached)
+
+            question = await asyncio.to_thread(self._search_local_database, question_text)
+            if question:
+                logger.info("在本地数据库中找到答案: %s...", question.answer[:50] if question.answer else "None")
+                return self._database_result(question, cache_key)
+
+            fuzzy = await asyncio.to_thread(self._search_fuzzy_match, question_text, options, question_type)
+            if fuzzy:
+                return self._fuzzy_result(fuzzy, cache_key)
+
             logger.info("本地数据库中未找到答案，尝试AI生成...")
-            ai_answer = self._generate_ai_answer(question_text, options or "", question_type or "", provider_id, model)
-
-            if ai_answer:
-                # 保存AI生成的答案到数据库
-                try:
-                    self._save_ai_answer(question_text, ai_answer, options or "", question_type or "")
-                    logger.info("AI答案已保存到数据库")
-                except DatabaseError as e:
-                    # 保存失败不应该影响返回结果，记录日志即可
-                    logger.error(f"保存AI答案到数据库失败: {str(e)}")
-
-                return {
-                    "code": 1,
-                    "data": ai_answer,
-                    "msg": "AI生成答案",
-                    "source": "ai"
-                }
-
-            # 第三步：都未找到答案
-            logger.info("AI服务也未生成有效答案")
-            return {
-                "code": 0,
-                "data": None,
-                "msg": "未找到答案",
-                "source": None
-            }
+            ai_answer, shared = await self.ai_flights.do_async(
+                (cache_key, provider_id, model),
+                lambda: self._generate_and_save_ai_answer_async(
+                    question_text, options or "", question_type or "", provider_id, model, cache_key
+                )
+            )
+            if shared:
+                logger.info("复用并发请求的AI生成结果")
+
+            return self._ai_result(ai_answer)
 
         except (DatabaseError, AIServiceError, ValidationError):
             raise
@@ -82,11 +183,285 @@ class QAService:
             logger.error(f"查询答案时发生未知错误: {str(e)}")
             raise DatabaseError(f"查询失败: {str(e)}")
 
+    def _fuzzy_result(self, fuzzy: FuzzyMatch, cache_key: CacheKey) -> Dict[str, Any]:
+        """构建模糊匹配的查询结果并写入缓存"""
+        logger.info("模糊匹配到问题 %s（相似度 %.3f）", fuzzy.question.id, fuzzy.score)
+        self.answer_cache.set(cache_key, fuzzy.question.answer, "fuzzy")
+        return {
+            "code": 1,
+            "data": fuzzy.question.answer,
+            "msg": RESULT_MESSAGES["fuzzy"],
+            "source": "fuzzy",
+            "similarity": round(fuzzy.score, 4)
+        }
+
+    @staticmethod
+    def _ai_result(ai_answer: Optional[str]) -> Dict[str, Any]:
+        """构建AI生成答案（或未找到答案）的查询结果"""
+        if ai_answer:
+            return {
+                "code": 1,
+                "data": ai_answer,
+                "msg": RESULT_MESSAGES["ai"],
+                "source": "ai"
+            }
+
+        # 都未找到答案
+        logger.info("AI服务也未生成有效答案")
+        return {
+            "code": 0,
+            "data": None,
+            "msg": "未找到答案",
+            "source": None
+        }
+
+    @staticmethod
+    def _cache_result(cached: CachedAnswer) -> Dict[str, Any]:
+        """构建缓存命中的查询结果（code、msg、source 与首次查询的结果一致）"""
+        return {
+            "code": cached.code,
+            "data": cached.answer,
+            "msg": RESULT_MESSAGES.get(cached.source, "缓存匹配"),
+            "source": cached.source,
+            "cached": True
+        }
+
+    def _database_result(self, question: Question, cache_key: CacheKey) -> Dict[str, Any]:
+        """构建数据库命中的查询结果并写入缓存"""
+        self.answer_cache.set(cache_key, question.answer, "database", code=0)
+        return {
+            "code": 0,
+            "data": question.answer,
+            "msg": RESULT_MESSAGES["database"],
+            "source": "database"
+        }
+
+    def query_answers_batch(
+        self,
+        items: List[Dict[str, Optional[str]]],
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """批量查询答案，结果顺序与输入一致
+
+        Args:
+            items: 问题列表，每项包含 title、options、type
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        for index, result in self.iter_batch_answers(items, provider_id, model):
+            results[index] = result
+        return results
+
+    def iter_batch_answers(
+        self,
+        items: List[Dict[str, Optional[str]]],
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """批量查询答案，按完成顺序逐个产出 (序号, 结果)
+
+        缓存命中和数据库命中（一条集合查询）立即产出，
+        未命中的问题提交到有界线程池并发进行模糊匹配和AI生成。
+        """
+        if len(items) > settings.batch_query.max_items:
+            raise ValidationError(f"单次最多查询 {settings.batch_query.max_items} 个问题")
+
+        pending = []
+        for index, item in enumerate(items):
+            question_text = (item.get("title") or "").strip()
+            if not question_text:
+                yield index, {"code": 0, "data": None, "msg": "问题不能为空", "source": None}
+                continue
+
+            options = (item.get("options") or "").strip()
+            question_type = (item.get("type") or "").strip()
+            cache_key = self.answer_cache.make_key(question_text, options, question_type)
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                yield index, self._cache_result(cached)
+            else:
+                pending.append((index, question_text, options, question_type, cache_key))
+
+        if not pending:
+            return
+
+        found = self.question_repo.find_by_normalized_questions([entry[1] for entry in pending])
+        misses = []
+        for entry in pending:
+            question = found.get(entry[1])
+            if question:
+                yield entry[0], self._database_result(question, entry[4])
+            else:
+                misses.append(entry)
+
+        if not misses:
+            return
+
+        logger.info(f"批量查询: {len(items)} 个问题中 {len(misses)} 个未命中题库，并发处理")
+        if settings.batch_query.prompt_batching and len(misses) > 1:
+            yield from self._resolve_batch_misses(misses, provider_id, model)
+            return
+
+        executor = self._get_batch_executor()
+        futures = {
+            executor.submit(
+                self._resolve_database_miss,
+                question_text, options, question_type, provider_id, model, cache_key
+            ): index
+            for index, question_text, options, question_type, cache_key in misses
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"批量查询中的问题处理失败: {str(e)}")
+                result = {"code": 0, "data": None, "msg": f"查询失败: {str(e)}", "source": None}
+            yield futures[future], result
+
+    def _resolve_batch_misses(
+        self,
+        misses: List[Tuple[int, str, str, str, CacheKey]],
+        provider_id: Optional[str],
+        model: Optional[str]
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """批量处理未命中的问题：先逐个模糊匹配，剩余问题合并到多题提示词中并发请求AI"""
+        # 相同问题（缓存键相同）只向AI提问一次
+        groups: Dict[CacheKey, List[Tuple[int, str, str, str, CacheKey]]] = {}
+        for entry in misses:
+            index, question_text, options, question_type, cache_key = entry
+            fuzzy = self._search_fuzzy_match(question_text, options, question_type)
+            if fuzzy:
+                yield index, self._fuzzy_result(fuzzy, cache_key)
+            else:
+                groups.setdefault(cache_key, []).append(entry)
+
+        if not groups:
+            return
+
+        # 与单题查询共用AI调用合并键。合并键在线程池任务开始执行时才占位，占位者总是正在执行；
+        # 其他请求正在生成的问题不在线程池中等待（会占满线程池导致占位任务无法执行），
+        # 任务完成后在当前线程中等待其结果
+        unique = [entries[0] for entries in groups.values()]
+        chunk_size = max(1, settings.api_config.batch_size)
+        executor = self._get_batch_executor()
+        futures = {
+            executor.submit(self._generate_batch_chunk, chunk, provider_id, model): chunk
+            for chunk in (unique[start:start + chunk_size] for start in range(0, len(unique), chunk_size))
+        }
+
+        followers = []
+        for future in as_completed(futures):
+            try:
+                resolved = future.result()
+            except Exception as e:
+                logger.error(f"批量AI生成答案失败: {str(e)}")
+                resolved = [(entry, None, None) for entry in futures[future]]
+
+            for entry, answer, flight in resolved:
+                if flight is not None:
+                    followers.append((entry, flight))
+                    continue
+                for index, *_ in groups[entry[4]]:
+                    yield index, self._ai_result(answer)
+
+        for entry, flight in followers:
+            try:
+                answer = self.ai_flights.wait(flight)
+            except Exception as e:
+                logger.error(f"等待并发请求的AI生成结果失败: {str(e)}")
+                answer = None
+            for index, *_ in groups[entry[4]]:
+                yield index, self._ai_result(answer)
+
+    def _generate_batch_chunk(
+        self,
+        chunk: List[Tuple[int, str, str, str, CacheKey]],
+        provider_id: Optional[str],
+        model: Optional[str]
+    ) -> List[Tuple[Tuple[int, str, str, str, CacheKey], Optional[str], Any]]:
+        """为一组问题占位合并键并用一次多题提示词生成答案（在批量线程池中执行，不阻塞等待其他请求）
+
+        Returns:
+            每个问题的 (问题, 答案, 调用记录)：其他请求正在生成的问题答案为None，
+            返回其调用记录由调用方等待；其余问题调用记录为None
+        """
+        resolved = []
+        leaders = []
+        for entry in chunk:
+            flight_key = (entry[4], provider_id, model)
+            flight, leader = self.ai_flights.join(flight_key)
+            if not leader:
+                resolved.append((entry, None, flight))
+                continue
+            # 占位前其他请求可能刚刚生成并缓存了答案
+            cached = self.answer_cache.get(entry[4])
+            if cached:
+                self.ai_flights.complete(flight_key, flight, cached.answer)
+                resolved.append((entry, cached.answer, None))
+            else:
+                leaders.append((entry, flight))
+
+        if not leaders:
+            return resolved
+
+        answers: List[Optional[str]] = [None] * len(leaders)
+        error: Optional[BaseException] = None
+        try:
+            answers = self._generate_batch_ai_answers([entry for entry, _ in leaders], provider_id, model)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # 无论成功与否都结束占位，唤醒等待这些问题的其他请求
+            for (entry, flight), answer in zip(leaders, answers):
+                self.ai_flights.complete((entry[4], provider_id, model), flight, answer, error)
+
+        resolved.extend((entry, answer, None) for (entry, _), answer in zip(leaders, answers))
+        return resolved
+
+    def _generate_batch_ai_answers(
+        self,
+        entries: List[Tuple[int, str, str, str, CacheKey]],
+        provider_id: Optional[str],
+        model: Optional[str]
+    ) -> List[Optional[str]]:
+        """用一次多题提示词请求生成多道题的答案并保存"""
+        self._ensure_ai_service_initialized()
+        try:
+            answers = self.ai_service_manager.query_answers_batch(
+                [(question_text, options, question_type) for _, question_text, options, question_type, _ in entries],
+                provider_id,
+                model
+            )
+        except AIServiceError as e:
+            logger.error(f"AI服务批量查询错误: {str(e)}")
+            return [None] * len(entries)
+
+        for (_, question_text, options, question_type, _), answer in zip(entries, answers):
+            if not answer:
+                continue
+            try:
+                self._save_ai_answer(question_text, answer, options, question_type)
+            except DatabaseError as e:
+                # 保存失败不应该影响返回结果，记录日志即可
+                logger.error(f"保存AI答案到数据库失败: {str(e)}")
+        return answers
+
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """获取批量查询的共享线程池（限制所有批量请求的AI并发总数）"""
+        with self._batch_lock:
+            if self._batch_executor is None:
+                self._batch_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.batch_query.max_workers),
+                    thread_name_prefix="batch-query"
+                )
+            return self._batch_executor
+
     def _search_local_database(self, question_text: str) -> Optional[Question]:
         """在本地数据库中搜索问题"""
         try:
-            # 精确匹配
-            question = self.question_repo.find_by_question(question_text)
+            # 标准化文本精确匹配（走哈希索引）
+            question = self.question_repo.find_by_normalized_question(question_text)
 
             if question:
                 logger.debug(f"精确匹配找到问题: {question.id}")
@@ -98,6 +473,99 @@ class QAService:
             logger.error(f"搜索本地数据库失败: {str(e)}")
             raise DatabaseError(f"数据库搜索失败: {str(e)}")
 
+    def _search_fuzzy_match(
+        self,
+        question_text: str,
+        options: Optional[str],
+        question_type: Optional[str]
+    ) -> Optional[FuzzyMatch]:
+        """模糊匹配题库，失败时不影响后续的AI生成"""
+        try:
+            return self.fuzzy_matcher.find_match(question_text, options, question_type)
+        except Exception as e:
+            logger.warning(f"模糊匹配失败，跳过: {str(e)}")
+            return None
+
+    def _generate_and_save_ai_answer(
+        self,
+        question_text: str,
+        options: str,
+        question_type: str,
+        provider_id: Optional[str],
+        model: Optional[str],
+        cache_key: CacheKey
+    ) -> Optional[str]:
+        """生成AI答案并保存（由合并后的单次调用执行）"""
+        # 上一轮合并调用可能刚刚完成，先复查缓存
+        cached = self.answer_cache.get(cache_key)
+        if cached:
+            return cached.answer
+
+        ai_answer = self._generate_ai_answer(question_text, options, question_type, provider_id, model)
+        if ai_answer:
+            # 保存AI生成的答案到数据库
+            try:
+                self._save_ai_answer(question_text, ai_answer, options, question_type)
+                logger.info("AI答案已提交保存")
+            except DatabaseError as e:
+                # 保存失败不应该影响返回结果，记录日志即可
+                logger.error(f"保存AI答案到数据库失败: {str(e)}")
+
+        return ai_answer
+
+    async def _generate_and_save_ai_answer_async(
+        self,
+        question_text: str,
+        options: str,
+        question_type: str,
+        provider_id: Optional[str],
+        model: Optional[str],
+        cache_key: CacheKey
+    ) -> Optional[str]:
+        """异步生成AI答案并保存（由合并后的单次调用执行）"""
+        cached = self.answer_cache.get(cache_key)
+        if cached:
+            return cached.answer
+
+        ai_answer = await self._generate_ai_answer_async(question_text, options, question_type, provider_id, model)
+        if ai_answer:
+            try:
+                await asyncio.to_thread(self._save_ai_answer, question_text, ai_answer, options, question_type)
+                logger.info("AI答案已提交保存")
+            except DatabaseError as e:
+                logger.error(f"保存AI答案到数据库失败: {str(e)}")
+
+        return ai_answer
+
+    async def _generate_ai_answer_async(
+        self,
+        question_text: str,
+        options: str,
+        question_type: str,
+        provider_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """异步使用AI生成答案，错误处理与 _generate_ai_answer 相同"""
+        try:
+            self._ensure_ai_service_initialized()
+
+            answer = await self.ai_service_manager.query_answer_async(
+                question_text, options, question_type, provider_id, model
+            )
+
+            if answer:
+                logger.info(f"AI生成答案成功: {answer[:50]}...")
+                return answer
+            logger.warning("AI未能生成有效答案")
+            return None
+
+        except AIServiceError as e:
+            logger.error(f"AI服务错误: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"AI生成答案时发生未知错误: {str(e)}")
+            return None
+
     def _generate_ai_answer(
         self,
         question_text: str,
@@ -111,10 +579,7 @@ class QAService:
             logger.debug(f"开始AI生成答案，参数: question={question_text}, options={options}, type={question_type}, provider={provider_id}, model={model}")
 
             # 确保AI服务管理器已初始化
-            if not self.ai_service_manager.providers:
-                logger.info("AI服务管理器未初始化，正在初始化...")
-                self.ai_service_manager.settings = __import__('geyago.config.settings', fromlist=['settings']).settings
-                self.ai_service_manager.initialize()
+            self._ensure_ai_service_initialized()
 
             answer = self.ai_service_manager.query_answer(question_text, options, question_type, provider_id, model)
 
@@ -133,16 +598,34 @@ class QAService:
             logger.error(f"AI生成答案时发生未知错误: {str(e)}")
             return None
 
+    def _ensure_ai_service_initialized(self) -> None:
+        """确保AI服务管理器已初始化"""
+        if not self.ai_service_manager.providers:
+            logger.info("AI服务管理器未初始化，正在初始化...")
+            self.ai_service_manager.settings = __import__('geyago.config.settings', fromlist=['settings']).settings
+            self.ai_service_manager.initialize()
+
     def _save_ai_answer(
         self,
         question_text: str,
         answer: str,
         options: str,
         question_type: str
-    ) -> Question:
-        """保存AI生成的答案到数据库"""
+    ) -> None:
+        """保存AI生成的答案（同时写入答案缓存）
+
+        启用后台写入时答案进入写入队列后立即返回；未启用或队列已满时同步写入数据库。
+        """
+        self.answer_cache.set(
+            self.answer_cache.make_key(question_text, options, question_type),
+            answer,
+            "ai"
+        )
+        if self.answer_writer.submit(question_text, answer, options, question_type):
+            return
+
         try:
-            return self.question_repo.create_question(
+            self.question_repo.create_question(
                 question_text=question_text,
                 answer=answer,
                 options=options,
@@ -152,6 +635,14 @@ class QAService:
             logger.error(f"保存AI答案失败: {str(e)}")
             raise DatabaseError(f"保存答案失败: {str(e)}")
 
+    def shutdown(self) -> None:
+        """写入队列中剩余的AI答案并关闭批量查询线程池"""
+        self.answer_writer.close()
+        with self._batch_lock:
+            executor, self._batch_executor = self._batch_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def add_question(
         self,
         question_text: str,
@@ -167,31 +658,80 @@ class QAService:
         if not answer or not answer.strip():
             raise ValidationError("答案不能为空")
 
-        # 检查问题是否已存在
-        existing = self.question_repo.find_by_question(question_text.strip())
+        # 检查问题是否已存在（标准化后相同视为重复）
+        existing = self.question_repo.find_by_normalized_question(question_text.strip())
         if existing:
             raise ValidationError("问题已存在")
 
-        return self.question_repo.create_question(
+        question = self.question_repo.create_question(
             question_text=question_text.strip(),
             answer=answer.strip(),
             options=options.strip() if options else None,
             question_type=question_type.strip() if question_type else None
         )
+        # 手动录入的答案优先于之前缓存的结果
+        self.answer_cache.invalidate_question(question.question)
+        self._invalidate_question_count()
+        return question
+
+    def save_question(self, question: Question) -> Question:
+        """保存（新增或修改）问题，并使新旧问题文本的答案缓存失效
+
+        答案缓存只在当前进程内有效，其他worker中的旧答案在缓存过期后才会更新
+        """
+        previous = self.question_repo.find_by_id(question.id) if question.id is not None else None
+        saved = self.question_repo.save(question)
+        if previous is not None:
+            self.answer_cache.invalidate_question(previous.question)
+        self.answer_cache.invalidate_question(saved.question)
+        self._invalidate_question_count()
+        return saved
+
+    def upsert_question(
+        self,
+        question_text: str,
+        answer: str,
+        options: Optional[str] = None,
+        question_type: Optional[str] = None
+    ) -> Tuple[Question, bool]:
+        """按标准化问题插入或更新答案，并使该问题的答案缓存失效
+
+        答案缓存只在当前进程内有效，其他worker中的旧答案在缓存过期后才会更新
+
+        Returns:
+            (写入后的问题, 是否为新插入)
+        """
+        if not question_text or not question_text.strip():
+            raise ValidationError("问题文本不能为空")
+
+        question, inserted = self.question_repo.upsert(question_text.strip(), answer, options, question_type)
+        self.answer_cache.invalidate_question(question.question)
+        if inserted:
+            self._invalidate_question_count()
+        return question, inserted
+
+    def import_questions(self, stream: TextIO, fmt: str) -> ImportResult:
+        """批量导入题库文件（JSONL/CSV），已存在的问题跳过
+
+        运行中的服务逐行维护索引，暂停索引维护只在命令行导入（geyago import）中使用
+        """
+        importer = QuestionImporter(batch_size=settings.database.import_batch_size)
+        result = importer.run(stream, fmt)
+        if result.inserted:
+            # 新导入的答案优先于之前缓存的AI答案
+            self.answer_cache.clear()
+            self._invalidate_question_count()
+        return result
 
     def get_question_statistics(self) -> Dict[str, Any]:
         """获取题库统计信息"""
         try:
-            total_count = self.question_repo.count_questions()
+            total_count = self.count_questions()
 
-            # 检查AI服务健康状态
+            # 读取缓存的AI服务健康状态（不发起模型调用）
             ai_healthy = True
             try:
-                health_status = self.ai_service_manager.health_check()
-                ai_healthy = any(
-                    provider.get("status") == "healthy"
-                    for provider in health_status.values()
-                )
+                ai_healthy = self.ai_service_manager.is_any_provider_healthy()
             except Exception as e:
                 logger.warning(f"AI服务健康检查失败: {str(e)}")
                 ai_healthy = False
@@ -199,9 +739,18 @@ class QAService:
             return {
                 "total_questions": total_count,
                 "service_status": {
-                    "database": "healthy",
-                    "ai_service": "healthy" if ai_healthy else "unhealthy"
-                }
+                    "database": STATUS_HEALTHY,
+                    "ai_service": STATUS_HEALTHY if ai_healthy else STATUS_UNHEALTHY
+                },
+                "database_pool": db_manager.get_pool_stats(),
+                "database_pragmas": db_manager.pragmas,
+                "database_maintenance": database_maintenance.get_stats(),
+                "answer_cache": self.answer_cache.get_stats(),
+                "fuzzy_match": self.fuzzy_matcher.get_stats(),
+                "ai_single_flight": self.ai_flights.get_stats(),
+                "ai_hedging": self.ai_service_manager.get_hedging_stats(),
+                "ai_write_behind": self.answer_writer.get_stats(),
+                "database_backup": backup_manager.get_stats()
             }
         except Exception as e:
             logger.error(f"获取统计信息失败: {str(e)}")
@@ -213,7 +762,7 @@ class QAService:
             raise ValidationError("搜索关键词不能为空")
 
         try:
-            return self.question_repo.search_questions(keyword.strip())
+            return self.question_repo.search_questions(keyword.strip(), limit)
         except Exception as e:
             logger.error(f"搜索问题失败: {str(e)}")
             raise DatabaseError(f"搜索问题失败: {str(e)}")
@@ -226,13 +775,59 @@ class QAService:
             logger.error(f"获取最近问题失败: {str(e)}")
             raise DatabaseError(f"获取最近问题失败: {str(e)}")
 
+    def get_questions_page(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        page: int = 1
+    ) -> Tuple[List[Question], Optional[str]]:
+        """分页获取问题（有游标时按游标继续，否则按页码）
+
+        Returns:
+            (本页问题, 下一页游标)
+        """
+        try:
+            return self.question_repo.get_questions_page(
+                limit,
+                cursor=cursor,
+                offset=0 if cursor else (max(1, page) - 1) * limit
+            )
+        except (ValidationError, DatabaseError):
+            raise
+        except Exception as e:
+            logger.error(f"获取问题列表失败: {str(e)}")
+            raise DatabaseError(f"获取问题列表失败: {str(e)}")
+
+    def count_questions(self) -> int:
+        """题库总数（缓存 count_cache_seconds 秒，分页请求不必每次全表计数）"""
+        ttl = settings.cache.count_cache_seconds
+        now = time.monotonic()
+        with self._count_lock:
+            if self._count_cache is not None and now - self._count_cache[1] < ttl:
+                return self._count_cache[0]
+
+        count = self.question_repo.count_questions()
+        with self._count_lock:
+            self._count_cache = (count, now)
+        return count
+
+    def _invalidate_question_count(self) -> None:
+        """题库内容变化后使总数缓存失效"""
+        with self._count_lock:
+            self._count_cache = None
+
     def delete_question(self, question_id: int) -> bool:
         """删除问题"""
         if question_id <= 0:
             raise ValidationError("无效的问题ID")
 
         try:
-            return self.question_repo.delete_question(question_id)
+            question = self.question_repo.find_by_id(question_id)
+            deleted = self.question_repo.delete_question(question_id)
+            if question:
+                self.answer_cache.invalidate_question(question.question)
+            self._invalidate_question_count()
+            return deleted
         except Exception as e:
             logger.error(f"删除问题失败: {str(e)}")
             raise DatabaseError(f"删除问题失败: {str(e)}")
@@ -0,0 +1,125 @@
+"""
+题库流式导出模块
+
+通过服务端游标逐块读取问题表，编码为 JSONL / CSV 文本块（可选gzip压缩）逐块输出，
+内存占用与题库大小无关；导出的字段可以直接用 geyago import 导入到其他节点
+"""
+
+from __future__ import annotations
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from ..core.exceptions import ValidationError
+from ..models.question import QuestionRepository
+
+# 支持的导出格式（ndjson 为 jsonl 的别名）
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# 导出字段（与 QuestionRepository.iter_rows 返回的列一致）
+EXPORT_FIELDS = ("id", "question", "answer", "options", "type", "created_at")
+
+# 格式 -> (Content-Type, 文件扩展名)
+EXPORT_CONTENT_TYPES = {
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "csv": ("text/csv", "csv")
+}
+
+# 每个输出块包含的行数
+EXPORT_CHUNK_ROWS = 500
+
+
+def normalize_export_format(fmt: Optional[str]) -> str:
+    """标准化导出格式名称
+
+    Raises:
+        ValidationError: 不支持的格式
+    """
+    fmt = (fmt or "jsonl").strip().lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError(f"不支持的导出格式: {fmt}，可选: {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def parse_export_time(value: Optional[str], name: str) -> Optional[str]:
+    """将ISO格式的时间转换为数据库 created_at 的存储格式
+
+    Raises:
+        ValidationError: 时间格式错误
+    """
+    if not value or not value.strip():
+        return None
+    try:
+        return datetime.fromisoformat(value.strip()).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise ValidationError(f"{name} 必须是ISO格式的时间，如 2024-01-01 或 2024-01-01T08:00:00")
+
+
+def encode_rows(rows: Iterable[Tuple[Any, ...]], fmt: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """将问题行编码为文本块"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+
+    count = 0
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """将字节块流式压缩为gzip格式"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_question_export(
+    fmt: str = "jsonl",
+    question_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """流式导出题库
+
+    参数在调用时立即校验，返回的生成器在迭代时才开始读取数据库
+
+    Args:
+        fmt: 导出格式，jsonl（ndjson）或 csv
+        question_type: 只导出该类型的问题
+        since: 只导出该时间及之后添加的问题（ISO格式，用于增量导出）
+        until: 只导出该时间之前添加的问题（ISO格式）
+        compress: 是否gzip压缩
+
+    Raises:
+        ValidationError: 参数无效
+    """
+    fmt = normalize_export_format(fmt)
+    since = parse_export_time(since, "since")
+    until = parse_export_time(until, "until")
+
+    rows = QuestionRepository.iter_rows(question_type=question_type or None, since=since, until=until)
+    chunks = (chunk.encode("utf-8") for chunk in encode_rows(rows, fmt))
+    return gzip_chunks(chunks) if compress else chunks
\ No newline at end of file
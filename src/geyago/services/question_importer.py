@@ -0,0 +1,237 @@
+"""
+题库批量导入模块
+
+逐行流式解析 JSONL / CSV 题库文件（不整体读入内存），导入过程中标准化并去重，
+每 batch_size 行通过 DatabaseManager.execute_many 在一个事务中写入，
+标准化问题已存在于题库中的行跳过
+"""
+
+from __future__ import annotations
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from ..core.database import db_manager
+from ..core.exceptions import ValidationError
+from ..models.question import Question, QuestionRepository
+from ..utils.helpers import build_question_key, hash_question_key
+
+logger = logging.getLogger(__name__)
+
+# 支持的导入格式
+IMPORT_FORMATS = ("jsonl", "csv")
+
+# 字段名 -> 可接受的别名（依次查找）
+FIELD_ALIASES = {
+    "question": ("question", "question_text", "title"),
+    "answer": ("answer",),
+    "options": ("options",),
+    "type": ("type", "question_type")
+}
+
+# 导入结果中最多保留的错误行信息
+MAX_REPORTED_ERRORS = 20
+
+
+def detect_import_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """根据文件扩展名或Content-Type判断导入格式
+
+    Raises:
+        ValidationError: 无法识别格式
+    """
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    if mimetype in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "jsonl"
+    if mimetype == "text/csv":
+        return "csv"
+
+    raise ValidationError(f"无法识别导入格式，请指定格式: {', '.join(IMPORT_FORMATS)}")
+
+
+def iter_import_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """逐行解析导入文件
+
+    Yields:
+        (行号, 记录)，无法解析的JSON行以异常对象作为记录返回
+    """
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    elif fmt == "csv":
+        # 第1行是表头，数据从第2行开始
+        for line_no, row in enumerate(csv.DictReader(stream), 2):
+            yield line_no, row
+    else:
+        raise ValidationError(f"不支持的导入格式: {fmt}，可选: {', '.join(IMPORT_FORMATS)}")
+
+
+def _field(record: Dict[str, Any], name: str) -> Optional[str]:
+    """按别名读取字段并标准化为去除首尾空白的字符串，空值返回None"""
+    for alias in FIELD_ALIASES[name]:
+        value = record.get(alias)
+        if value is None:
+            continue
+        if isinstance(value, list):
+            value = " ".join(str(item).strip() for item in value if str(item).strip())
+        value = str(value).strip()
+        if value:
+            return value
+    return None
+
+
+@dataclass
+class ImportResult:
+    """导入结果统计"""
+    total: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    existing: int = 0
+    invalid: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        """每秒处理的行数"""
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "total": self.total,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "existing": self.existing,
+            "invalid": self.invalid,
+            "batches": self.batches,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.errors
+        }
+
+
+class QuestionImporter:
+    """题库批量导入器
+
+    - 问题和答案必填，问题字段也可以叫 question_text / title，类型字段也可以叫 question_type
+    - 文件内标准化后相同的问题只保留第一条（按64位哈希去重，几十万行只占用少量内存）
+    - defer_indexes 开启时导入期间暂停二级索引和全文索引维护，结束后一次性重建
+      （会影响其他进程的搜索和分页，只用于命令行导入）
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        defer_indexes: bool = False,
+        progress: Optional[Callable[[ImportResult], None]] = None
+    ):
+        self.batch_size = max(1, batch_size)
+        self.defer_indexes = defer_indexes
+        self.progress = progress
+
+    def run(self, stream: TextIO, fmt: str) -> ImportResult:
+        """导入一个题库文件流"""
+        if fmt not in IMPORT_FORMATS:
+            raise ValidationError(f"不支持的导入格式: {fmt}，可选: {', '.join(IMPORT_FORMATS)}")
+
+        records = iter_import_records(stream, fmt)
+        if not self.defer_indexes:
+            return self._import(records)
+        with db_manager.deferred_indexes():
+            return self._import(records)
+
+    def _import(self, records: Iterator[Tuple[int, Any]]) -> ImportResult:
+        """解析、去重并分批写入"""
+        result = ImportResult()
+        seen: Set[int] = set()
+        batch: List[Question] = []
+        keys: List[str] = []
+        start = time.monotonic()
+
+        for line_no, record in records:
+            result.total += 1
+            question = self._parse_record(line_no, record, result)
+            if question is None:
+                continue
+
+            key = build_question_key(question.question)
+            question_hash = hash_question_key(key)
+            if question_hash in seen:
+                result.duplicates += 1
+                continue
+            seen.add(question_hash)
+
+            batch.append(question)
+            keys.append(key)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch, keys, result, start)
+                batch, keys = [], []
+
+        if batch:
+            self._write_batch(batch, keys, result, start)
+        result.elapsed = time.monotonic() - start
+
+        logger.info(
+            f"题库导入完成: 共 {result.total} 行，新增 {result.inserted}，文件内重复 {result.duplicates}，"
+            f"题库已存在 {result.existing}，无效 {result.invalid}，{result.rows_per_second:.0f} 行/秒"
+        )
+        return result
+
+    @staticmethod
+    def _parse_record(line_no: int, record: Any, result: ImportResult) -> Optional[Question]:
+        """校验并标准化一条记录，无效时记入统计并返回None"""
+        error = None
+        if isinstance(record, Exception):
+            error = f"JSON解析失败: {str(record)}"
+        elif not isinstance(record, dict):
+            error = "记录必须是对象"
+        else:
+            question_text = _field(record, "question")
+            answer = _field(record, "answer")
+            if not question_text:
+                error = "缺少问题"
+            elif not answer:
+                error = "缺少答案"
+            else:
+                return Question(
+                    question=question_text,
+                    answer=answer,
+                    options=_field(record, "options"),
+                    question_type=_field(record, "type")
+                )
+
+        result.invalid += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(f"第 {line_no} 行: {error}")
+        return None
+
+    def _write_batch(
+        self,
+        batch: List[Question],
+        keys: List[str],
+        result: ImportResult,
+        start: float
+    ) -> None:
+        """在一个事务中写入一批问题"""
+        inserted = QuestionRepository.insert_many_if_absent(batch, keys)
+        result.inserted += inserted
+        result.existing += len(batch) - inserted
+        result.batches += 1
+        result.elapsed = time.monotonic() - start
+        if self.progress is not None:
+            self.progress(result)
\ No newline at end of file
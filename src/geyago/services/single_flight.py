@@ -0,0 +1,171 @@
+"""
+并发请求合并模块
+
+同一个键的并发调用只执行一次，其余调用等待并共享结果。
+
+同步和异步调用互相可见：一方正在执行时另一方等待其结果；批量处理可以用 join/complete
+同时为多个键占位，合并到一次调用中执行
+"""
+
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    """一次正在执行的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _AsyncFlight(_Flight):
+    """一次正在执行的异步调用（完成时同样设置 done，同步调用也可以等待）"""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        super().__init__()
+        self.task = task
+
+
+class SingleFlight:
+    """并发调用合并器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        # 异步调用在事件循环内合并（同一进程通常只有一个服务事件循环）
+        self._async_flights: Dict[Hashable, _AsyncFlight] = {}
+
+        # 统计信息
+        self._executions = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行调用，如果相同键的调用正在进行则等待其结果
+
+        Args:
+            key: 合并键
+            func: 实际执行的调用
+
+        Returns:
+            (结果, 是否复用了其他请求的结果)
+
+        Raises:
+            执行者抛出的异常会同样抛给所有等待者
+        """
+        flight, leader = self.join(key)
+        if not leader:
+            return self.wait(flight), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            self.complete(key, flight, error=e)
+            raise
+        self.complete(key, flight, result)
+        return result, False
+
+    def join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """加入相同键正在进行的调用，没有时占位成为执行者
+
+        执行者必须调用 complete() 结束调用，等待者调用 wait() 获取结果
+
+        Returns:
+            (调用记录, 是否为执行者)
+        """
+        with self._lock:
+            flight = self._flights.get(key) or self._async_flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self._coalesced += 1
+                self._max_waiters = max(self._max_waiters, flight.waiters)
+                return flight, False
+
+            flight = _Flight()
+            self._flights[key] = flight
+            self._executions += 1
+            return flight, True
+
+    def complete(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        result: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """结束 join() 占位的调用，唤醒所有等待者"""
+        flight.result = result
+        flight.error = error
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    @staticmethod
+    def wait(flight: _Flight) -> Any:
+        """等待调用结束并返回结果
+
+        Raises:
+            执行者抛出的异常
+        """
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """异步执行调用，如果相同键的异步调用正在进行则等待其结果
+
+        调用在独立的任务中执行，任何一个等待者（包括发起者）被取消都不会中断它。
+
+        Returns:
+            (结果, 是否复用了其他请求的结果)
+
+        Raises:
+            执行者抛出的异常会同样抛给所有等待者
+        """
+        with self._lock:
+            flight = self._async_flights.get(key) or self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self._coalesced += 1
+                self._max_waiters = max(self._max_waiters, flight.waiters)
+                leader = False
+            else:
+                flight = _AsyncFlight(asyncio.ensure_future(func()))
+                flight.task.add_done_callback(lambda task: self._finish_async(key, flight))
+                self._async_flights[key] = flight
+                self._executions += 1
+                leader = True
+
+        if isinstance(flight, _AsyncFlight):
+            return await asyncio.shield(flight.task), not leader
+        # 同步调用（如批量查询）正在执行，在线程中等待其结果
+        return await asyncio.to_thread(self.wait, flight), True
+
+    def _finish_async(self, key: Hashable, flight: _AsyncFlight) -> None:
+        """异步调用结束后记录结果、移除记录并唤醒同步等待者"""
+        if flight.task.cancelled():
+            flight.error = asyncio.CancelledError()
+        else:
+            flight.error = flight.task.exception()
+            if flight.error is None:
+                flight.result = flight.task.result()
+        with self._lock:
+            self._async_flights.pop(key, None)
+        flight.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        with self._lock:
+            return {
+                "in_flight": len(self._flights) + len(self._async_flights),
+                "executions": self._executions,
+                "coalesced_waiters": self._coalesced,
+                "max_waiters": self._max_waiters
+            }
\ No newline at end of file
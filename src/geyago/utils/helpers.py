@@ -5,10 +5,12 @@
 """
 
 from __future__ import annotations
+import hashlib
 import json
 import logging
 import re
-from typing import Any, Dict, Optional, Union
+import unicodedata
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
 from ..config.settings import settings
@@ -198,10 +200,23 @@ def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
     return text[:max_length - len(suffix)] + suffix
 
 
+# 匹配时忽略的标点（全角标点已通过NFKC转换为半角）；运算符、比较符号和括号会改变题意，保留
+IGNORED_PUNCTUATION_PATTERN = re.compile(r'[?!:;"\'`。、“”‘’「」『』《》〈〉【】〔〕…·]')
+
+# 不在两个数字之间的句点和逗号（3.5、1,000 中的保留）
+SEPARATOR_PATTERN = re.compile(r'(?<!\d)[.,]|[.,](?!\d)')
+
+# 两侧不都是字母数字的空格（中文和运算符两侧的空格不影响题意）
+OPTIONAL_SPACE_PATTERN = re.compile(r' (?=[^a-z0-9])|(?<=[^a-z0-9]) ')
+
+
 def normalize_question_text(text: str) -> str:
     """
     标准化问题文本以便匹配
 
+    统一全角/半角和大小写，忽略空白和句读标点；+ - * / < > = % 等运算符、括号
+    以及数字中的小数点和千分位保留，"1+1=?" 与 "11=?"、"3.5" 与 "35" 不会相同
+
     Args:
         text: 原始问题文本
 
@@ -211,18 +226,73 @@ def normalize_question_text(text: str) -> str:
     if not text:
         return ""
 
-    # 转换为小写
-    text = text.lower()
+    # 全角转半角并转换为小写
+    text = unicodedata.normalize('NFKC', text).lower()
 
-    # 移除标点符号
-    text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
+    # 移除句读标点
+    text = SEPARATOR_PATTERN.sub(' ', text)
+    text = IGNORED_PUNCTUATION_PATTERN.sub(' ', text)
 
-    # 标准化空白字符
+    # 标准化空白字符：只保留两个字母数字之间的单个空格
     text = re.sub(r'\s+', ' ', text.strip())
+    text = OPTIONAL_SPACE_PATTERN.sub('', text)
 
     return text
 
 
+def build_question_key(text: str) -> str:
+    """
+    构建问题匹配键
+
+    Args:
+        text: 原始问题文本
+
+    Returns:
+        标准化后的文本；标准化后为空（如纯符号题目）时退回去除首尾空白的原文
+    """
+    normalized = normalize_question_text(text)
+    return normalized or (text or "").strip()
+
+
+def hash_question_key(key: str) -> int:
+    """
+    计算问题匹配键的定长哈希
+
+    Args:
+        key: 由 build_question_key 生成的匹配键
+
+    Returns:
+        64位有符号整数，可直接存入SQLite INTEGER列
+    """
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def extract_ngrams(text: str, n: int = 3) -> List[str]:
+    """
+    提取文本中不重复的字符n-gram（按首次出现的顺序）
+
+    Args:
+        text: 文本
+        n: 每个片段的字符数
+
+    Returns:
+        n-gram列表；文本短于n时返回整个文本
+    """
+    text = (text or "").strip()
+    if len(text) <= n:
+        return [text] if text else []
+
+    seen = set()
+    ngrams = []
+    for i in range(len(text) - n + 1):
+        gram = text[i:i + n]
+        if gram not in seen:
+            seen.add(gram)
+            ngrams.append(gram)
+    return ngrams
+
+
 def calculate_similarity(text1: str, text2: str) -> float:
     """
     计算两个文本的相似度（简单的字符重叠率）
@@ -35,6 +35,33 @@ def test_database():
     settings.database_url = original_db_url
 
 
+@pytest.fixture
+def temp_db_manager(tmp_path):
+    """独立临时数据库夹具（每个测试一个新数据库文件）"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'test_bank.db'}")
+    manager.init_database()
+
+    yield manager
+
+    manager.close_all_connections()
+
+
+@pytest.fixture(autouse=True)
+def sync_answer_writes(monkeypatch):
+    """测试中默认同步保存AI答案，避免后台写入线程在临时数据库夹具失效后才写入"""
+    from src.geyago.services.qa_service import qa_service
+
+    monkeypatch.setattr(settings.write_behind, "enabled", False)
+    monkeypatch.setattr(qa_service.answer_writer, "enabled", False)
+
+
+@pytest.fixture
+def repo_db(temp_db_manager, monkeypatch):
+    """让QuestionRepository使用临时数据库的夹具"""
+    monkeypatch.setattr("src.geyago.models.question.db_manager", temp_db_manager)
+    return temp_db_manager
+
+
 @pytest.fixture
 def sample_questions():
     """示例问题数据夹具"""
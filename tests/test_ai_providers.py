@@ -0,0 +1,598 @@
+"""
+AI服务提供商测试
+
+测试提供商的HTTP会话、请求和管理器行为（不访问真实网络）
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+import requests
+
+from src.geyago.config.settings import AIProviderConfig, Settings
+from src.geyago.core.exceptions import AIServiceError, RateLimitError, TimeoutError
+from src.geyago.services.ai_providers import base
+from src.geyago.services.ai_providers.base import RetryPolicy, parse_retry_after
+from src.geyago.services.ai_providers.openai_compatible import OpenAICompatibleProvider
+from src.geyago.services.ai_service_manager import AIServiceManager
+from src.geyago.services.circuit_breaker import CircuitBreaker
+from src.geyago.services.health_monitor import ProviderHealthMonitor
+from src.geyago.services.provider_router import ProviderRouter
+
+
+def make_config(**overrides):
+    """构造测试用的提供商配置"""
+    data = {
+        "name": "测试服务",
+        "enabled": True,
+        "api_key": "test-key",
+        "base_url": "https://example.invalid/v1/chat/completions",
+        "models": {"default": "test-model", "available": ["test-model"]},
+        "request_format": "openai_compatible",
+        "parameters": {}
+    }
+    data.update(overrides)
+    return AIProviderConfig(**data)
+
+
+def make_response(status_code=200, json_data=None, headers=None):
+    """构造模拟的HTTP响应"""
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.text = str(json_data)
+    response.json.return_value = json_data or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(str(status_code))
+    return response
+
+
+def chat_completion(content):
+    """构造OpenAI格式的响应体"""
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def make_manager(*provider_ids, routing_mode="default", **breaker_overrides):
+    """构造包含多个测试提供商的AI服务管理器"""
+    settings = Settings()
+    settings.ai_providers = {provider_id: make_config() for provider_id in provider_ids}
+    settings.app.default_ai = provider_ids[0]
+    settings.routing.mode = routing_mode
+    for key, value in breaker_overrides.items():
+        setattr(settings.circuit_breaker, key, value)
+    manager = AIServiceManager(settings)
+    manager.initialize()
+    return manager
+
+
+class TestProviderSession:
+    """提供商HTTP会话测试类"""
+
+    def test_session_uses_configured_pool(self):
+        """测试会话按配置创建连接池"""
+        provider = OpenAICompatibleProvider(
+            make_config(), {"pool_connections": 3, "pool_maxsize": 7}
+        )
+
+        adapter = provider.session.get_adapter("https://example.invalid")
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 7
+
+    def test_requests_go_through_session(self):
+        """测试请求复用提供商自己的会话"""
+        provider = OpenAICompatibleProvider(make_config(), {})
+        provider.session = Mock()
+        provider.session.post.return_value = make_response(
+            json_data=chat_completion('{"answer": "2"}')
+        )
+
+        assert provider.query_answer("1+1=?") == "2"
+        assert provider.query_answer("1+1=?") == "2"
+        assert provider.session.post.call_count == 2
+
+    def test_reload_closes_old_sessions(self):
+        """测试重新加载提供商时关闭旧会话并创建新会话"""
+        settings = Settings()
+        settings.ai_providers = {"test": make_config()}
+        settings.app.default_ai = "test"
+        manager = AIServiceManager(settings)
+        manager.initialize()
+        old_provider = manager.providers["test"]
+        old_provider.session = Mock()
+
+        manager.reload_providers()
+
+        old_provider.session.close.assert_called_once()
+        assert manager.providers["test"] is not old_provider
+
+    def test_reload_swaps_providers_before_closing(self):
+        """测试重新加载时先整体替换提供商列表再关闭旧会话，未变化的提供商保留熔断器"""
+        manager = make_manager("keep", "change")
+        keep_breaker = manager.circuit_breakers["keep"]
+        change_breaker = manager.circuit_breakers["change"]
+        keep_breaker.record_failure()
+        old_provider = manager.providers["keep"]
+        seen_during_close = []
+        old_provider.session = Mock()
+        old_provider.session.close.side_effect = lambda: seen_during_close.append(
+            dict(manager.providers)
+        )
+        manager.settings.ai_providers["change"] = make_config(api_key="new-key")
+
+        manager.reload_providers()
+
+        old_provider.session.close.assert_called_once()
+        assert set(seen_during_close[0]) == {"keep", "change"}
+        assert seen_during_close[0]["keep"] is not old_provider
+        assert manager.circuit_breakers["keep"] is keep_breaker
+        assert manager.circuit_breakers["change"] is not change_breaker
+
+
+class TestRetryPolicy:
+    """重试策略测试类"""
+
+    @pytest.fixture(autouse=True)
+    def record_sleeps(self, monkeypatch):
+        """记录重试等待时间而不真正休眠"""
+        self.sleeps = []
+        monkeypatch.setattr(base.time, "sleep", self.sleeps.append)
+
+    def test_backoff_is_capped(self):
+        """测试退避时间不超过上限"""
+        policy = RetryPolicy(base_delay=2, max_delay=5, jitter=0)
+
+        assert [policy.compute_delay(i) for i in range(4)] == [2, 4, 5, 5]
+
+    def test_retry_after_is_honored(self):
+        """测试429响应按Retry-After等待"""
+        policy = RetryPolicy(max_attempts=2, base_delay=1, max_delay=10)
+        calls = []
+
+        def func(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                raise RateLimitError("限流", details={"retry_after": 3})
+            return "ok"
+
+        assert policy.execute(func) == "ok"
+        assert self.sleeps == [3]
+
+    def test_non_retryable_error_is_raised_immediately(self):
+        """测试不可重试的错误不会重试"""
+        policy = RetryPolicy(max_attempts=3)
+        calls = []
+
+        def func(timeout):
+            calls.append(timeout)
+            raise AIServiceError("API密钥无效或已过期")
+
+        with pytest.raises(AIServiceError):
+            policy.execute(func)
+        assert len(calls) == 1
+
+    def test_budget_limits_retries(self):
+        """测试剩余预算不足以等待时停止重试"""
+        policy = RetryPolicy(max_attempts=5, base_delay=10, jitter=0, total_timeout=5)
+
+        def func(timeout):
+            assert timeout <= 5
+            raise TimeoutError("超时")
+
+        with pytest.raises(TimeoutError):
+            policy.execute(func)
+        assert self.sleeps == []
+
+    def test_provider_delay_does_not_grow_between_requests(self):
+        """测试多次失败后提供商的重试延迟不会累积增长"""
+        provider = OpenAICompatibleProvider(
+            make_config(), {"max_retries": 3, "retry_delay": 1, "retry_jitter": 0}
+        )
+        provider.session = Mock()
+        provider.session.post.return_value = make_response(status_code=503)
+
+        for _ in range(3):
+            with pytest.raises(AIServiceError):
+                provider.query_answer("问题")
+
+        assert provider.retry_delay == 1
+        assert self.sleeps == [1, 2] * 3
+
+    def test_client_errors_are_not_retried(self):
+        """测试4xx错误不重试"""
+        provider = OpenAICompatibleProvider(make_config(), {"max_retries": 3})
+        provider.session = Mock()
+        provider.session.post.return_value = make_response(status_code=400)
+
+        with pytest.raises(AIServiceError):
+            provider.query_answer("问题")
+        assert provider.session.post.call_count == 1
+
+    def test_parse_retry_after(self):
+        """测试解析Retry-After"""
+        assert parse_retry_after("7") == 7
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("invalid") is None
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_opens_after_threshold(self):
+        """测试连续失败达到阈值后熔断"""
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure()
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert not breaker.allow_request()
+        assert breaker.get_status()["state"] == "open"
+
+    def test_probe_after_recovery_timeout(self):
+        """测试恢复时间过后进入半开状态，探测结果决定开关"""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+
+        assert breaker.begin_probe()
+        assert breaker.state == "half_open"
+        assert not breaker.begin_probe()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        assert breaker.begin_probe()
+        breaker.record_success()
+        assert breaker.allow_request()
+
+    def test_manager_skips_open_default_provider(self):
+        """测试默认提供商熔断后直接使用备用提供商"""
+        manager = make_manager("primary", "backup", failure_threshold=1, recovery_timeout=60)
+        primary = manager.providers["primary"] = Mock()
+        backup = manager.providers["backup"] = Mock()
+        primary.query_answer.side_effect = AIServiceError("服务器错误")
+        backup.query_answer.return_value = "备用答案"
+
+        assert manager.query_answer("问题") == "备用答案"
+        assert manager.query_answer("问题") == "备用答案"
+
+        assert primary.query_answer.call_count == 1
+        assert manager.get_circuit_breaker_status("primary")["state"] == "open"
+
+    def test_background_probe_closes_breaker(self):
+        """测试后台探测成功后恢复使用默认提供商"""
+        manager = make_manager("primary", "backup", failure_threshold=1, recovery_timeout=0)
+        primary = manager.providers["primary"] = Mock()
+        manager.providers["backup"] = Mock()
+        primary.health_check.return_value = True
+        manager.circuit_breakers["primary"].record_failure()
+
+        with patch("src.geyago.services.ai_service_manager.threading.Thread") as thread_cls:
+            thread_cls.return_value.start.side_effect = lambda: manager._probe_provider("primary")
+            manager.query_answer("问题")
+
+        assert manager.get_circuit_breaker_status("primary")["state"] == "closed"
+
+
+class TestProviderRouter:
+    """自适应路由测试类"""
+
+    def test_prefers_faster_provider(self):
+        """测试优先选择延迟更低的提供商"""
+        router = ProviderRouter(exploration_ratio=0)
+        router.record("slow", "m", 3.0, True)
+        router.record("fast", "m", 0.5, True)
+
+        assert router.rank([("slow", "m"), ("fast", "m")])[0] == ("fast", "m")
+
+    def test_failures_are_penalized(self):
+        """测试失败率高的提供商得分变差"""
+        router = ProviderRouter(exploration_ratio=0, failure_penalty=10, ewma_alpha=0.5)
+        router.record("flaky", "m", 0.5, True)
+        router.record("flaky", "m", 0.5, False)
+        router.record("steady", "m", 1.0, True)
+
+        assert router.rank([("flaky", "m"), ("steady", "m")])[0] == ("steady", "m")
+
+    def test_unsampled_provider_is_tried_first(self):
+        """测试没有样本的提供商会被优先尝试"""
+        router = ProviderRouter(exploration_ratio=0)
+        router.record("known", "m", 0.2, True)
+
+        assert router.rank([("known", "m"), ("new", "m")])[0] == ("new", "m")
+
+    def test_adaptive_mode_routes_to_best_provider(self):
+        """测试自适应模式按统计选择提供商，显式指定时仍使用指定的提供商"""
+        manager = make_manager("primary", "backup", routing_mode="adaptive")
+        manager.router.exploration_ratio = 0
+        primary = manager.providers["primary"] = Mock()
+        backup = manager.providers["backup"] = Mock()
+        primary.query_answer.return_value = "主答案"
+        backup.query_answer.return_value = "备用答案"
+        manager.router.record("primary", manager._model_key("primary", None), 5.0, True)
+        manager.router.record("backup", manager._model_key("backup", None), 0.5, True)
+
+        assert manager.query_answer("问题") == "备用答案"
+        assert manager.query_answer("问题", provider_id="primary") == "主答案"
+
+
+class TestHedgedRequests:
+    """对冲请求测试类"""
+
+    @staticmethod
+    def make_hedging_manager(**overrides):
+        """构造启用对冲的管理器，primary 较慢、backup 较快"""
+        manager = make_manager("primary", "backup")
+        manager.settings.hedging.enabled = True
+        manager.settings.hedging.delay_seconds = 0.05
+        manager.settings.hedging.min_delay_seconds = 0.0
+        manager.settings.hedging.max_hedge_ratio = 1.0
+        for key, value in overrides.items():
+            setattr(manager.settings.hedging, key, value)
+        manager.providers["primary"] = Mock()
+        manager.providers["backup"] = Mock()
+        return manager
+
+    def test_backup_wins_when_primary_is_slow(self):
+        """测试首选提供商过慢时返回备用提供商的答案"""
+        manager = self.make_hedging_manager()
+        release = threading.Event()
+
+        def slow_answer(*args):
+            release.wait(2)
+            return "慢答案"
+
+        manager.providers["primary"].query_answer.side_effect = slow_answer
+        manager.providers["backup"].query_answer.return_value = "快答案"
+
+        try:
+            assert manager.query_answer("问题") == "快答案"
+        finally:
+            release.set()
+            manager.shutdown()
+
+        stats = manager.get_hedging_stats()
+        assert stats["fired"] == 1
+        assert stats["won"] == 1
+
+    def test_fast_primary_does_not_hedge(self):
+        """测试首选提供商在对冲延迟内返回时不发起对冲"""
+        manager = self.make_hedging_manager(delay_seconds=1.0)
+        backup = manager.providers["backup"]
+        manager.providers["primary"].query_answer.return_value = "主答案"
+
+        assert manager.query_answer("问题") == "主答案"
+        manager.shutdown()
+
+        backup.query_answer.assert_not_called()
+        assert manager.get_hedging_stats()["fired"] == 0
+
+    def test_hedge_ratio_budget(self):
+        """测试超过对冲比例上限时只等待首选提供商"""
+        manager = self.make_hedging_manager(max_hedge_ratio=0.0)
+        backup = manager.providers["backup"]
+        manager.providers["primary"].query_answer.side_effect = lambda *args: time.sleep(0.1) or "主答案"
+
+        assert manager.query_answer("问题") == "主答案"
+        manager.shutdown()
+
+        backup.query_answer.assert_not_called()
+        stats = manager.get_hedging_stats()
+        assert stats["fired"] == 0
+        assert stats["skipped_budget"] == 1
+
+    def test_latency_percentile(self):
+        """测试路由器按最近延迟样本计算分位数"""
+        router = ProviderRouter()
+        assert router.latency_percentile("p", "m", 0.9) is None
+
+        for latency in range(1, 11):
+            router.record("p", "m", latency / 10, True)
+
+        assert router.latency_percentile("p", "m", 0.9) == 0.9
+        assert router.latency_percentile("p", "m", 0.9, min_samples=20) is None
+
+
+class TestHealthMonitor:
+    """健康检查测试类"""
+
+    def test_health_check_uses_models_endpoint(self):
+        """测试健康检查请求模型列表接口而不是调用模型"""
+        provider = OpenAICompatibleProvider(make_config(), {})
+        provider.session = Mock()
+        provider.session.get.return_value = make_response(json_data={"data": []})
+
+        assert provider.health_check(timeout=1) is True
+        provider.session.post.assert_not_called()
+        assert provider.session.get.call_args[0][0] == "https://example.invalid/v1/models"
+
+        provider.session.get.return_value = make_response(status_code=401)
+        assert provider.health_check(timeout=1) is False
+
+    def test_traffic_signals_update_cache(self):
+        """测试真实请求的结果更新健康状态，连续失败达到阈值才标记为不健康"""
+        monitor = ProviderHealthMonitor(failure_threshold=2)
+        assert monitor.get("p")["status"] == "unknown"
+
+        monitor.record_traffic("p", True)
+        assert monitor.get("p")["status"] == "healthy"
+
+        monitor.record_traffic("p", False, "boom")
+        assert monitor.get("p")["status"] == "healthy"
+        monitor.record_traffic("p", False, "boom")
+        assert monitor.get("p")["status"] == "unhealthy"
+        assert monitor.get("p")["last_error"] == "boom"
+
+    def test_refresh_only_probes_stale_providers(self):
+        """测试后台检查只探测状态过期的提供商"""
+        monitor = ProviderHealthMonitor(ttl_seconds=60)
+        fresh, stale = Mock(), Mock()
+        stale.health_check.return_value = False
+        monitor.record_traffic("fresh", True)
+
+        assert monitor.refresh({"fresh": fresh, "stale": stale}) == 1
+        fresh.health_check.assert_not_called()
+        assert monitor.get("stale")["status"] == "unhealthy"
+        assert monitor.get("stale")["source"] == "probe"
+
+    def test_manager_health_reads_cache_only(self):
+        """测试管理器的健康状态只读取缓存，不调用提供商"""
+        manager = make_manager("primary", "backup")
+        primary = manager.providers["primary"] = Mock()
+        manager.providers["backup"] = Mock()
+        primary.query_answer.return_value = "答案"
+
+        assert manager.is_any_provider_healthy() is False
+        manager.query_answer("问题")
+
+        health = manager.health_check()
+        assert health["primary"]["status"] == "healthy"
+        assert health["backup"]["status"] == "unknown"
+        assert manager.is_any_provider_healthy() is True
+        primary.health_check.assert_not_called()
+        assert primary.query_answer.call_count == 1
+
+
+class TestPromptBatching:
+    """多题提示词批量答题测试类"""
+
+    def test_answers_mapped_by_index(self):
+        """测试一次请求回答多道题，答案按序号对应"""
+        provider = OpenAICompatibleProvider(make_config(), {"batch_size": 10})
+        provider.session = Mock()
+        provider.session.post.return_value = make_response(json_data=chat_completion(
+            '```json\n[{"index": 1, "answer": "乙"}, {"index": 0, "answer": "甲"}]\n```'
+        ))
+
+        answers = provider.query_answers_batch([("问题0", "", ""), ("问题1", "A.甲 B.乙", "single")])
+
+        assert answers == ["甲", "乙"]
+        assert provider.session.post.call_count == 1
+        prompt = provider.session.post.call_args[1]["json"]["messages"][0]["content"]
+        assert prompt.count("你是一个题库接口函数") == 1
+
+    def test_only_failed_items_are_retried(self):
+        """测试只重新请求未解析出答案的题目"""
+        provider = OpenAICompatibleProvider(make_config(), {"batch_size": 10, "batch_retries": 1})
+        provider.session = Mock()
+        provider.session.post.side_effect = [
+            make_response(json_data=chat_completion('[{"index": 0, "answer": "甲"}, {"index": 2, "answer": ""}]')),
+            make_response(json_data=chat_completion('[{"index": 0, "answer": "乙"}, {"index": 1, "answer": "丙"}]')),
+        ]
+
+        answers = provider.query_answers_batch([("问题0", "", ""), ("问题1", "", ""), ("问题2", "", "")])
+
+        assert answers == ["甲", "乙", "丙"]
+        retry_prompt = provider.session.post.call_args_list[1][1]["json"]["messages"][0]["content"]
+        assert "问题0" not in retry_prompt
+        assert "问题1" in retry_prompt and "问题2" in retry_prompt
+
+    def test_questions_split_by_batch_size(self):
+        """测试超过batch_size的题目拆分为多次请求"""
+        provider = OpenAICompatibleProvider(make_config(), {"batch_size": 2, "batch_retries": 0})
+        provider.session = Mock()
+        provider.session.post.return_value = make_response(json_data=chat_completion('[]'))
+
+        assert provider.query_answers_batch([("问题", "", "")] * 5) == [None] * 5
+        assert provider.session.post.call_count == 3
+
+    def test_manager_sends_unanswered_items_to_next_provider(self):
+        """测试管理器把首选提供商没有答出的题目交给下一个提供商"""
+        manager = make_manager("primary", "backup")
+        primary = manager.providers["primary"] = Mock()
+        backup = manager.providers["backup"] = Mock()
+        primary.query_answers_batch.return_value = ["甲", None]
+        backup.query_answers_batch.return_value = ["乙"]
+
+        answers = manager.query_answers_batch([("问题0", "", ""), ("问题1", "", "")])
+
+        assert answers == ["甲", "乙"]
+        assert backup.query_answers_batch.call_args[0][0] == [("问题1", "", "")]
+
+
+class TestAsyncProvider:
+    """异步提供商调用测试类"""
+
+    @staticmethod
+    def make_async_provider(**api_config):
+        """构造使用模拟异步客户端的提供商"""
+        provider = OpenAICompatibleProvider(make_config(), api_config)
+        client = Mock()
+        client.post = AsyncMock()
+        provider._get_async_client = Mock(return_value=client)
+        return provider, client
+
+    def test_query_answer_async(self):
+        """测试异步查询与同步查询使用相同的请求和解析逻辑"""
+        provider, client = self.make_async_provider()
+        client.post.return_value = make_response(json_data=chat_completion('{"answer": "答案"}'))
+
+        assert asyncio.run(provider.query_answer_async("问题", "A.甲|B.乙", "single")) == "答案"
+        assert client.post.call_args[1]["json"]["model"] == "test-model"
+
+    def test_retry_uses_asyncio_sleep(self, monkeypatch):
+        """测试异步重试使用 asyncio.sleep 退避"""
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr(base.asyncio, "sleep", fake_sleep)
+        provider, client = self.make_async_provider(retry_delay=1, retry_jitter=0)
+        client.post.side_effect = [
+            make_response(status_code=503),
+            make_response(json_data=chat_completion('{"answer": "答案"}'))
+        ]
+
+        assert asyncio.run(provider.query_answer_async("问题")) == "答案"
+        assert sleeps == [1]
+
+    def test_attempt_timeout_cancels_request(self):
+        """测试单次尝试超时后取消正在进行的请求"""
+        policy = RetryPolicy(max_attempts=1, total_timeout=0.05)
+        cancelled = []
+
+        async def slow_call(timeout):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(policy.execute_async(slow_call))
+        assert cancelled == [True]
+
+    def test_manager_async_hedge_cancels_loser(self):
+        """测试异步对冲由备用提供商胜出时取消首选提供商的请求"""
+        manager = make_manager("primary", "backup")
+        manager.settings.hedging.enabled = True
+        manager.settings.hedging.delay_seconds = 0.05
+        manager.settings.hedging.min_delay_seconds = 0.0
+        manager.settings.hedging.max_hedge_ratio = 1.0
+        primary = manager.providers["primary"] = Mock()
+        backup = manager.providers["backup"] = Mock()
+        cancelled = []
+
+        async def slow_answer(*args):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "慢答案"
+
+        async def main():
+            answer = await manager.query_answer_async("问题")
+            await asyncio.sleep(0)
+            return answer
+
+        primary.query_answer_async = slow_answer
+        backup.query_answer_async = AsyncMock(return_value="快答案")
+
+        assert asyncio.run(main()) == "快答案"
+        assert cancelled == [True]
+        assert manager.get_hedging_stats()["won"] == 1
+        assert manager.circuit_breakers["primary"].get_status()["total_failures"] == 0
\ No newline at end of file
@@ -4,9 +4,11 @@ API端点测试
 测试各个API路由的功能
 """
 
+import asyncio
+import io
 import pytest
 import json
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 from src.geyago.services.qa_service import qa_service
 from src.geyago.models.question import QuestionRepository
@@ -235,4 +237,203 @@ class TestAPIIntegration:
         # 4. 搜索问题
         search_results = qa_service.search_questions("测试")
         assert len(search_results) >= 1
-        assert question.id in [q.id for q in search_results]
\ No newline at end of file
+        assert question.id in [q.id for q in search_results]
+
+
+class TestBatchQueryAPI:
+    """批量查询API测试类"""
+
+    @pytest.fixture
+    def batch_client(self, repo_db):
+        """仅注册查询蓝图的Flask测试客户端"""
+        from flask import Flask
+        from src.geyago.api.routes.query import query_bp
+
+        app = Flask(__name__)
+        app.register_blueprint(query_bp)
+        qa_service.answer_cache.clear()
+        return app.test_client()
+
+    def test_batch_returns_ordered_results(self, batch_client):
+        """测试批量查询返回与输入顺序一致的结果"""
+        QuestionRepository.create_question("批量接口题目一", "答案一")
+
+        with patch.object(qa_service, "_generate_ai_answer", return_value="AI答案"):
+            response = batch_client.post("/api/query/batch", json={
+                "questions": [{"title": "批量接口未收录的题目"}, {"title": "批量接口题目一"}]
+            })
+
+        data = response.get_json()["data"]
+        assert response.status_code == 200
+        assert [result["data"] for result in data["results"]] == ["AI答案", "答案一"]
+
+    def test_batch_streams_ndjson(self, batch_client):
+        """测试NDJSON流式返回，每行包含问题序号"""
+        QuestionRepository.create_question("流式题目一", "答案一")
+
+        response = batch_client.post("/api/query/batch", json={
+            "questions": [{"title": "流式题目一"}, {"title": ""}],
+            "stream": True
+        })
+
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert response.mimetype == "application/x-ndjson"
+        assert sorted(line["index"] for line in lines) == [0, 1]
+        assert {line["index"]: line["data"] for line in lines}[0] == "答案一"
+
+    def test_batch_requires_questions(self, batch_client):
+        """测试缺少问题列表时返回400"""
+        response = batch_client.post("/api/query/batch", json={})
+
+        assert response.status_code == 400
+
+
+class TestQuestionListAPI:
+    """问题列表分页接口测试类"""
+
+    @pytest.fixture
+    def list_client(self, repo_db):
+        """仅注册查询蓝图的Flask测试客户端"""
+        from flask import Flask
+        from src.geyago.api.routes.query import query_bp
+
+        app = Flask(__name__)
+        app.register_blueprint(query_bp)
+        qa_service._invalidate_question_count()
+        return app.test_client()
+
+    def test_page_and_cursor(self, list_client):
+        """测试页码分页返回总数，游标分页可以继续获取下一页"""
+        for i in range(5):
+            QuestionRepository.create_question(f"列表问题{i}", f"答案{i}")
+
+        first = list_client.get("/api/questions?page=1&limit=2").get_json()["data"]
+        assert first["total"] == 5
+        assert [q["question"] for q in first["results"]] == ["列表问题4", "列表问题3"]
+
+        second = list_client.get(f"/api/questions?limit=2&cursor={first['next_cursor']}").get_json()["data"]
+        by_page = list_client.get("/api/questions?page=2&limit=2").get_json()["data"]
+        assert second["results"] == by_page["results"]
+
+        recent = list_client.get("/api/recent?limit=100").get_json()["data"]
+        assert recent["count"] == 5
+        assert recent["next_cursor"] is None
+
+    def test_import_upload(self, list_client):
+        """测试上传文件批量导入"""
+        content = '{"question": "接口导入问题", "answer": "答案"}\n{"question": "接口导入问题", "answer": "重复"}\n'
+
+        response = list_client.post(
+            "/api/questions/import",
+            data={"file": (io.BytesIO(content.encode("utf-8")), "bank.jsonl")},
+            content_type="multipart/form-data"
+        )
+
+        data = response.get_json()["data"]
+        assert (data["inserted"], data["duplicates"]) == (1, 1)
+        assert list_client.get("/api/questions").get_json()["data"]["total"] == 1
+
+    def test_import_raw_csv_body(self, list_client):
+        """测试以请求体直接上传CSV"""
+        response = list_client.post(
+            "/api/questions/import",
+            data="\ufeffquestion,answer\n请求体导入的问题,答案\n".encode("utf-8"),
+            content_type="text/csv"
+        )
+
+        assert response.get_json()["data"]["inserted"] == 1
+        assert list_client.post("/api/questions/import", data=b"x").status_code == 400
+
+    def test_export_stream(self, list_client):
+        """测试导出接口以文件下载流返回"""
+        QuestionRepository.create_question("导出问题", "答案", question_type="single")
+
+        response = list_client.get("/api/questions/export?format=ndjson&type=single")
+
+        assert response.mimetype == "application/x-ndjson"
+        assert "questions.jsonl" in response.headers["Content-Disposition"]
+        assert json.loads(response.get_data(as_text=True))["question"] == "导出问题"
+        assert list_client.get("/api/questions/export?since=bad").status_code == 400
+
+    def test_invalid_cursor(self, list_client):
+        """测试无效游标返回400"""
+        response = list_client.get("/api/questions?cursor=invalid")
+
+        assert response.status_code == 400
+
+
+class TestASGIQueryAPI:
+    """ASGI模式查询接口测试类"""
+
+    @staticmethod
+    def call_asgi(app, scope):
+        """调用ASGI应用并收集发送的消息"""
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(app(scope, receive, send))
+        return messages
+
+    @staticmethod
+    def query_scope(query_string):
+        """构造 GET /api/query 请求"""
+        return {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/query",
+            "query_string": query_string.encode("ascii"),
+            "headers": [],
+            "client": ("127.0.0.1", 12345)
+        }
+
+    def test_query_is_handled_asynchronously(self):
+        """测试查询接口走异步查询路径，响应格式与Flask接口一致"""
+        from src.geyago.asgi import GeyagoASGIApp
+
+        app = GeyagoASGIApp(Mock())
+        result = {"code": 1, "data": "AI答案", "msg": "AI生成答案", "source": "ai"}
+        with patch.object(qa_service, "query_answer_async", AsyncMock(return_value=result)) as query:
+            messages = self.call_asgi(app, self.query_scope("title=%E9%97%AE%E9%A2%98&provider=backup&title=x"))
+
+        assert messages[0]["status"] == 200
+        body = json.loads(messages[1]["body"])
+        assert body["success"] is True and body["data"]["data"] == "AI答案"
+        assert query.call_args.kwargs["question_text"] == "问题"
+        assert query.call_args.kwargs["provider_id"] == "backup"
+        app.wsgi_app.assert_not_called()
+
+    def test_query_validation_error(self):
+        """测试查询接口的业务异常转换为与Flask接口相同的错误响应"""
+        from src.geyago.asgi import GeyagoASGIApp
+        from src.geyago.core.exceptions import ValidationError
+
+        app = GeyagoASGIApp(Mock())
+        with patch.object(qa_service, "query_answer_async", AsyncMock(side_effect=ValidationError("问题无效"))):
+            messages = self.call_asgi(app, self.query_scope("title=abc"))
+
+        assert messages[0]["status"] == 400
+
+    def test_lifespan_closes_async_clients(self):
+        """测试服务关闭时释放异步HTTP客户端"""
+        from src.geyago.asgi import GeyagoASGIApp
+        from src.geyago.services.ai_service_manager import ai_service_manager
+
+        events = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(events)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        with patch.object(ai_service_manager, "aclose_providers", AsyncMock()) as aclose:
+            asyncio.run(GeyagoASGIApp(Mock())({"type": "lifespan"}, receive, send))
+
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        aclose.assert_awaited_once()
\ No newline at end of file
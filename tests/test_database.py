@@ -0,0 +1,407 @@
+"""
+数据库层测试
+
+测试连接池和DatabaseManager的行为
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.geyago.core.connection_pool import ConnectionPool
+
+
+class TestConnectionPool:
+    """连接池测试类"""
+
+    def test_connections_are_reused(self, tmp_path):
+        """测试归还后的连接会被复用"""
+        pool = ConnectionPool(lambda: sqlite3.connect(tmp_path / "pool.db"), max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        stats = pool.get_stats()
+        assert stats["created_count"] == 1
+        assert stats["acquire_count"] == 2
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+
+    def test_acquire_times_out_when_exhausted(self, tmp_path):
+        """测试连接耗尽时等待超时"""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(tmp_path / "pool.db"), max_size=1, timeout=0.05
+        )
+
+        conn = pool.acquire()
+        with pytest.raises(ConnectionError):
+            pool.acquire()
+        pool.release(conn)
+
+        assert pool.get_stats()["timeout_count"] == 1
+
+    def test_waiter_is_woken_on_release(self, tmp_path):
+        """测试等待中的线程在连接归还后获得连接"""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(tmp_path / "pool.db", check_same_thread=False),
+            max_size=1,
+            timeout=5
+        )
+        conn = pool.acquire()
+        acquired = []
+
+        def worker():
+            with pool.connection() as c:
+                acquired.append(c)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threading.Timer(0.05, pool.release, args=(conn,)).start()
+        thread.join(timeout=5)
+
+        assert acquired == [conn]
+        assert pool.get_stats()["wait_count"] == 1
+
+    def test_close_all_closes_idle_and_returned_connections(self, tmp_path):
+        """测试close_all关闭空闲连接，使用中的连接归还时关闭"""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(tmp_path / "pool.db"), max_size=2
+        )
+        idle = pool.acquire()
+        busy = pool.acquire()
+        pool.release(idle)
+
+        assert pool.close_all() == 1
+        pool.release(busy)
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            busy.execute("SELECT 1")
+        assert pool.get_stats()["size"] == 0
+
+    def test_unhealthy_idle_connection_is_replaced(self, tmp_path):
+        """测试健康检查失败的空闲连接会被替换"""
+        pool = ConnectionPool(
+            lambda: sqlite3.connect(tmp_path / "pool.db"),
+            max_size=1,
+            health_check_interval=0
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+
+        with pool.connection() as fresh:
+            assert fresh is not conn
+            fresh.execute("SELECT 1")
+
+        assert pool.get_stats()["discarded_count"] == 1
+
+
+class TestDatabaseManager:
+    """数据库管理器测试类"""
+
+    def test_queries_share_pooled_connection(self, temp_db_manager):
+        """测试多次查询复用同一个连接"""
+        temp_db_manager.execute_query(
+            "INSERT INTO question_answer (question, answer) VALUES (?, ?)",
+            ("问题", "答案")
+        )
+        row = temp_db_manager.execute_query(
+            "SELECT answer FROM question_answer WHERE question = ?",
+            ("问题",),
+            fetch_one=True
+        )
+
+        assert row["answer"] == "答案"
+        assert temp_db_manager.get_pool_stats()["created_count"] == 1
+
+    def test_failed_statement_rolls_back(self, temp_db_manager):
+        """测试语句失败时事务回滚且连接仍可复用"""
+        with pytest.raises(sqlite3.IntegrityError):
+            with temp_db_manager.get_cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO question_answer (question, answer) VALUES (?, ?)",
+                    ("问题", "答案")
+                )
+                cursor.execute(
+                    "INSERT INTO question_answer (question, answer) VALUES (?, NULL)",
+                    ("问题2",)
+                )
+
+        row = temp_db_manager.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer", fetch_one=True
+        )
+        assert row["count"] == 0
+
+
+class TestDatabaseBackup:
+    """数据库在线备份测试类"""
+
+    @pytest.fixture
+    def backup_manager(self, temp_db_manager, tmp_path):
+        """写入临时目录的备份管理器"""
+        from src.geyago.services.database_backup import BackupManager
+
+        with temp_db_manager.get_cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO question_answer (question, answer) VALUES (?, ?)",
+                [(f"备份问题{i}" * 20, "答案") for i in range(500)]
+            )
+        return BackupManager(temp_db_manager, directory=str(tmp_path / "backups"), keep=2,
+                             pages_per_step=5, step_sleep=0)
+
+    def test_backup_copies_in_steps_and_rotates(self, backup_manager):
+        """测试分步复制得到独立的备份文件，并只保留最新的备份"""
+        progress = []
+        first = backup_manager.backup_now(progress=lambda done, total: progress.append(done))
+        backup_manager.backup_now()
+        third = backup_manager.backup_now()
+
+        assert len(progress) > 1 and progress[-1] == first["pages"]
+        backups = backup_manager.list_backups()
+        assert len(backups) == 2
+        assert str(backups[0]) == third["path"]
+        assert third["removed"] == [first["path"]]
+
+        backup = sqlite3.connect(third["path"])
+        assert backup.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert backup.execute("SELECT COUNT(*) FROM question_answer").fetchone()[0] == 500
+        backup.close()
+
+        stats = backup_manager.get_stats()
+        assert stats["backup_count"] == 3
+        assert stats["in_progress"] is None
+        assert stats["last"]["duration_seconds"] >= 0
+
+    def test_concurrent_writes_fall_back_to_single_step(self, backup_manager, temp_db_manager, tmp_path):
+        """测试备份期间被其他连接反复修改时退回一次复制剩余页"""
+        writer = sqlite3.connect(temp_db_manager.db_path)
+
+        def write_during_backup(done, total):
+            writer.execute("INSERT INTO question_answer (question, answer) VALUES ('备份期间写入', '答案')")
+            writer.commit()
+
+        backup_manager.max_restarts = 1
+        result = backup_manager.backup_now(str(tmp_path / "manual.db"), progress=write_during_backup)
+        writer.close()
+
+        assert result["fallback"] is True
+        assert result["restarts"] == 2
+        assert "removed" not in result
+        backup = sqlite3.connect(result["path"])
+        assert backup.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        backup.close()
+
+    def test_backup_in_progress(self, backup_manager):
+        """测试已有备份进行中时不会重复备份"""
+        from src.geyago.services.database_backup import BackupInProgressError
+
+        with backup_manager._exclusive():
+            with pytest.raises(BackupInProgressError):
+                backup_manager.backup_now()
+
+
+class TestPragmaProfile:
+    """PRAGMA预设和后台维护测试类"""
+
+    def test_profile_with_overrides(self):
+        """测试预设与单项覆盖合并，取值无效时报错"""
+        from src.geyago.config.settings import DatabaseConfig
+        from src.geyago.core.database import resolve_pragmas
+        from src.geyago.core.exceptions import ConfigurationError
+
+        pragmas = resolve_pragmas(DatabaseConfig(pragma_profile="safe", synchronous="normal", cache_size_kb=4096))
+
+        assert pragmas["synchronous"] == "NORMAL"
+        assert pragmas["cache_size"] == -4096
+        assert pragmas["mmap_size"] == 0
+        with pytest.raises(ConfigurationError):
+            resolve_pragmas(DatabaseConfig(pragma_profile="turbo"))
+        with pytest.raises(ConfigurationError):
+            resolve_pragmas(DatabaseConfig(temp_store="RAM"))
+
+    def test_pragmas_applied_to_pooled_connections(self, tmp_path):
+        """测试每个连接建立时设置PRAGMA"""
+        from src.geyago.config.settings import DatabaseConfig
+        from src.geyago.core.database import DatabaseManager, resolve_pragmas
+
+        pragmas = resolve_pragmas(DatabaseConfig(pragma_profile="balanced", busy_timeout_ms=1234))
+        manager = DatabaseManager(f"sqlite:///{tmp_path / 'pragma.db'}", pragmas=pragmas)
+
+        values = manager.get_pragma_values()
+        manager.close_all_connections()
+
+        assert values["journal_mode"] == "wal"
+        assert values["synchronous"] == 1
+        assert values["temp_store"] == 2
+        assert values["busy_timeout"] == 1234
+
+    def test_maintenance_checkpoint_and_optimize(self, temp_db_manager):
+        """测试后台维护任务执行检查点和optimize并记录统计"""
+        from src.geyago.services.database_maintenance import DatabaseMaintenance
+
+        with temp_db_manager.get_cursor() as cursor:
+            cursor.execute("INSERT INTO question_answer (question, answer) VALUES ('检查点问题', '答案')")
+        maintenance = DatabaseMaintenance(temp_db_manager, checkpoint_mode="TRUNCATE")
+
+        result = maintenance.run_checkpoint()
+        assert result["busy"] == 0
+        assert temp_db_manager.db_path.with_name("test_bank.db-wal").stat().st_size == 0
+
+        maintenance.run_optimize()
+        stats = maintenance.get_stats()
+        assert stats["checkpoint_count"] == 1
+        assert stats["last_checkpoint"]["mode"] == "TRUNCATE"
+        assert stats["optimize_count"] == 1
+
+
+class TestMigrations:
+    """表结构迁移测试类"""
+
+    @staticmethod
+    def _create_legacy_database(db_path, rows):
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE question_answer (id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, "
+            "answer TEXT NOT NULL, options TEXT, type TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.executemany(
+            "INSERT INTO question_answer (question, answer) VALUES (?, ?)",
+            [(f"旧题库问题 {i}", f"答案{i}") for i in range(rows)]
+        )
+        conn.commit()
+        conn.close()
+
+    def test_fresh_database_reaches_head(self, temp_db_manager):
+        """测试新数据库执行全部迁移并记录版本"""
+        from src.geyago.core.migrations import MIGRATIONS, MigrationRunner
+
+        runner = MigrationRunner(temp_db_manager)
+        rows = temp_db_manager.execute_query("SELECT version, name FROM schema_version ORDER BY version", fetch_all=True)
+
+        assert [row["version"] for row in rows] == [m.version for m in MIGRATIONS]
+        assert runner.current_version() == runner.head
+        assert runner.pending() == []
+        assert temp_db_manager.search_index_available
+
+    def test_startup_at_head_skips_ddl(self, temp_db_manager, monkeypatch):
+        """测试已是最新版本时再次初始化不执行迁移"""
+        from src.geyago.core.migrations import MigrationRunner
+
+        def fail_migrate(self, *args, **kwargs):
+            raise AssertionError("已是最新版本时不应执行迁移")
+
+        monkeypatch.setattr(MigrationRunner, "migrate", fail_migrate)
+        temp_db_manager.init_database()
+
+        assert temp_db_manager.search_index_available
+
+    def test_legacy_database_backfilled_in_batches(self, tmp_path):
+        """测试旧数据库按版本升级，回填分批提交并报告进度"""
+        from src.geyago.core.database import DatabaseManager
+        from src.geyago.core.migrations import MigrationRunner
+
+        db_path = tmp_path / "legacy.db"
+        self._create_legacy_database(db_path, 25)
+        manager = DatabaseManager(f"sqlite:///{db_path}")
+        runner = MigrationRunner(manager, batch_size=10)
+        progress = []
+
+        applied = runner.migrate(target=2, progress=lambda migration, done: progress.append(done))
+        assert [item["version"] for item in applied] == [1, 2]
+        assert progress == [10, 20, 25]
+        assert runner.current_version() == 2
+        assert not manager.table_exists("question_answer_fts")
+
+        runner.migrate()
+        manager.init_database()
+        assert manager.search_index_available
+        assert manager.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer_fts WHERE question_answer_fts MATCH '旧题库'",
+            fetch_one=True
+        )["count"] == 25
+        manager.close_all_connections()
+
+    def test_dry_run_estimates_without_changes(self, tmp_path):
+        """测试dry-run报告待处理行数和估算耗时，不修改数据库"""
+        from src.geyago.core.database import DatabaseManager
+        from src.geyago.core.migrations import MigrationRunner
+
+        db_path = tmp_path / "legacy.db"
+        self._create_legacy_database(db_path, 30)
+        manager = DatabaseManager(f"sqlite:///{db_path}")
+        runner = MigrationRunner(manager)
+
+        plan = runner.plan()
+        assert [item["version"] for item in plan] == [1, 2, 3, 4, 5]
+        assert all(item["rows"] == 30 and item["estimated_seconds"] >= 0 for item in plan)
+        assert runner.current_version() == 0
+        assert not manager.table_exists("schema_version")
+        assert {row["name"] for row in manager.get_table_info("question_answer")} == {
+            "id", "question", "answer", "options", "type", "created_at"
+        }
+        manager.close_all_connections()
+
+    def test_startup_repairs_interrupted_deferred_indexes(self, temp_db_manager):
+        """测试批量导入暂停索引维护期间进程退出后，下次启动重新创建索引和触发器并补全全文索引"""
+        from src.geyago.core.database import DEFERRED_INDEXES, SEARCH_INDEX_TRIGGERS, DatabaseManager
+
+        context = temp_db_manager.deferred_indexes()
+        context.__enter__()  # 模拟进程在导入期间被杀死，不执行恢复
+        temp_db_manager.execute_query("INSERT INTO question_answer (question, answer) VALUES ('中断导入的问题', '答案')")
+        temp_db_manager.close_all_connections()
+
+        manager = DatabaseManager(temp_db_manager.database_url)
+        manager.init_database()
+
+        names = {row["name"] for row in manager.execute_query("SELECT name FROM sqlite_master", fetch_all=True)}
+        assert set(DEFERRED_INDEXES + SEARCH_INDEX_TRIGGERS) <= names
+        assert manager.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer_fts WHERE question_answer_fts MATCH '中断导入'",
+            fetch_one=True
+        )["count"] == 1
+        manager.close_all_connections()
+        context.__exit__(None, None, None)
+
+    def test_question_keys_recomputed_for_operators(self, temp_db_manager):
+        """测试迁移5按保留运算符的规则重新计算旧匹配键"""
+        from src.geyago.core.migrations import MigrationRunner
+        from src.geyago.utils.helpers import build_question_key, hash_question_key
+
+        # 旧规则下 "1+1=?" 的匹配键与 "11=?" 相同
+        temp_db_manager.execute_query(
+            "INSERT INTO question_answer (question, answer, normalized_question, question_hash) VALUES (?, ?, ?, ?)",
+            ("1+1=?", "2", "11", hash_question_key("11"))
+        )
+        temp_db_manager.execute_query("DELETE FROM schema_version WHERE version = 5")
+
+        applied = MigrationRunner(temp_db_manager).migrate()
+
+        assert [item["version"] for item in applied] == [5]
+        row = temp_db_manager.execute_query("SELECT normalized_question, question_hash FROM question_answer", fetch_one=True)
+        assert row["normalized_question"] == build_question_key("1+1=?")
+        assert row["question_hash"] == hash_question_key(build_question_key("1+1=?"))
+
+    def test_search_index_created_after_sqlite_gains_fts5(self, temp_db_manager):
+        """测试执行迁移时不支持FTS5（版本已记录但索引表不存在）的数据库，下次启动补建全文索引"""
+        from src.geyago.core.database import SEARCH_INDEX_TRIGGERS, DatabaseManager
+
+        temp_db_manager.execute_query("INSERT INTO question_answer (question, answer) VALUES ('补建索引的问题', '答案')")
+        with temp_db_manager.get_cursor() as cursor:
+            for trigger in SEARCH_INDEX_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {trigger}")
+            cursor.execute("DROP TABLE question_answer_fts")
+        temp_db_manager.close_all_connections()
+
+        manager = DatabaseManager(temp_db_manager.database_url)
+        manager.init_database()
+
+        assert manager.search_index_available
+        assert manager.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer_fts WHERE question_answer_fts MATCH '补建索引'",
+            fetch_one=True
+        )["count"] == 1
+        manager.close_all_connections()
@@ -0,0 +1,205 @@
+"""
+数据模型测试
+
+测试QuestionRepository的数据访问行为
+"""
+
+import sqlite3
+
+import pytest
+
+from src.geyago.core.database import DatabaseManager
+from src.geyago.core.exceptions import QuestionNotFoundError, ValidationError
+from src.geyago.models import question as question_module
+from src.geyago.models.question import Question, QuestionRepository
+
+
+class TestNormalizedLookup:
+    """标准化问题查找测试类"""
+
+    def test_lookup_ignores_whitespace_and_punctuation(self, repo_db):
+        """测试空白和标点差异不影响匹配"""
+        QuestionRepository.create_question("中国的首都是哪里？", "北京")
+
+        found = QuestionRepository.find_by_normalized_question("  中国的首都是哪里?  ")
+
+        assert found is not None
+        assert found.answer == "北京"
+
+    def test_lookup_prefers_exact_text(self, repo_db):
+        """测试同一标准化文本有多条记录时优先原文一致的记录"""
+        QuestionRepository.create_question("Python是什么?", "答案一")
+        QuestionRepository.create_question("python是什么？", "答案二")
+
+        found = QuestionRepository.find_by_normalized_question("python是什么？")
+
+        assert found.answer == "答案二"
+
+    def test_symbol_only_question_falls_back_to_raw_text(self, repo_db):
+        """测试纯符号题目不会互相匹配"""
+        QuestionRepository.create_question("???", "答案")
+
+        assert QuestionRepository.find_by_normalized_question("!!!") is None
+        assert QuestionRepository.find_by_normalized_question("???") is not None
+
+    def test_operators_and_decimals_are_kept(self, repo_db):
+        """测试只有运算符或小数点不同的问题不会匹配到对方的答案"""
+        QuestionRepository.create_question("1+1=?", "2")
+        QuestionRepository.create_question("x>0 的解集", "正数")
+        QuestionRepository.create_question("3.5 取整是多少", "3")
+
+        assert QuestionRepository.find_by_normalized_question("11=?") is None
+        assert QuestionRepository.find_by_normalized_question("x0 的解集") is None
+        assert QuestionRepository.find_by_normalized_question("35 取整是多少") is None
+        assert QuestionRepository.find_by_normalized_question("１＋１＝？").answer == "2"
+        assert QuestionRepository.find_by_normalized_question("x > 0的解集").answer == "正数"
+
+    def test_init_backfills_existing_rows(self, tmp_path):
+        """测试旧数据库初始化时补充并回填哈希列"""
+        db_path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            """
+            CREATE TABLE question_answer (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                options TEXT,
+                type TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO question_answer (question, answer) VALUES (?, ?)",
+            [(f"旧问题 {i}", f"答案{i}") for i in range(5)]
+        )
+        conn.commit()
+        conn.close()
+
+        manager = DatabaseManager(f"sqlite:///{db_path}")
+        manager.init_database()
+
+        row = manager.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer WHERE question_hash IS NULL",
+            fetch_one=True
+        )
+        assert row["count"] == 0
+        manager.close_all_connections()
+
+
+class TestFullTextSearch:
+    """全文索引搜索测试类"""
+
+    def test_search_uses_index_and_limit(self, repo_db):
+        """测试搜索通过全文索引匹配问题、答案和选项，并限制返回数量"""
+        assert repo_db.search_index_available
+        QuestionRepository.create_question("中华人民共和国的首都是哪里", "北京")
+        QuestionRepository.create_question("法国的首都是哪里", "巴黎")
+        QuestionRepository.create_question("水的化学式", "H2O", options="A.H2O B.CO2")
+
+        results = QuestionRepository.search_questions("的首都", limit=1)
+        assert len(results) == 1
+        assert len(QuestionRepository.search_questions("的首都", limit=10)) == 2
+        assert QuestionRepository.search_questions("CO2")[0].answer == "H2O"
+        # 短于一个trigram的关键词退回LIKE查询
+        assert len(QuestionRepository.search_questions("首都")) == 2
+
+    def test_triggers_keep_index_in_sync(self, repo_db):
+        """测试更新和删除后索引保持同步"""
+        question = QuestionRepository.create_question("光速是多少", "约30万公里每秒")
+        question.question = "声速是多少"
+        QuestionRepository.save(question)
+
+        assert QuestionRepository.search_questions("光速是") == []
+        assert len(QuestionRepository.search_questions("声速是")) == 1
+
+        QuestionRepository.delete_question(question.id)
+        assert QuestionRepository.search_questions("声速是") == []
+
+    def test_find_similar_ranks_closest_first(self, repo_db):
+        """测试相似问题按共享片段排序"""
+        QuestionRepository.create_question("下列哪个是哺乳动物", "鲸鱼")
+        QuestionRepository.create_question("下列哪个是爬行动物", "蛇")
+        QuestionRepository.create_question("地球绕太阳一周需要多久", "一年")
+
+        results = QuestionRepository.find_similar_questions("下列哪个是哺乳类动物？")
+        assert results[0].answer == "鲸鱼"
+        assert all(question.answer != "一年" for question in results)
+
+    def test_rebuild_indexes_existing_rows(self, repo_db):
+        """测试重建命令为索引之前已存在的数据建立索引"""
+        QuestionRepository.create_question("重建索引之前的问题", "答案")
+        with repo_db.get_cursor() as cursor:
+            cursor.execute("INSERT INTO question_answer_fts(question_answer_fts) VALUES ('delete-all')")
+        assert QuestionRepository.search_questions("索引之前") == []
+
+        assert repo_db.rebuild_search_index() == 1
+        assert len(QuestionRepository.search_questions("索引之前")) == 1
+
+
+class TestQuestionWrites:
+    """问题写入测试类"""
+
+    @pytest.fixture(params=[True, False], ids=["returning", "fallback"])
+    def returning(self, request, monkeypatch):
+        """分别测试 RETURNING 和旧版SQLite的回退路径"""
+        monkeypatch.setattr(question_module, "SUPPORTS_RETURNING", request.param)
+        return request.param
+
+    def test_save_returns_written_row(self, repo_db, returning):
+        """测试保存后直接返回写入的行，重复问题时不会返回其他记录"""
+        QuestionRepository.create_question("重复的问题", "旧答案")
+
+        created = QuestionRepository.create_question("重复的问题", "新答案")
+        assert created.answer == "新答案"
+        assert created.created_at is not None
+
+        created.answer = "更新后的答案"
+        updated = QuestionRepository.save(created)
+        assert updated.id == created.id
+        assert updated.answer == "更新后的答案"
+
+    def test_update_missing_question(self, repo_db, returning):
+        """测试更新不存在的问题"""
+        with pytest.raises(QuestionNotFoundError):
+            QuestionRepository.save(Question(id=999, question="不存在", answer="答案"))
+
+    def test_upsert_by_normalized_question(self, repo_db, returning):
+        """测试按标准化问题插入或更新"""
+        first, created = QuestionRepository.upsert("什么是upsert？", "答案一")
+        assert created
+
+        second, created = QuestionRepository.upsert("什么是UPSERT?", "答案二", "A.甲 B.乙", "single")
+        assert not created
+        assert second.id == first.id
+        assert second.question == "什么是upsert？"
+        assert (second.answer, second.options, second.question_type) == ("答案二", "A.甲 B.乙", "single")
+        assert QuestionRepository.count_questions() == 1
+
+class TestKeysetPagination:
+    """游标分页测试类"""
+
+    def test_cursor_walks_all_pages(self, repo_db):
+        """测试按游标翻页时不重复、不遗漏，并与偏移分页顺序一致"""
+        for i in range(7):
+            QuestionRepository.create_question(f"分页问题{i}", f"答案{i}")
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = QuestionRepository.get_questions_page(limit=3, cursor=cursor)
+            seen.extend(question.id for question in page)
+            if cursor is None:
+                break
+
+        assert len(seen) == len(set(seen)) == 7
+        assert [question.id for question in QuestionRepository.get_all_questions(limit=7)] == seen
+
+        second_page, _ = QuestionRepository.get_questions_page(limit=3, offset=3)
+        assert [question.id for question in second_page] == seen[3:6]
+
+    def test_invalid_cursor(self, repo_db):
+        """测试无效的游标"""
+        with pytest.raises(ValidationError):
+            QuestionRepository.get_questions_page(cursor="不是游标")
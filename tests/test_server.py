@@ -0,0 +1,145 @@
+"""
+生产服务器测试
+
+测试由 ServerConfig 生成的gunicorn配置以及fork前后的初始化
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.geyago import server
+from src.geyago.config.settings import AIProviderConfig, ServerConfig, Settings
+from src.geyago.core.exceptions import ConfigurationError
+
+
+class TestServerOptions:
+    """gunicorn配置测试类"""
+
+    def test_options_follow_server_config(self):
+        """测试配置项来自 ServerConfig"""
+        config = ServerConfig(host="127.0.0.1", port=8000, workers=3, threads=8, backlog=512, keepalive=10)
+
+        options = server.build_server_options(config)
+
+        assert options["bind"] == "127.0.0.1:8000"
+        assert options["workers"] == 3
+        assert options["threads"] == 8
+        assert options["worker_class"] == "gthread"
+        assert options["backlog"] == 512
+        assert options["keepalive"] == 10
+        assert options["preload_app"] is True
+        assert options["on_starting"] is server.on_starting
+        assert options["post_fork"] is server.post_fork
+
+    def test_asgi_and_worker_overrides(self):
+        """测试命令行可以强制使用ASGI worker并覆盖worker数量"""
+        options = server.build_server_options(ServerConfig(workers=2), asgi=True, workers=6)
+
+        assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+        assert options["workers"] == 6
+
+    def test_auto_workers(self):
+        """测试worker数量为0时按CPU核数计算"""
+        with patch.object(server.multiprocessing, "cpu_count", return_value=4):
+            assert server.resolve_workers(0) == 9
+
+    def test_unknown_worker_class(self):
+        """测试不支持的worker类型"""
+        with pytest.raises(ConfigurationError):
+            server.build_server_options(ServerConfig(worker_class="eventlet"))
+
+
+class TestForkLifecycle:
+    """fork前后初始化测试类"""
+
+    def test_preload_does_not_keep_connections_or_threads(self):
+        """测试预加载时不启动后台线程，并在fork前关闭数据库连接"""
+        app_instance = Mock()
+        with patch("src.geyago.main.GeyagoApp", return_value=app_instance), \
+                patch.object(server, "db_manager") as db_manager:
+            app = server.load_application(preloaded=True)
+
+        assert app is app_instance.app
+        app_instance.init_services.assert_called_once_with(start_background=False, migrate=True)
+        db_manager.close_all_connections.assert_called_once()
+
+    def test_workers_do_not_migrate_without_preload(self):
+        """测试不预加载时由主进程迁移一次，worker加载应用时不再迁移"""
+        master = Mock()
+        master.cfg.preload_app = False
+        app_instance = Mock()
+        with patch("src.geyago.main.GeyagoApp", return_value=app_instance), \
+                patch.object(server, "db_manager") as db_manager:
+            server.on_starting(master)
+            server.load_application(preloaded=False)
+
+        db_manager.init_database.assert_called_once()
+        db_manager.close_all_connections.assert_called_once()
+        app_instance.init_services.assert_called_once_with(start_background=True, migrate=False)
+
+    def test_on_starting_skips_when_preloaded(self):
+        """测试预加载时迁移已在加载应用时完成，on_starting 不重复执行"""
+        master = Mock()
+        master.cfg.preload_app = True
+        with patch.object(server, "db_manager") as db_manager:
+            server.on_starting(master)
+
+        db_manager.init_database.assert_not_called()
+
+    def test_post_fork_starts_worker_health_monitor(self):
+        """测试预加载时由每个worker在fork后启动健康检查和数据库维护"""
+        worker_server = Mock()
+        worker_server.cfg.preload_app = True
+        with patch.object(server, "db_manager") as db_manager, \
+                patch.object(server, "ai_service_manager") as manager, \
+                patch.object(server, "database_maintenance") as maintenance:
+            server.post_fork(worker_server, Mock())
+
+        db_manager.close_all_connections.assert_called_once()
+        manager.start_health_monitor.assert_called_once()
+        maintenance.start.assert_called_once()
+
+
+class TestReload:
+    """SIGHUP重新加载测试类"""
+
+    def test_reload_applies_provider_and_routing_changes(self):
+        """测试重新读取配置后按新的密钥和路由参数重建提供商"""
+        from src.geyago.services.ai_service_manager import AIServiceManager
+
+        config = Settings()
+        config.ai_providers = {"test": AIProviderConfig(
+            name="测试服务", enabled=True, api_key="old-key",
+            base_url="https://example.invalid/v1/chat/completions",
+            models={"default": "test-model"}, request_format="openai_compatible", parameters={}
+        )}
+        config.app.default_ai = "test"
+        manager = AIServiceManager(config)
+        manager.initialize()
+        old_provider = manager.providers["test"]
+
+        def reload_from_file():
+            config.ai_providers["test"] = config.ai_providers["test"].model_copy(update={"api_key": "new-key"})
+            config.routing.latency_weight = 5.0
+
+        with patch.object(server, "settings", config), \
+                patch.object(server, "ai_service_manager", manager), \
+                patch.object(Settings, "reload", side_effect=reload_from_file):
+            server.reload_settings()
+
+        assert manager.providers["test"] is not old_provider
+        assert manager.providers["test"].config.api_key == "new-key"
+        assert manager.router.latency_weight == 5.0
+        manager.shutdown()
+
+    def test_exit_hooks_registered_once(self):
+        """测试重复初始化服务时退出清理函数只注册一次"""
+        from src.geyago import main
+
+        with patch.object(main, "_exit_hooks_registered", False), \
+                patch.object(main.atexit, "register") as register:
+            main.register_exit_hooks()
+            main.register_exit_hooks()
+
+        assert register.call_count == 5
@@ -0,0 +1,569 @@
+"""
+服务层组件测试
+
+测试答案缓存、并发请求合并等问答服务内部组件
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.geyago.config.settings import settings
+from src.geyago.core.exceptions import ValidationError
+from src.geyago.models.question import QuestionRepository
+from src.geyago.services.answer_cache import AnswerCache
+from src.geyago.services.answer_writer import AnswerWriter
+from src.geyago.services.qa_service import QAService
+from src.geyago.services.question_exporter import iter_question_export
+from src.geyago.services.question_importer import QuestionImporter
+from src.geyago.services.single_flight import SingleFlight
+
+
+class TestAnswerCache:
+    """答案缓存测试类"""
+
+    def test_key_is_normalized(self):
+        """测试缓存键对空白和标点不敏感"""
+        cache = AnswerCache()
+        cache.set(AnswerCache.make_key("1+1等于几？", "A.1 B.2", "single"), "2", "ai")
+
+        hit = cache.get(AnswerCache.make_key(" 1+1等于几? ", "A.1  B.2", "SINGLE"))
+
+        assert hit is not None
+        assert hit.answer == "2"
+        assert cache.get_stats()["hits"] == 1
+
+    def test_operator_differences_do_not_collide(self):
+        """测试只有运算符不同的问题使用不同的缓存键"""
+        assert AnswerCache.make_key("1+1=?") != AnswerCache.make_key("11=?")
+        assert AnswerCache.make_key("x<y") != AnswerCache.make_key("xy")
+        assert AnswerCache.make_key("2*3") != AnswerCache.make_key("23")
+
+    def test_options_are_part_of_key(self):
+        """测试不同选项的同一问题不会串答案"""
+        cache = AnswerCache()
+        cache.set(AnswerCache.make_key("选择正确的答案", "A.苹果 B.香蕉"), "苹果", "ai")
+
+        assert cache.get(AnswerCache.make_key("选择正确的答案", "A.猫 B.狗")) is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_lru_eviction_by_bytes(self):
+        """测试超出字节上限时淘汰最久未使用的条目"""
+        cache = AnswerCache(max_bytes=1500)
+        cache.set(AnswerCache.make_key("问题一"), "答" * 100, "ai")
+        cache.set(AnswerCache.make_key("问题二"), "答" * 100, "ai")
+        cache.get(AnswerCache.make_key("问题一"))
+        cache.set(AnswerCache.make_key("问题三"), "答" * 100, "ai")
+
+        assert cache.get(AnswerCache.make_key("问题二")) is None
+        assert cache.get(AnswerCache.make_key("问题一")) is not None
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= 1500
+
+    def test_oversized_entry_is_not_cached(self):
+        """测试单个超大条目不会清空整个缓存"""
+        cache = AnswerCache(max_bytes=500)
+        cache.set(AnswerCache.make_key("短问题"), "短答案", "ai")
+
+        assert cache.set(AnswerCache.make_key("长问题"), "长" * 1000, "ai") is False
+        assert cache.get(AnswerCache.make_key("短问题")) is not None
+
+    def test_entries_expire(self):
+        """测试条目过期"""
+        cache = AnswerCache(ttl_seconds=0.01)
+        cache.set(AnswerCache.make_key("问题"), "答案", "ai")
+        time.sleep(0.02)
+
+        assert cache.get(AnswerCache.make_key("问题")) is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_invalidate_question_removes_all_variants(self):
+        """测试按问题失效会删除所有选项和类型组合"""
+        cache = AnswerCache()
+        cache.set(AnswerCache.make_key("问题", "A.1"), "1", "ai")
+        cache.set(AnswerCache.make_key("问题", "A.2", "single"), "2", "ai")
+        cache.set(AnswerCache.make_key("别的问题"), "3", "ai")
+
+        assert cache.invalidate_question("问题？") == 2
+        assert cache.get_stats()["entries"] == 1
+
+    def test_cache_hit_returns_original_result(self, repo_db):
+        """测试数据库命中和随后的缓存命中返回相同的 code、msg 和 source"""
+        QuestionRepository.create_question("缓存前后结果一致的问题", "答案")
+        service = QAService()
+
+        first = service.query_answer("缓存前后结果一致的问题")
+        second = service.query_answer("缓存前后结果一致的问题")
+
+        assert first["code"] == second["code"] == 0
+        assert first["msg"] == second["msg"] == "数据库匹配"
+        assert first["source"] == second["source"] == "database"
+        assert second["cached"] is True
+        assert service.answer_cache.get_stats()["hits"] == 1
+
+    def test_upsert_invalidates_cached_answer(self, repo_db):
+        """测试按标准化问题更新答案后不再返回缓存中的旧答案"""
+        QuestionRepository.create_question("会被更新答案的问题", "旧答案")
+        service = QAService()
+        assert service.query_answer("会被更新答案的问题")["data"] == "旧答案"
+
+        question, inserted = service.upsert_question("会被更新答案的问题？", "新答案")
+
+        assert inserted is False
+        assert question.answer == "新答案"
+        assert service.query_answer("会被更新答案的问题")["data"] == "新答案"
+
+    def test_save_invalidates_old_and_new_question(self, repo_db):
+        """测试修改问题文本和答案后新旧问题的缓存都失效"""
+        original = QuestionRepository.create_question("改名前的问题", "旧答案")
+        service = QAService()
+        service.query_answer("改名前的问题")
+        service.answer_cache.set(service.answer_cache.make_key("改名后的问题"), "缓存答案", "ai")
+
+        original.question = "改名后的问题"
+        original.answer = "新答案"
+        service.save_question(original)
+
+        assert service.answer_cache.get_stats()["entries"] == 0
+        assert service.query_answer("改名后的问题")["data"] == "新答案"
+
+
+class TestSingleFlight:
+    """并发请求合并测试类"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """测试相同键的并发调用只执行一次"""
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "答案"
+
+        def worker():
+            results.append(flights.do("key", slow_call))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        while flights.get_stats()["coalesced_waiters"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert sorted(results) == [("答案", False)] + [("答案", True)] * 3
+        assert flights.get_stats()["in_flight"] == 0
+
+    def test_error_is_propagated_to_waiters(self):
+        """测试执行失败时异常同样抛给等待者，且之后可以重新执行"""
+        flights = SingleFlight()
+
+        with pytest.raises(ValueError):
+            flights.do("key", lambda: (_ for _ in ()).throw(ValueError("失败")))
+
+        assert flights.do("key", lambda: "重试成功") == ("重试成功", False)
+
+
+class TestAnswerWriter:
+    """AI答案后台写入测试类"""
+
+    def test_batches_and_deduplicates(self, repo_db):
+        """测试相同标准化问题只写入一次，且跳过数据库中已有的问题"""
+        QuestionRepository.create_question("已收录的问题", "旧答案")
+        writer = AnswerWriter(flush_interval=10, batch_size=100)
+
+        assert writer.submit("后台写入问题？", "答案一")
+        assert writer.submit("后台写入问题?", "答案二")
+        assert writer.submit("已收录的问题", "新答案")
+        assert writer.get_stats()["queue_depth"] == 2
+
+        assert writer.flush() == 1
+        writer.close()
+
+        assert QuestionRepository.find_by_normalized_question("后台写入问题").answer == "答案二"
+        assert QuestionRepository.find_by_question("已收录的问题").answer == "旧答案"
+        stats = writer.get_stats()
+        assert stats["batches"] == 1
+        assert stats["deduplicated"] == 1
+        assert stats["skipped_existing"] == 1
+
+    def test_background_flush_when_batch_is_full(self):
+        """测试累计到 batch_size 条后由后台线程立即写入"""
+        written = []
+        done = threading.Event()
+
+        def fake_writer(questions):
+            written.append([question.question for question in questions])
+            done.set()
+            return len(questions)
+
+        writer = AnswerWriter(flush_interval=10, batch_size=2, writer=fake_writer)
+        writer.submit("问题一", "甲")
+        writer.submit("问题二", "乙")
+
+        assert done.wait(2)
+        assert written == [["问题一", "问题二"]]
+        writer.close()
+
+    def test_full_queue_falls_back_to_sync_save(self, repo_db):
+        """测试队列满时QA服务同步写入数据库"""
+        service = QAService()
+        service.answer_writer = AnswerWriter(flush_interval=10, max_queue_size=1)
+        service._save_ai_answer("排队的问题", "答案一", "", "")
+        service._save_ai_answer("同步写入的问题", "答案二", "", "")
+
+        assert QuestionRepository.find_by_question("同步写入的问题").answer == "答案二"
+        assert QuestionRepository.find_by_question("排队的问题") is None
+        service.shutdown()
+        assert QuestionRepository.find_by_question("排队的问题").answer == "答案一"
+        assert service.answer_writer.get_stats()["rejected_queue_full"] == 1
+
+
+class TestQAServiceDeduplication:
+    """问答服务AI请求去重测试类"""
+
+    def test_concurrent_misses_call_ai_once(self, repo_db):
+        """测试并发的相同未命中问题只调用一次AI并只保存一行"""
+        service = QAService()
+        barrier = threading.Barrier(5)
+        call_count = []
+
+        def fake_generate(*args):
+            call_count.append(1)
+            time.sleep(0.1)
+            return "AI答案"
+
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(service.query_answer("新出现的考题", "A.1 B.2", "single"))
+
+        with patch.object(service, "_generate_ai_answer", side_effect=fake_generate):
+            threads = [threading.Thread(target=worker) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        assert len(call_count) == 1
+        assert all(result["data"] == "AI答案" for result in results)
+        row = repo_db.execute_query(
+            "SELECT COUNT(*) AS count FROM question_answer", fetch_one=True
+        )
+        assert row["count"] == 1
+
+    def test_concurrent_async_misses_call_ai_once(self, repo_db):
+        """测试异步查询路径同样合并相同问题的AI调用，且不会因取消等待者而中断"""
+        service = QAService()
+        call_count = []
+
+        async def fake_generate(*args):
+            call_count.append(1)
+            await asyncio.sleep(0.05)
+            return "AI答案"
+
+        async def main():
+            cancelled = asyncio.ensure_future(service.query_answer_async("异步新考题"))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            return await asyncio.gather(*(service.query_answer_async("异步新考题") for _ in range(5)))
+
+        with patch.object(service, "_generate_ai_answer_async", side_effect=fake_generate):
+            results = asyncio.run(main())
+
+        assert len(call_count) == 1
+        assert all(result["data"] == "AI答案" for result in results)
+        assert service.ai_flights.get_stats()["coalesced_waiters"] == 5
+
+
+class TestFuzzyMatch:
+    """模糊匹配测试类"""
+
+    def test_typo_returns_stored_answer(self, repo_db):
+        """测试错别字问题直接返回题库答案，不调用AI"""
+        QuestionRepository.create_question(
+            "下列哪一项是中华人民共和国的首都", "北京", options="A.上海 B.北京 C.广州"
+        )
+        service = QAService()
+
+        with patch.object(service, "_generate_ai_answer") as generate:
+            result = service.query_answer(
+                "下列哪一项是中华人民共合国的首都？", "B.北京 A.上海 C.广州"
+            )
+
+        generate.assert_not_called()
+        assert result["source"] == "fuzzy"
+        assert result["data"] == "北京"
+        assert result["similarity"] >= 0.85
+
+    def test_different_options_do_not_match(self, repo_db):
+        """测试选项不同的相似问题不会命中"""
+        QuestionRepository.create_question(
+            "下列哪一项是中华人民共和国的首都", "北京", options="A.上海 B.北京 C.广州"
+        )
+        matcher = QAService().fuzzy_matcher
+
+        assert matcher.find_match("下列哪一项是中华人民共和国的首都", "A.天津 B.重庆") is None
+        assert matcher.get_stats()["rejected_options"] == 1
+
+    def test_numbers_must_match(self, repo_db):
+        """测试只有数字不同的问题不会命中"""
+        QuestionRepository.create_question("计算 12 乘以 12 等于多少", "144")
+        matcher = QAService().fuzzy_matcher
+
+        assert matcher.find_match("计算 12 乘以 13 等于多少") is None
+        assert matcher.find_match("计算12乘以12等于多少？").question.answer == "144"
+
+
+class TestBatchQuery:
+    """批量查询测试类"""
+
+    def test_results_keep_input_order(self, repo_db, monkeypatch):
+        """测试批量查询一次集合查询命中题库，未命中的并发调用AI，结果保持输入顺序"""
+        monkeypatch.setattr(settings.batch_query, "prompt_batching", False)
+        QuestionRepository.create_question("题库中的第一题", "答案一")
+        QuestionRepository.create_question("题库中的第二题", "答案二")
+        service = QAService()
+        items = [
+            {"title": "需要AI回答的问题甲", "options": "", "type": ""},
+            {"title": "题库中的第一题？", "options": "", "type": ""},
+            {"title": "", "options": "", "type": ""},
+            {"title": "题库中的第二题", "options": "", "type": ""},
+            {"title": "需要AI回答的问题乙", "options": "", "type": ""},
+        ]
+
+        def fake_generate(question_text, *args):
+            time.sleep(0.05)
+            return f"AI:{question_text}"
+
+        with patch.object(service, "_generate_ai_answer", side_effect=fake_generate) as generate:
+            results = service.query_answers_batch(items)
+
+        assert [result["data"] for result in results] == [
+            "AI:需要AI回答的问题甲", "答案一", None, "答案二", "AI:需要AI回答的问题乙"
+        ]
+        assert [result["source"] for result in results] == ["ai", "database", None, "database", "ai"]
+        assert generate.call_count == 2
+
+    def test_batch_lookup_uses_one_query_per_chunk(self, repo_db):
+        """测试批量按标准化问题查找返回每个问题的最佳匹配"""
+        QuestionRepository.create_question("批量查找的问题", "答案")
+
+        found = QuestionRepository.find_by_normalized_questions(["批量查找的问题!", "不存在的问题"])
+
+        assert list(found) == ["批量查找的问题!"]
+        assert found["批量查找的问题!"].answer == "答案"
+
+    def test_too_many_items_rejected(self, repo_db, monkeypatch):
+        """测试超过批量上限时报错"""
+        monkeypatch.setattr(settings.batch_query, "max_items", 2)
+
+        with pytest.raises(ValidationError):
+            QAService().query_answers_batch([{"title": "问题"}] * 3)
+
+
+    def test_misses_share_multi_question_prompt(self, repo_db):
+        """测试多个未命中的问题合并为一次批量AI请求，重复的问题只提问一次"""
+        service = QAService()
+        items = [{"title": "批量提示词问题甲"}, {"title": "批量提示词问题乙"}, {"title": "批量提示词问题甲"}]
+
+        with patch.object(
+            service.ai_service_manager, "query_answers_batch", return_value=["答案甲", "答案乙"]
+        ) as query_batch, patch.object(service, "_ensure_ai_service_initialized"):
+            results = service.query_answers_batch(items)
+
+        query_batch.assert_called_once()
+        assert len(query_batch.call_args[0][0]) == 2
+        assert [result["data"] for result in results] == ["答案甲", "答案乙", "答案甲"]
+        assert QuestionRepository.find_by_question("批量提示词问题乙").answer == "答案乙"
+
+
+    def test_batch_waits_for_in_flight_single_query(self, repo_db):
+        """测试单题查询正在生成的问题不会再加入批量提示词，而是等待并共享其结果"""
+        service = QAService()
+        release = threading.Event()
+        single_results = []
+
+        def slow_generate(*args):
+            release.wait(5)
+            return "单题答案"
+
+        with patch.object(service, "_generate_ai_answer", side_effect=slow_generate), \
+                patch.object(service.ai_service_manager, "query_answers_batch", return_value=["答案乙"]) as query_batch, \
+                patch.object(service, "_ensure_ai_service_initialized"):
+            single = threading.Thread(target=lambda: single_results.append(service.query_answer("正在生成的问题甲")))
+            single.start()
+            while service.ai_flights.get_stats()["in_flight"] < 1:
+                time.sleep(0.001)
+
+            batch_results = []
+            batch = threading.Thread(target=lambda: batch_results.extend(
+                service.query_answers_batch([{"title": "正在生成的问题甲"}, {"title": "批量问题乙"}])
+            ))
+            batch.start()
+            while service.ai_flights.get_stats()["coalesced_waiters"] < 1:
+                time.sleep(0.001)
+            release.set()
+            single.join(5)
+            batch.join(5)
+
+        assert [question for question, *_ in query_batch.call_args[0][0]] == ["批量问题乙"]
+        assert [result["data"] for result in batch_results] == ["单题答案", "答案乙"]
+        assert single_results[0]["data"] == "单题答案"
+        assert service.ai_flights.get_stats()["in_flight"] == 0
+
+    def test_waiting_on_other_requests_does_not_block_pool(self, repo_db, monkeypatch):
+        """测试等待其他请求的AI结果时不占用批量线程池，线程池只有一个线程时其他批量请求也能完成"""
+        monkeypatch.setattr(settings.batch_query, "max_workers", 1)
+        service = QAService()
+        release = threading.Event()
+
+        def slow_generate(*args):
+            release.wait(5)
+            return "单题答案"
+
+        with patch.object(service, "_generate_ai_answer", side_effect=slow_generate), \
+                patch.object(service.ai_service_manager, "query_answers_batch",
+                             side_effect=lambda questions, *args: [f"答案{q[0]}" for q in questions]), \
+                patch.object(service, "_ensure_ai_service_initialized"):
+            single = threading.Thread(target=lambda: service.query_answer("占用中的问题"))
+            single.start()
+            while service.ai_flights.get_stats()["in_flight"] < 1:
+                time.sleep(0.001)
+
+            first = threading.Thread(target=lambda: service.query_answers_batch(
+                [{"title": "占用中的问题"}, {"title": "第一批问题"}]
+            ))
+            first.start()
+            while service.ai_flights.get_stats()["coalesced_waiters"] < 1:
+                time.sleep(0.001)
+
+            second_results = []
+            second = threading.Thread(target=lambda: second_results.extend(service.query_answers_batch(
+                [{"title": "第二批问题甲"}, {"title": "第二批问题乙"}]
+            )))
+            second.start()
+            second.join(2)
+            finished_while_waiting = not second.is_alive()
+            release.set()
+            for thread in (single, first, second):
+                thread.join(5)
+
+        assert finished_while_waiting
+        assert [result["data"] for result in second_results] == ["答案第二批问题甲", "答案第二批问题乙"]
+
+
+class TestQuestionImporter:
+    """题库批量导入测试类"""
+
+    def test_import_jsonl_dedups_and_reports_invalid(self, repo_db):
+        """测试JSONL导入时文件内去重、跳过题库已有问题并记录无效行"""
+        QuestionRepository.create_question("题库已有的问题", "旧答案")
+        content = "\n".join([
+            '{"question": "导入问题一", "answer": "答案一", "options": ["A.甲", "B.乙"], "type": "single"}',
+            '{"question_text": "导入问题一！", "answer": "重复"}',
+            '{"title": "题库已有的问题", "answer": "新答案"}',
+            '{"question": "缺少答案"}',
+            'not json',
+            '',
+            '{"question": "导入问题二", "answer": "答案二"}'
+        ])
+        progress = []
+
+        result = QuestionImporter(batch_size=2, progress=progress.append).run(io.StringIO(content), "jsonl")
+
+        assert (result.total, result.inserted, result.duplicates, result.existing, result.invalid) == (6, 2, 1, 1, 2)
+        assert result.batches == 2
+        assert len(progress) == 2
+        assert [error.split(":")[0] for error in result.errors] == ["第 4 行", "第 5 行"]
+        imported = QuestionRepository.find_by_normalized_question("导入问题一")
+        assert (imported.options, imported.question_type) == ("A.甲 B.乙", "single")
+        assert QuestionRepository.find_by_normalized_question("题库已有的问题").answer == "旧答案"
+
+    def test_import_csv_with_deferred_indexes(self, repo_db, monkeypatch):
+        """测试CSV导入，暂停索引维护后索引和全文搜索仍然可用"""
+        monkeypatch.setattr("src.geyago.services.question_importer.db_manager", repo_db)
+        content = "question,answer,options,type\n光合作用的产物,氧气和葡萄糖,,\n\"含,逗号的问题\",答案,,judge\n"
+
+        result = QuestionImporter(defer_indexes=True).run(io.StringIO(content, newline=""), "csv")
+
+        assert result.inserted == 2
+        assert len(QuestionRepository.search_questions("光合作用")) == 1
+        assert QuestionRepository.find_by_normalized_question("含,逗号的问题").question_type == "judge"
+        with repo_db.get_cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")
+            names = {row["name"] for row in cursor.fetchall()}
+        assert {"idx_question_answer_type", "idx_question_answer_created_at_id", "question_answer_fts_insert"} <= names
+
+    def test_unknown_format(self, repo_db):
+        """测试不支持的格式"""
+        with pytest.raises(ValidationError):
+            QuestionImporter().run(io.StringIO(""), "xml")
+
+
+class TestQuestionExport:
+    """题库流式导出测试类"""
+
+    @staticmethod
+    def set_created_at(repo_db, question_id, created_at):
+        """修改问题的添加时间"""
+        with repo_db.get_cursor() as cursor:
+            cursor.execute("UPDATE question_answer SET created_at = ? WHERE id = ?", (created_at, question_id))
+
+    def test_export_filters_and_round_trip(self, repo_db):
+        """测试按类型和时间范围过滤，导出的文件可以直接导入"""
+        old = QuestionRepository.create_question("旧问题", "答案一", "A.甲 B.乙", "single")
+        new = QuestionRepository.create_question("新问题", "答案二", question_type="judge")
+        self.set_created_at(repo_db, old.id, "2024-01-01 08:00:00")
+        self.set_created_at(repo_db, new.id, "2024-03-01 08:00:00")
+
+        content = b"".join(iter_question_export(since="2024-02-01")).decode("utf-8")
+        assert [json.loads(line)["question"] for line in content.splitlines()] == ["新问题"]
+        content = b"".join(iter_question_export(question_type="single")).decode("utf-8")
+        assert json.loads(content)["options"] == "A.甲 B.乙"
+
+        exported = b"".join(iter_question_export(fmt="csv", compress=True))
+        text = gzip.decompress(exported).decode("utf-8")
+        assert text.splitlines()[0] == "id,question,answer,options,type,created_at"
+
+        QuestionRepository.delete_question(new.id)
+        result = QuestionImporter().run(io.StringIO(text, newline=""), "csv")
+        assert (result.inserted, result.existing) == (1, 1)
+        assert QuestionRepository.find_by_normalized_question("新问题").question_type == "judge"
+
+    def test_rows_are_paged_without_holding_a_connection(self, repo_db):
+        """测试按keyset分页读取全部行，读取间隙不占用连接"""
+        for i in range(7):
+            question = QuestionRepository.create_question(f"分页导出问题{i}", "答案")
+            self.set_created_at(repo_db, question.id, "2024-01-01 08:00:00")
+
+        for since in (None, "2024-01-01"):
+            rows = QuestionRepository.iter_rows(since=since, chunk_size=3)
+            first = next(rows)
+            assert repo_db.get_pool_stats()["in_use"] == 0
+            assert [first[0]] + [row[0] for row in rows] == list(range(1, 8))
+
+    def test_invalid_arguments(self, repo_db):
+        """测试无效的格式和时间在调用时立即报错"""
+        with pytest.raises(ValidationError):
+            iter_question_export(fmt="xml")
+        with pytest.raises(ValidationError):
+            iter_question_export(since="昨天")